@@ -10,4 +10,4 @@ cd "$SCRIPT_DIR/src/ll_ocl_comics"
 source venv/bin/activate
 
 # Run the Python application
-python main.py
+python main.py "$@"
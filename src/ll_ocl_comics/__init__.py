@@ -17,4 +17,130 @@ from .mokuro_changes import (
 
 from .helpers import (
     remove_between_anchors,
+    parse_structured_translations,
+)
+
+from .logging_utils import (
+    configure_logging,
+    LazyJson,
+    TraceSpool,
+    read_trace,
+)
+
+from .progress import (
+    ProgressBus,
+)
+
+from .config import (
+    ConfigStore,
+    DEFAULT_CONFIG_PATH,
+)
+
+from .model_catalog import (
+    ModelCatalog,
+    parse_model_metadata,
+)
+
+from .textbox_filter import (
+    classify_textbox,
+    resolve_locally,
+)
+
+from .sfx_lexicon import (
+    SfxLexicon,
+    BUILTIN_SFX,
+    normalize_sfx,
+    has_sfx_markers,
+)
+
+from .routing import (
+    ModelRouter,
+    ModelTier,
+    page_complexity,
+)
+
+from .backends import (
+    Backend,
+    OllamaBackend,
+    OpenAICompatibleBackend,
+    make_backend,
+)
+
+from .deadlines import (
+    CircuitBreaker,
+    OllamaUnavailable,
+    RequestStalled,
+    RequestTimedOut,
+    request_deadline,
+)
+
+from .generation_budget import (
+    GenerationMonitor,
+    RepetitionLoopError,
+    estimate_num_predict,
+    find_repetition_loop,
+)
+
+from .text_fit import (
+    fit_font_size,
+    count_wrapped_lines,
+)
+
+from .lazy_pages import (
+    dehydrate_pages,
+)
+
+from .viewer_patch import (
+    patch_viewer,
+    PatchCache,
+)
+
+from .geometry import (
+    parse_box_style,
+    find_overlaps,
+    widen_rects,
+    layout_textboxes,
+)
+
+from .rag_store import (
+    RagStore,
+    RagDocument,
+)
+
+from .textbox_store import (
+    TextboxStore,
+    TextboxRecord,
+)
+
+from .library_index import (
+    LibraryIndex,
+)
+
+from .progress_model import (
+    ThroughputEstimate,
+    ProgressModel,
+    GenerationProgress,
+    format_duration,
+)
+
+from .profiling import (
+    JobProfiler,
+    StackSampler,
+)
+
+from .sidecar import (
+    collect_translations,
+    write_sidecar,
+    read_sidecar,
+    apply_sidecar,
+    apply_sidecar_file,
+    translated_path_for,
+)
+
+from .reader_server import (
+    ReaderServer,
+    READER_SOURCES_FILENAME,
+    parse_range,
+    precompress,
+    record_source_directory,
 )
@@ -1,8 +1,12 @@
 
-import requests
-import json
 import logging
-import os
+import time
+
+from config import ConfigStore
+from backends import BACKEND_OLLAMA, BACKENDS, make_backend
+from deadlines import DEFAULT_DEADLINE_SECONDS
+from generation_budget import GenerationMonitor, DEFAULT_REASONING_BUDGET
+from model_catalog import parse_model_metadata
 
 # Default system prompt - kept as constant for "Default" button functionality
 DEFAULT_TRANSLATION_SYSTEM_PROMPT = """
@@ -14,30 +18,113 @@ directly onto the comic page.
 Here is your text to translate:
 """
 
+# JSON schema sent through Ollama's `format` field when structured output is enabled.
+# Each translated textbox comes back as an {id, text} object.
+TRANSLATION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "translations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "text": {"type": "string"},
+                },
+                "required": ["id", "text"],
+            },
+        },
+    },
+    "required": ["translations"],
+}
+
+# Appended to the user prompt in structured mode so the model knows which shape to produce
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+Respond only with JSON in the following format, one entry per textbox, using the textbox number as the id:
+{"translations": [{"id": 1, "text": "Translated English text goes here."}]}
+"""
+
+# How long Ollama keeps a model resident after a request while a job is running
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Think mode choices: leave Ollama's `think` field unset, or force it on or off
+THINK_MODE_DEFAULT = "model default"
+THINK_MODE_ON = "on"
+THINK_MODE_OFF = "off"
+THINK_MODES = (THINK_MODE_DEFAULT, THINK_MODE_ON, THINK_MODE_OFF)
+
+# Timing and token fields Ollama reports on a completed (non-streaming) response, plus
+# done_reason ("length" when num_predict cut the response off)
+RESPONSE_METRIC_FIELDS = (
+    "total_duration", "load_duration",
+    "prompt_eval_count", "prompt_eval_duration",
+    "eval_count", "eval_duration",
+    "done_reason",
+)
+
+# done_reason of a response that ran out of num_predict
+DONE_REASON_LENGTH = "length"
+
 class OllamaAPI:
-    def __init__(self, base_url="http://localhost:11434"):
-        self.base_url = base_url
-        self.config_file = "mokuro_translator_config.json"
+    def __init__(self, base_url: str | None = None, config: ConfigStore | None = None, backend: str | None = None):
+        """_summary_
+
+        Args:
+            base_url (str, optional): URL of the model server. Defaults to the saved one,
+                or the backend's default (Ollama on localhost:11434).
+            config (ConfigStore, optional): Shared config. Defaults to a new ConfigStore.
+            backend (str, optional): Server API, one of BACKENDS. Defaults to the saved one, or Ollama.
+        """
+        self.config = config if config is not None else ConfigStore()
+        self.config_file = self.config.path
         self.current_system_prompt = self._load_system_prompt()
+        # Server the requests go to; "Ollama" in the method names is historical
+        saved_backend, saved_url = self.load_backend()
+        backend = backend or saved_backend
+        self.backend = make_backend(backend, base_url or (saved_url if backend == saved_backend else None))
+        # Parsed /api/show metadata per model name, see model_catalog.parse_model_metadata
+        self.model_metadata = {}
+        # Metrics from the most recent generate() call (durations in nanoseconds, as Ollama reports them)
+        self.last_response_metrics = {}
+
+    @property
+    def base_url(self) -> str:
+        return self.backend.base_url
+
+    @base_url.setter
+    def base_url(self, base_url: str) -> None:
+        self.backend.base_url = base_url
+
+    @property
+    def circuit_breaker(self):
+        return self.backend.circuit_breaker
+
+    @property
+    def stall_seconds(self) -> float:
+        return self.backend.stall_seconds
+
+    @stall_seconds.setter
+    def stall_seconds(self, stall_seconds: float) -> None:
+        self.backend.stall_seconds = stall_seconds
 
     def check_connection(self) -> bool:
         """_summary_
 
         Raises:
-            RequestException: If the program fails to connect to the Ollama server
+            RequestException: If the program fails to connect to the server
 
         Returns:
             bool: Connection status
         """
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            response.raise_for_status()
-            return True
-        except requests.exceptions.RequestException as e:
-            e.add_note(f"Failed to connect to Ollama at {self.base_url}. Is it running?")
-            raise e
-        
-        return False
+        return self.backend.check_connection()
+
+    def list_models(self) -> list[dict]:
+        """List installed models with the details /api/tags reports (digest, size, details).
+
+        Returns:
+            list[dict]: One entry per model, as returned by Ollama (other backends return the same shape)
+        """
+        return self.backend.list_models()
 
     def get_models(self) -> list[str]:
         """_summary_
@@ -45,10 +132,7 @@ class OllamaAPI:
         Returns:
             list[str]: list of names of models
         """
-        response = requests.get(f"{self.base_url}/api/tags")
-        response.raise_for_status()
-        
-        return [model['name'] for model in response.json().get('models', [])]
+        return [model['name'] for model in self.list_models()]
 
     def get_model_info(self, model_name: str) -> dict:
         """Get detailed information about a specific model including context length.
@@ -57,22 +141,15 @@ class OllamaAPI:
             model_name (str): Name of the model to get info for
             
         Returns:
-            dict: Model information from Ollama
+            dict: Model information in the shape of Ollama's /api/show, {} if unavailable
         """
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/show",
-                json={"name": model_name},
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Could not get model info for {model_name}: {e}")
-            return {}
+        return self.backend.get_model_info(model_name)
 
     def get_model_max_context(self, model_name: str) -> int:
         """Get the maximum context length supported by a model.
+
+        The /api/show response is parsed once per model and cached for the
+        lifetime of this object.
         
         Args:
             model_name (str): Name of the model
@@ -80,144 +157,42 @@ class OllamaAPI:
         Returns:
             int: Maximum context length in tokens
         """
-        try:
-            model_info = self.get_model_info(model_name)
-            
-            # Try to extract context length from different possible locations
-            # Check parameters first
-            if 'parameters' in model_info:
-                params = model_info['parameters']
-                if 'num_ctx' in params:
-                    return int(params['num_ctx'])
-            
-            # Check modelfile content for num_ctx parameter
-            if 'modelfile' in model_info:
-                modelfile = model_info['modelfile']
-                import re
-                ctx_match = re.search(r'PARAMETER\s+num_ctx\s+(\d+)', modelfile, re.IGNORECASE)
-                if ctx_match:
-                    return int(ctx_match.group(1))
-            
-            # Check details section
-            if 'details' in model_info:
-                details = model_info['details']
-                if 'parameter_size' in details:
-                    # Estimate based on parameter size - this is a rough heuristic
-                    param_size = details['parameter_size']
-                    if '70B' in param_size or '65B' in param_size:
-                        return 32768  # Large models typically support more context
-                    elif '13B' in param_size or '7B' in param_size:
-                        return 8192   # Medium models
-                    else:
-                        return 4096   # Smaller models
-            
-            # Default fallback for unknown models
-            logging.info(f"Could not determine context length for {model_name}, using default 4096")
-            return 4096
-            
-        except Exception as e:
-            logging.warning(f"Error getting context length for {model_name}: {e}")
-            return 4096  # Safe default
+        if model_name not in self.model_metadata:
+            try:
+                self.model_metadata[model_name] = parse_model_metadata(self.get_model_info(model_name))
+            except Exception as e:
+                logging.warning(f"Error getting context length for {model_name}: {e}")
+                return 4096  # Safe default
+        
+        return self.model_metadata[model_name]["context_length"]
 
     def _load_system_prompt(self):
-        """Load system prompt from config file, or use default if not found."""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    return config.get('system_prompt', DEFAULT_TRANSLATION_SYSTEM_PROMPT)
-        except (json.JSONDecodeError, IOError) as e:
-            logging.warning(f"Could not load config file: {e}. Using default system prompt.")
-        
-        return DEFAULT_TRANSLATION_SYSTEM_PROMPT
+        """Load system prompt from config, or use default if not found."""
+        return self.config.get_str('system_prompt', DEFAULT_TRANSLATION_SYSTEM_PROMPT)
 
     def load_context_length(self):
-        """Load context length from config file, or use default if not found."""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    return config.get('context_length', 13000)
-        except (json.JSONDecodeError, IOError) as e:
-            logging.warning(f"Could not load config file: {e}. Using default context length.")
-        
-        return 13000
+        """Load context length from config, or use default if not found."""
+        return self.config.get_int('context_length', 13000)
 
     def save_context_length(self, context_length):
-        """Save context length to config file."""
-        try:
-            config = {}
-            if os.path.exists(self.config_file):
-                try:
-                    with open(self.config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                except (json.JSONDecodeError, IOError):
-                    config = {}
-            
-            config['context_length'] = context_length
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            
-            return True
-        except IOError as e:
-            logging.error(f"Could not save config file: {e}")
-            return False
+        """Save context length to config. The write to disk is debounced."""
+        self.config.set('context_length', int(context_length))
+        return True
 
     def load_temperature(self):
-        """Load temperature from config file, or use default if not found."""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    return config.get('temperature', 0.7)
-        except (json.JSONDecodeError, IOError) as e:
-            logging.warning(f"Could not load config file: {e}. Using default temperature.")
-        
-        return 0.7
+        """Load temperature from config, or use default if not found."""
+        return self.config.get_float('temperature', 0.7)
 
     def save_temperature(self, temperature):
-        """Save temperature to config file."""
-        try:
-            config = {}
-            if os.path.exists(self.config_file):
-                try:
-                    with open(self.config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                except (json.JSONDecodeError, IOError):
-                    config = {}
-            
-            config['temperature'] = temperature
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            
-            return True
-        except IOError as e:
-            logging.error(f"Could not save config file: {e}")
-            return False
+        """Save temperature to config. The write to disk is debounced."""
+        self.config.set('temperature', float(temperature))
+        return True
     
     def _save_system_prompt(self, prompt):
-        """Save system prompt to config file."""
-        try:
-            config = {}
-            if os.path.exists(self.config_file):
-                try:
-                    with open(self.config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                except (json.JSONDecodeError, IOError):
-                    config = {}
-            
-            config['system_prompt'] = prompt
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            
-            self.current_system_prompt = prompt
-            return True
-        except IOError as e:
-            logging.error(f"Could not save config file: {e}")
-            return False
+        """Save system prompt to config."""
+        self.config.set('system_prompt', prompt)
+        self.current_system_prompt = prompt
+        return True
     
     def get_system_prompt(self):
         """Get the current system prompt."""
@@ -228,94 +203,200 @@ class OllamaAPI:
         return self._save_system_prompt(prompt)
     
     def reset_to_default_prompt(self):
-        """Reset system prompt to default and remove from config."""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                
-                # Remove system_prompt from config
-                if 'system_prompt' in config:
-                    del config['system_prompt']
-                
-                # Save updated config or delete file if empty
-                if config:
-                    with open(self.config_file, 'w', encoding='utf-8') as f:
-                        json.dump(config, f, indent=2, ensure_ascii=False)
-                else:
-                    os.remove(self.config_file)
-            
-            self.current_system_prompt = DEFAULT_TRANSLATION_SYSTEM_PROMPT
-            return True
-        except (json.JSONDecodeError, IOError) as e:
-            logging.error(f"Could not reset system prompt: {e}")
-            return False
+        """Reset system prompt to default and remove it from config."""
+        self.config.delete('system_prompt')
+        self.current_system_prompt = DEFAULT_TRANSLATION_SYSTEM_PROMPT
+        return True
 
-    def generate(self, model, prompt, context_length=None, temperature=None):
-        try:
-            request_data = {
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": self.current_system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                "stream": False
-            }
-            
-            # Add options if specified
-            options = {}
-            if context_length and context_length > 0:
-                options["num_ctx"] = context_length
-                logging.debug(f"Setting context length to {context_length}")
-            
-            if temperature is not None:
-                options["temperature"] = temperature
-                logging.debug(f"Setting temperature to {temperature}")
-            
-            if options:
-                request_data["options"] = options
-            
-            logging.debug(f"Sending request: {json.dumps(request_data, indent=2)}")
-            
-            # Method 1: Using chat endpoint (RECOMMENDED)
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json=request_data,
-            )
-            response.raise_for_status()
-            
-            response_data = response.json()
-            logging.debug(f"Received response: {json.dumps(response_data, indent=2)}")
-            
-            return response_data['message']['content']
+    def load_structured_output(self):
+        """Load structured output toggle from config, or use default if not found."""
+        return self.config.get_bool('structured_output', False)
+
+    def save_structured_output(self, enabled):
+        """Save structured output toggle to config. The write to disk is debounced."""
+        self.config.set('structured_output', bool(enabled))
+        return True
+
+    def load_lazy_pages(self):
+        """Load the lazy page output toggle from config, or use default if not found."""
+        return self.config.get_bool('lazy_pages', False)
+
+    def save_lazy_pages(self, enabled):
+        """Save the lazy page output toggle to config. The write to disk is debounced."""
+        self.config.set('lazy_pages', bool(enabled))
+        return True
+
+    def load_keep_alive(self):
+        """Load the keep_alive duration used during jobs from config, or use default if not found."""
+        return self.config.get_str('keep_alive', DEFAULT_KEEP_ALIVE)
+
+    def save_keep_alive(self, keep_alive):
+        """Save the keep_alive duration to config. The write to disk is debounced."""
+        self.config.set('keep_alive', keep_alive)
+        return True
+
+    def load_think_mode(self):
+        """Load the think mode (one of THINK_MODES) from config, or use default if not found."""
+        think_mode = self.config.get_str('think_mode', THINK_MODE_DEFAULT)
+        return think_mode if think_mode in THINK_MODES else THINK_MODE_DEFAULT
+
+    def save_think_mode(self, think_mode):
+        """Save the think mode to config. The write to disk is debounced."""
+        self.config.set('think_mode', think_mode)
+        return True
+
+    def load_reasoning_budget(self):
+        """Load the per-request reasoning token budget from config, or use default if not found."""
+        return self.config.get_int('reasoning_budget', DEFAULT_REASONING_BUDGET)
+
+    def save_reasoning_budget(self, reasoning_budget):
+        """Save the reasoning token budget to config. The write to disk is debounced."""
+        self.config.set('reasoning_budget', reasoning_budget)
+        return True
+
+    def load_cap_output(self):
+        """Load whether num_predict is capped from the input length, or use default if not found."""
+        return self.config.get_bool('cap_output', True)
+
+    def save_cap_output(self, enabled):
+        """Save whether num_predict is capped. The write to disk is debounced."""
+        self.config.set('cap_output', bool(enabled))
+        return True
+
+    def load_backend(self):
+        """Load the server API (one of BACKENDS) and URL from config; the URL is "" if none was saved."""
+        backend = self.config.get_str('backend', BACKEND_OLLAMA)
+        return (backend if backend in BACKENDS else BACKEND_OLLAMA), self.config.get_str('backend_url', '')
+
+    def save_backend(self, backend, base_url):
+        """Save the server API and URL to config. The write to disk is debounced."""
+        self.config.set('backend', backend)
+        self.config.set('backend_url', base_url)
+        return True
+
+    def load_throughput_prior(self, model):
+        """Load the speed measured for a model in earlier jobs, or None if it has never run."""
+        priors = self.config.get('throughput_priors', {})
+        return priors.get(model) if isinstance(priors, dict) else None
+
+    def save_throughput_prior(self, model, prior):
+        """Save a model's measured speed for the next job's ETA. The write to disk is debounced."""
+        priors = self.config.get('throughput_priors', {})
+        priors = dict(priors) if isinstance(priors, dict) else {}
+        priors[model] = prior
+        self.config.set('throughput_priors', priors)
+        return True
+
+    def load_model(self, model: str, context_length: int | None = None, keep_alive: str | int = DEFAULT_KEEP_ALIVE) -> float:
+        """Preload a model into memory so the first real request doesn't pay the load time.
+
+        Ollama loads the model with the given num_ctx and keeps it resident for `keep_alive`;
+        servers that load their model at startup return immediately.
+
+        Args:
+            model (str): Name of the model to load
+            context_length (int, optional): num_ctx to load the model with. Defaults to None.
+            keep_alive (str | int, optional): How long to keep the model loaded. Defaults to DEFAULT_KEEP_ALIVE.
+
+        Raises:
+            RequestException: If the model could not be loaded
+
+        Returns:
+            float: Seconds the server reported spending on loading the model
+        """
+        return self.backend.load_model(model, context_length, keep_alive)
+
+    def unload_model(self, model: str) -> bool:
+        """Ask Ollama to evict a model from memory immediately.
+
+        Args:
+            model (str): Name of the model to unload
+
+        Returns:
+            bool: True if the server accepted the request
+        """
+        return self.backend.unload_model(model)
+
+    def supports_thinking(self, model: str) -> bool:
+        """True if the model's metadata lists Ollama's "thinking" capability."""
+        return "thinking" in (self.model_metadata.get(model) or {}).get("capabilities", [])
+
+    def _set_response_metrics(self, response_data: dict, monitor: GenerationMonitor | None) -> None:
+        self.last_response_metrics = {k: response_data[k] for k in RESPONSE_METRIC_FIELDS if k in response_data}
+        if monitor is not None:
+            reasoning, translation = monitor.token_split(response_data.get("eval_count"))
+            self.last_response_metrics["reasoning_tokens"] = reasoning
+            self.last_response_metrics["translation_tokens"] = translation
+
+    def generate(self, model, prompt, context_length=None, temperature=None, response_format=None, keep_alive=None,
+                 num_predict=None, think=None, monitor: GenerationMonitor | None = None, deadline: float | None = None):
+        """Send a prompt to the model server and return the response text.
+
+        While the backend's circuit breaker is open the request isn't sent at all.
+
+        Args:
+            model (str): Name of the model to use
+            prompt (str): User prompt
+            context_length (int, optional): num_ctx to request. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to None.
+            response_format (str | dict, optional): Value for Ollama's `format` field,
+                either "json" or a JSON schema such as TRANSLATION_RESPONSE_SCHEMA. Defaults to None.
+            keep_alive (str | int, optional): How long Ollama should keep the model loaded
+                after this request. Defaults to None (Ollama's default).
+            num_predict (int, optional): Maximum number of tokens to decode. Defaults to None.
+            think (bool, optional): Value for Ollama's `think` field; only send it for models
+                that support thinking. Defaults to None (the model's default).
+            monitor (GenerationMonitor, optional): If given, the response is streamed through
+                it so repetition loops abort the request early, stalls are detected and decode
+                tokens are split into reasoning and translation in last_response_metrics. Defaults to None.
+            deadline (float, optional): Seconds the whole request may take, see
+                deadlines.request_deadline. Defaults to DEFAULT_DEADLINE_SECONDS.
+
+        Raises:
+            RepetitionLoopError: If the monitor aborted the generation
+            RequestTimedOut: If the response didn't arrive before the deadline
+            RequestStalled: If a streamed response stopped sending data for stall_seconds
+            OllamaUnavailable: If the circuit breaker is open
+
+        Returns:
+            str: The model's response, or an "Error: ..." string if the request failed
+        """
+        import requests
+
+        # A failed request must not leave the previous response's metrics to be recorded again
+        self.last_response_metrics = {}
+        trial = self.circuit_breaker.check()
+        deadline_at = time.monotonic() + (deadline or DEFAULT_DEADLINE_SECONDS)
+
+        # Options use Ollama's names; other backends map them to their API
+        options = {}
+        if context_length and context_length > 0:
+            options["num_ctx"] = context_length
+            logging.debug(f"Setting context length to {context_length}")
         
+        if temperature is not None:
+            options["temperature"] = temperature
+            logging.debug(f"Setting temperature to {temperature}")
+        
+        if num_predict and num_predict > 0:
+            options["num_predict"] = num_predict
+        
+        if response_format is not None:
+            options["format"] = response_format
+        
+        if keep_alive is not None:
+            options["keep_alive"] = keep_alive
+        
+        if think is not None:
+            options["think"] = think
+        
+        try:
+            text, response_data = self.backend.generate(model, self.current_system_prompt, prompt, options,
+                                                        monitor, deadline_at)
         except requests.exceptions.RequestException as e:
-            # Fallback: Try generate endpoint with different format
-            try:
-                fallback_data = {
-                    "model": model,
-                    "prompt": f"System: {self.current_system_prompt}\n\nUser: {prompt}",
-                    "stream": False
-                }
-                
-                # Add options to fallback request too
-                options = {}
-                if context_length and context_length > 0:
-                    options["num_ctx"] = context_length
-                
-                if temperature is not None:
-                    options["temperature"] = temperature
-                
-                if options:
-                    fallback_data["options"] = options
-                
-                response = requests.post(
-                    f"{self.base_url}/api/generate",
-                    json=fallback_data
-                )
-                response.raise_for_status()
-                return response.json()['response']
-            except requests.exceptions.Timeout:
-                return "Error: Request to Ollama timed out."
-            except requests.exceptions.RequestException as e:
-                return f"Error: {e}"
+            return f"Error: {e}"
+        finally:
+            if trial:
+                self.circuit_breaker.end_trial()
+        self._set_response_metrics(response_data, monitor)
+        return text
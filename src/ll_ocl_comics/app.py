@@ -2,33 +2,75 @@
 import logging
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from tkinterdnd2 import DND_FILES, TkinterDnD
 import os
 import re
-from bs4 import BeautifulSoup
+import sqlite3
 import threading
+import time
+from contextlib import nullcontext
 
-from apis import OllamaAPI
-from mokuro_changes import (
-    PROPERTIES_JS_FUNC, LISTENER_JS_FUNC,
-    ALWAYS_SHOW_TRANSLATION_JS_FUNC, UPDATE_PAGE_JS_ORIGINAL,
-    UPDATE_PAGE_JS_FUNC,
+from apis import (
+    OllamaAPI, TRANSLATION_RESPONSE_SCHEMA, STRUCTURED_OUTPUT_INSTRUCTIONS, DEFAULT_KEEP_ALIVE,
+    THINK_MODES, THINK_MODE_DEFAULT, THINK_MODE_ON, THINK_MODE_OFF, DONE_REASON_LENGTH,
 )
-from helpers import remove_between_anchors
+from config import ConfigStore
+from model_catalog import ModelCatalog
+from helpers import remove_between_anchors, parse_structured_translations
+from logging_utils import TraceSpool
+from progress import ProgressBus, PROGRESS_FRAME_MS
+from textbox_filter import resolve_locally
+from sfx_lexicon import SfxLexicon
+from generation_budget import GenerationMonitor, RepetitionLoopError, estimate_num_predict
+from text_fit import fit_font_size, box_font_size, MIN_FONT_SIZE, MAX_FONT_SIZE
+from lazy_pages import dehydrate_pages
+from viewer_patch import PatchCache, patch_viewer
+from geometry import layout_textboxes, parse_box_style
+from rag_store import RagStore, RagFileRejected, RagFileTooLarge, rag_context_budget
+from textbox_store import TextboxStore
+from profiling import JobProfiler, PROFILE_SAMPLE
+from progress_model import GenerationProgress, ProgressModel, ThroughputEstimate, format_duration, PROMPT_TOKENS_PER_CHAR
+from deadlines import OllamaUnavailable, request_deadline
+from library_index import LibraryIndex
+from sidecar import sidecar_path_for, collect_source_texts, collect_translations, write_sidecar
+from routing import ModelRouter, ModelTier, FAST_TIER, FULL_TIER, DEFAULT_FAST_MAX_COMPLEXITY
 
 # Languages to translate from
 SOURCE_LANGUAGES = [
     "Japanese", "Korean", "Thai",
 ]
 
-class MokuroTranslator(TkinterDnD.Tk):
-    def __init__(self, ollama_base_url: str = "http://localhost:11434"):
+# Fast model menu entry that turns tiered routing off
+FAST_MODEL_DISABLED = "(disabled)"
+
+# Finish startup this long after the window is created even if it never reports being mapped
+STARTUP_FALLBACK_MS = 1000
+
+# Expected story summary length for its ETA: an overview plus a few lines per page
+SUMMARY_BASE_TOKENS = 400
+SUMMARY_TOKENS_PER_PAGE = 60
+
+class MokuroTranslator(tk.Tk):
+    def __init__(self, ollama_base_url: str | None = None, profile_mode: str | None = None,
+                 started_at: float | None = None, startup_benchmark: os.PathLike | None = None,
+                 backend: str | None = None):
         """_summary_
 
         Args:
-            ollama_base_url (str, optional): The base URL for all ollama requests.
-                Should include a port. Defaults to "http://localhost:11434".
+            ollama_base_url (str, optional): The base URL for all model server requests.
+                Should include a port. Defaults to the saved URL, or "http://localhost:11434".
+            profile_mode (str, optional): Profile every job with this profiler mode
+                (one of PROFILE_MODES), regardless of the saved setting. Defaults to None.
+            started_at (float, optional): time.perf_counter() when the process started, so startup
+                timings include interpreter and import time. Defaults to when this is called.
+            startup_benchmark (os.PathLike, optional): Append the startup timings to this JSON lines
+                file and close the window as soon as it is interactive. Defaults to None.
+            backend (str, optional): Model server API, one of BACKENDS; given with or without
+                ollama_base_url, it replaces the saved choice. Defaults to None (the saved one).
         """
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.startup_benchmark = startup_benchmark
+        self.startup_timings = {}
+        self._startup_finished = False
         super().__init__()
         self.title("Mokuro Translator")
         self.resizable(True, True)
@@ -42,13 +84,26 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.thinking_anchor = tk.StringVar(value="think")
         self.context_length = tk.IntVar(value=13000)
         self.temperature = tk.DoubleVar(value=0.7)
+        self.structured_output = tk.BooleanVar(value=False)
+        
+        # RAG context files: memory-mapped and indexed in the background, refreshing the list when done
+        self.rag_store = RagStore(on_change=lambda: self._update_gui(self.update_rag_display))
         
-        # RAG context files storage
-        self.rag_files = []  # List of dictionaries with 'path' and 'content' keys
-        self.rag_content_cache = ""  # Cached formatted RAG content
+        # Config is read once here and shared; slider changes are written back debounced
+        self.config_store = ConfigStore()
+        self.ollama_api = OllamaAPI(ollama_base_url, config=self.config_store, backend=backend)
+        self.ollama_base_url = self.ollama_api.base_url
+        if backend or ollama_base_url:
+            self.ollama_api.save_backend(self.ollama_api.backend.name, self.ollama_base_url)
         
-        self.ollama_api = OllamaAPI()
-        self.ollama_base_url = ollama_base_url
+        # Last-known models and their metadata, refreshed in the background at startup
+        self.model_catalog = ModelCatalog(self.ollama_api)
+
+        # Patched viewer CSS/JS cache, library index and SFX lexicon are only needed by jobs,
+        # so they're opened once the window has painted (see _finish_startup)
+        self.patch_cache = None
+        self.library_index = None
+        self.sfx_lexicon = None
         
         # Load saved context length, but only if it exists and is different from default
         saved_context_length = self.ollama_api.load_context_length()
@@ -59,9 +114,52 @@ class MokuroTranslator(TkinterDnD.Tk):
         # Load saved temperature
         saved_temperature = self.ollama_api.load_temperature()
         self.temperature.set(saved_temperature)
+        
+        # Load saved structured output toggle
+        self.structured_output.set(self.ollama_api.load_structured_output())
+        
+        # How long Ollama keeps the model resident between requests during a job
+        self.keep_alive = tk.StringVar(value=self.ollama_api.load_keep_alive())
+        
+        # Decode budget: Ollama think mode, tokens allowed for reasoning, and whether to cap num_predict
+        self.think_mode = tk.StringVar(value=self.ollama_api.load_think_mode())
+        self.reasoning_budget = tk.IntVar(value=self.ollama_api.load_reasoning_budget())
+        self.cap_output = tk.BooleanVar(value=self.ollama_api.load_cap_output())
+        
+        # Output mode that keeps only the current page and its neighbours in the viewer's DOM
+        self.lazy_pages = tk.BooleanVar(value=self.ollama_api.load_lazy_pages())
+        
+        # Per-job stage timings and stack profile, written to <output dir>/profiles
+        self.profile_mode = profile_mode or self.config_store.get_str('profile_mode', PROFILE_SAMPLE)
+        self.profile_jobs = tk.BooleanVar(value=profile_mode is not None or self.config_store.get_bool('profile_jobs', False))
+        self.profiler = None
+        
+        # Optional fast tier for dialogue-light pages, with its own num_ctx and temperature
+        self.fast_model_name = tk.StringVar(value=self.config_store.get_str('fast_model', FAST_MODEL_DISABLED))
+        self.fast_context_length = tk.IntVar(value=self.config_store.get_int('fast_context_length', 4096))
+        self.fast_temperature = tk.DoubleVar(value=self.config_store.get_float('fast_temperature', 0.3))
+        # Older configs saved the same threshold as fast_max_chars
+        self.fast_max_complexity = tk.IntVar(value=self.config_store.get_int(
+            'fast_max_complexity', self.config_store.get_int('fast_max_chars', DEFAULT_FAST_MAX_COMPLEXITY)))
+        self.model_router = None
+        
+        # Models pinned for the running job, and its load/request metrics
+        self.job_models = []
+        self.job_keep_alive = None
+        self.job_metrics = {}
+        
+        # Measured speed of the job's models and the ETA built on it
+        self.throughput_estimates = {}
+        self.progress_model = None
 
         self.is_translating = threading.Lock()
         self.translation_thread = None
+        
+        # Per-job trace file for full request/response payloads (created in start_translation)
+        self.trace_spool = None
+        
+        # Workers publish progress here; the main loop applies it at a fixed frame rate
+        self.progress_bus = ProgressBus()
 
         self.create_widgets()
         
@@ -69,6 +167,41 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.update_context_label()
         self.update_temperature_label()
 
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        self.after(PROGRESS_FRAME_MS, self._drain_progress)
+        
+        # Everything not needed to draw the window waits until it has been painted once
+        self.bind("<Map>", self._on_first_map, add="+")
+        self.after(STARTUP_FALLBACK_MS, self._finish_startup)
+
+    def _on_first_map(self, event) -> None:
+        # <Map> on the root is also delivered for every child widget
+        if event.widget is self and not self._startup_finished:
+            self.startup_timings.setdefault("first_paint_seconds", time.perf_counter() - self.started_at)
+            # Idle callbacks run after the redraws the map queued
+            self.after_idle(self._finish_startup)
+
+    def _finish_startup(self) -> None:
+        """Do the startup work that isn't needed to draw the window: drag and drop, the job caches
+        and the model list. Runs once, after the first paint (or after STARTUP_FALLBACK_MS if the
+        window manager never reports it)."""
+        if self._startup_finished:
+            return
+        self._startup_finished = True
+        self.startup_timings.setdefault("first_paint_seconds", time.perf_counter() - self.started_at)
+        
+        self.enable_drag_and_drop()
+        
+        # Patched viewer CSS/JS per mokuro release, shared by every file and run
+        self.patch_cache = PatchCache()
+        
+        # Full-text index of every translated volume, updated as files are saved
+        self.library_index = LibraryIndex()
+        
+        # Sound effects that are translated by dictionary lookup instead of the model
+        self.sfx_lexicon = SfxLexicon()
+        
         # populate LLMs
         try:
             self.populate_models()
@@ -76,14 +209,63 @@ class MokuroTranslator(TkinterDnD.Tk):
             self.model_name.set("Error fetching models")
             messagebox.showerror("Error", f"Could not fetch Ollama models: {e}")
         
-        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.startup_timings["interactive_seconds"] = time.perf_counter() - self.started_at
+        logging.info(f"Startup: first paint after {self.startup_timings['first_paint_seconds']:.3f}s, "
+                     f"interactive after {self.startup_timings['interactive_seconds']:.3f}s")
+        
+        if self.startup_benchmark:
+            self.write_startup_benchmark(self.startup_benchmark)
+            self.after_idle(self.on_closing)
+
+    def enable_drag_and_drop(self) -> None:
+        """Load the tkdnd extension and make the RAG box a drop target.
+        
+        Importing tkinterdnd2 adds the drag and drop methods to every widget, so this works on a
+        plain tk.Tk root. If tkdnd can't be loaded the RAG box says so and files can't be dropped.
+        """
+        try:
+            from tkinterdnd2 import DND_FILES, TkinterDnD
+            TkinterDnD._require(self)
+        except (ImportError, RuntimeError) as e:
+            logging.warning(f"Drag and drop is unavailable: {e}")
+            self.rag_drop_label.config(text="Drag and drop is unavailable\n(tkinterdnd2 could not be loaded)")
+            return
+        
+        self.rag_drop_area.drop_target_register(DND_FILES)
+        self.rag_drop_area.dnd_bind('<<Drop>>', self.on_rag_files_dropped)
+        self.rag_drop_area.dnd_bind('<<DragEnter>>', self.on_rag_drag_enter)
+        self.rag_drop_area.dnd_bind('<<DragLeave>>', self.on_rag_drag_leave)
+
+    def write_startup_benchmark(self, path: os.PathLike) -> None:
+        """Append this run's startup timings to a JSON lines file.
+
+        Args:
+            path (os.PathLike): File to append to. Created if it doesn't exist.
+        """
+        import json
+        import platform
+        
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            **{key: round(value, 4) for key, value in self.startup_timings.items()},
+        }
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except IOError as e:
+            logging.error(f"Could not write startup benchmark to {path}: {e}")
 
     def on_closing(self):
         if self.is_translating.locked():
             if messagebox.askokcancel("Quit", "Translation in progress. Are you sure you want to quit?"):
                 self.is_translating.release()
+                self.config_store.flush()
+                for model in self.job_models:
+                    self.ollama_api.unload_model(model)
                 self.destroy()
         else:
+            self.config_store.flush()
             self.destroy()
 
     def create_widgets(self):
@@ -104,6 +286,37 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.model_menu = ttk.OptionMenu(model_frame, self.model_name, "Select a model")
         self.model_menu.pack(fill="x", expand=True, padx=5, pady=5)
 
+        self.model_info_label = ttk.Label(model_frame, text="")
+        self.model_info_label.pack(fill="x", expand=True, padx=5)
+
+        # Fast tier for dialogue-light pages
+        fast_frame = ttk.LabelFrame(main_frame, text="Fast Model (short pages, escalates to the model above on failure)")
+        fast_frame.pack(fill="x", expand=True, pady=5)
+
+        self.fast_model_menu = ttk.OptionMenu(fast_frame, self.fast_model_name, self.fast_model_name.get(), FAST_MODEL_DISABLED)
+        self.fast_model_menu.pack(fill="x", expand=True, padx=5, pady=5)
+
+        fast_options_frame = ttk.Frame(fast_frame)
+        fast_options_frame.pack(fill="x", expand=True, padx=5, pady=(0, 5))
+
+        for label_text, variable in (("Max page complexity:", self.fast_max_complexity),
+                                     ("Context:", self.fast_context_length),
+                                     ("Temperature:", self.fast_temperature)):
+            ttk.Label(fast_options_frame, text=label_text).pack(side="left")
+            ttk.Entry(fast_options_frame, width=7, textvariable=variable).pack(side="left", padx=(5, 10))
+
+        ttk.Label(fast_frame, text="Page complexity counts each kana once and each kanji twice.").pack(
+            fill="x", expand=True, padx=5, pady=(0, 5))
+
+        keep_alive_frame = ttk.Frame(model_frame)
+        keep_alive_frame.pack(fill="x", expand=True, padx=5, pady=(0, 5))
+
+        keep_alive_label = ttk.Label(keep_alive_frame, text="Keep loaded during job (e.g. 30m, 1h, -1):")
+        keep_alive_label.pack(side="left")
+
+        keep_alive_entry = ttk.Entry(keep_alive_frame, width=8, textvariable=self.keep_alive)
+        keep_alive_entry.pack(side="left", padx=(5, 0))
+
         # Temperature Configuration
         temp_frame = ttk.LabelFrame(main_frame, text="Temperature (creativity)")
         temp_frame.pack(fill="x", expand=True, pady=5)
@@ -128,6 +341,31 @@ class MokuroTranslator(TkinterDnD.Tk):
         think_entry = ttk.Entry(think_frame, width=20, textvariable=self.thinking_anchor)
         think_entry.pack(fill="x", expand=True, pady=10)
 
+        # Structured output option
+        structured_check = ttk.Checkbutton(
+            think_frame,
+            text="Structured JSON output (send a format schema to Ollama)",
+            variable=self.structured_output,
+            command=self.on_structured_output_change
+        )
+        structured_check.pack(fill="x", expand=True, padx=5, pady=(0, 5))
+
+        # Reasoning and output budget options
+        budget_frame = ttk.Frame(think_frame)
+        budget_frame.pack(fill="x", expand=True, padx=5, pady=(0, 5))
+
+        ttk.Label(budget_frame, text="Think mode:").pack(side="left")
+        ttk.OptionMenu(budget_frame, self.think_mode, self.think_mode.get(), *THINK_MODES).pack(side="left", padx=(5, 10))
+
+        ttk.Label(budget_frame, text="Reasoning budget (tokens):").pack(side="left")
+        ttk.Entry(budget_frame, width=7, textvariable=self.reasoning_budget).pack(side="left", padx=(5, 10))
+
+        ttk.Checkbutton(
+            budget_frame,
+            text="Cap output length from input",
+            variable=self.cap_output
+        ).pack(side="left")
+
         # Context Length Configuration
         context_frame = ttk.LabelFrame(main_frame, text="Context Length (tokens)")
         context_frame.pack(fill="x", expand=True, pady=5)
@@ -159,6 +397,21 @@ class MokuroTranslator(TkinterDnD.Tk):
         out_dir_button = ttk.Button(out_dir_frame, text="Select Output Directory", command=self.set_output_dir)
         out_dir_button.pack(fill="x", expand=True, pady=10)
 
+        lazy_pages_check = ttk.Checkbutton(
+            out_dir_frame,
+            text="Lazy page loading (for long volumes and low-memory e-readers)",
+            variable=self.lazy_pages,
+            command=self.on_lazy_pages_change
+        )
+        lazy_pages_check.pack(fill="x", expand=True, padx=5, pady=(0, 5))
+
+        ttk.Checkbutton(
+            out_dir_frame,
+            text="Profile jobs (stage timings and stack samples in <output>/profiles)",
+            variable=self.profile_jobs,
+            command=self.on_profile_jobs_change
+        ).pack(fill="x", expand=True, padx=5, pady=(0, 5))
+
         # System Prompt Configuration
         prompt_frame = ttk.LabelFrame(main_frame, text="System Prompt")
         prompt_frame.pack(fill="x", expand=True, pady=5)
@@ -204,12 +457,6 @@ class MokuroTranslator(TkinterDnD.Tk):
                                         bg="#f0f0f0", fg="#28a745", font=("Arial", 9, "bold"))
         self.rag_status_label.pack()
 
-        # Configure drag and drop
-        self.rag_drop_area.drop_target_register(DND_FILES)
-        self.rag_drop_area.dnd_bind('<<Drop>>', self.on_rag_files_dropped)
-        self.rag_drop_area.dnd_bind('<<DragEnter>>', self.on_rag_drag_enter)
-        self.rag_drop_area.dnd_bind('<<DragLeave>>', self.on_rag_drag_leave)
-
         # File list and controls
         rag_controls_frame = ttk.Frame(rag_frame)
         rag_controls_frame.pack(fill="x", padx=5, pady=5)
@@ -254,28 +501,52 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.last_translation_label.pack(fill="x", expand=True, pady=5)
 
     def populate_models(self) -> None:
-        connected = self.ollama_api.check_connection()
-        if not connected:
-            raise RuntimeError("Could not connect to Ollama.")
+        """Show the last-known model list immediately and refresh it from Ollama in the background."""
+        cached_names = self.model_catalog.model_names()
+        if cached_names:
+            self.set_model_list(cached_names)
         
+        refresh_thread = threading.Thread(target=self.refresh_model_catalog, daemon=True)
+        refresh_thread.start()
+
+    def refresh_model_catalog(self) -> None:
+        """Fetch the model list and metadata from Ollama. Runs on a background thread."""
         try:
-            model_names = self.ollama_api.get_models()
+            self.ollama_api.check_connection()
+            model_names = self.model_catalog.refresh()
         except Exception as e:
-            messagebox.showerror("Error", f"Could not fetch Ollama models: {e}")
+            logging.warning(f"Could not refresh Ollama models: {e}")
+            if not self.model_catalog.model_names():
+                self._update_gui(self.model_name.set, "Error fetching models")
+                self._update_gui(messagebox.showerror, "Error", f"Could not fetch Ollama models: {e}")
             return
-        else:
-            if not model_names or len(model_names) < 1:
-                messagebox.showerror("Error", "Did not fetch any Ollama models.")
-                return
+        
+        if not model_names:
+            self._update_gui(messagebox.showerror, "Error", "Did not fetch any Ollama models.")
+            return
+        
+        self._update_gui(self.set_model_list, model_names)
 
-        self.model_name.set(model_names[0])
+    def set_model_list(self, model_names: list[str]) -> None:
+        """Fill the model menu, keeping the current selection if it is still installed."""
         menu = self.model_menu["menu"]
         menu.delete(0, "end")
         for name in model_names:
             menu.add_command(label=name, command=lambda value=name: self.on_model_selection(value))
         
-        # Set up initial model context length
-        if model_names:
+        fast_menu = self.fast_model_menu["menu"]
+        fast_menu.delete(0, "end")
+        for name in [FAST_MODEL_DISABLED] + model_names:
+            fast_menu.add_command(label=name, command=lambda value=name: self.fast_model_name.set(value))
+        if self.fast_model_name.get() not in model_names:
+            self.fast_model_name.set(FAST_MODEL_DISABLED)
+        
+        current = self.model_name.get()
+        if current in model_names:
+            # Metadata may have arrived with the refresh
+            self.update_model_info_label()
+        else:
+            # Set up initial model context length
             self.on_model_selection(model_names[0])
 
     def on_model_selection(self, model_name):
@@ -283,12 +554,27 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.model_name.set(model_name)
         
         if model_name and model_name != "Select a model":
-            # Set to 13,000 tokens (slider max is now hardcoded to 32,768)
+            # Set to 13,000 tokens (slider max is now hardcoded to 32,768), or less if the model can't handle it
             target_context = 13000
+            metadata = self.model_catalog.get_metadata(model_name)
+            if metadata:
+                target_context = min(target_context, metadata["context_length"])
             self.context_length.set(target_context)
             self.update_context_label()
+            self.update_model_info_label()
             logging.info(f"Model {model_name} selected, context set to: {target_context}")
 
+    def update_model_info_label(self):
+        """Show the cached metadata for the selected model."""
+        metadata = self.model_catalog.get_metadata(self.model_name.get())
+        if not metadata:
+            self.model_info_label.config(text="")
+            return
+        
+        parts = [metadata["family"], metadata["parameter_size"], metadata["quantization"],
+                 f"max context {metadata['context_length']}"]
+        self.model_info_label.config(text=" · ".join(part for part in parts if part))
+
     def on_context_change(self, value):
         """Called when context length slider changes."""
         context_value = int(float(value))
@@ -317,6 +603,18 @@ class MokuroTranslator(TkinterDnD.Tk):
         temp_value = self.temperature.get()
         self.temp_label.config(text=f"Temperature: {temp_value}")
 
+    def on_structured_output_change(self):
+        """Called when the structured output checkbox is toggled."""
+        self.ollama_api.save_structured_output(self.structured_output.get())
+
+    def on_lazy_pages_change(self):
+        """Called when the lazy page loading checkbox is toggled."""
+        self.ollama_api.save_lazy_pages(self.lazy_pages.get())
+
+    def on_profile_jobs_change(self):
+        """Called when the profiling checkbox is toggled."""
+        self.config_store.set('profile_jobs', self.profile_jobs.get())
+
     def set_input_dir(self) -> os.PathLike:
         self.input_dir.set(filedialog.askdirectory(mustexist=True, title="Select File Input Path", initialdir=self.input_dir.get()))
 
@@ -327,57 +625,317 @@ class MokuroTranslator(TkinterDnD.Tk):
         return [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(".html")]
 
     def count_pages_in_files(self, filenames: list[os.PathLike]) -> int:
-        total_pages = 0
+        return sum(len(page_chars) for page_chars in self.collect_page_workloads(filenames))
+
+    def collect_page_workloads(self, filenames: list[os.PathLike]) -> list[list[int]]:
+        """Source characters each page will send to the model, per file.
+
+        Textboxes that are resolved without the model (punctuation, numbers, Latin
+        text) don't count, so a page of sound effects weighs less than a page of dialogue.
+
+        Returns:
+            list[list[int]]: One list per file with a character count per page
+        """
+        from bs4 import BeautifulSoup
+
+        workloads = []
         for filename in filenames:
             with open(filename, 'r', encoding='utf-8') as f:
                 soup = BeautifulSoup(f, 'lxml')
-                total_pages += len(soup.find_all('div', class_='pageContainer'))
-                
-        return total_pages
+            page_chars = []
+            for page_container in soup.find_all('div', class_='pageContainer'):
+                texts = (self.extract_textbox_text(textbox) for textbox in page_container.find_all('div', class_='textBox'))
+                page_chars.append(sum(len(text) for text in texts if text.strip() and resolve_locally(text) is None))
+            workloads.append(page_chars)
+        return workloads
 
     def start_translation(
             self,
             filepaths: list[os.PathLike],
             output_dir: os.PathLike,
-            total_pages: int | str = "?"
+            total_pages: int | str = "?",
+            page_workloads: list[list[int]] | None = None
         ):
         # block until lock is available
         self.is_translating.acquire()
+        try:
+            self._publish_progress("line_count", text=f"0/{total_pages}")
+
+            self.trace_spool = TraceSpool(os.path.join(output_dir, "traces"))
+            logging.info("Writing request/response traces to %s", self.trace_spool.current_path)
 
-        self._update_gui(self.line_count_label.config, {"text": f"0/{total_pages}"})
+            self._start_profiler()
+            self._start_model_job(self.model_name.get(), use_fast_tier=True)
+
+            # Pages are weighted by the text they send; without a pre-scan every page counts the same
+            if page_workloads is None:
+                page_workloads = [[1] * total_pages] if isinstance(total_pages, int) else [[] for _ in filepaths]
+            self.progress_model = ProgressModel(
+                [chars for page_chars in page_workloads for chars in page_chars],
+                self.throughput_estimates[self.model_router.full_tier.model]
+            )
+            logging.info("Estimated time for %d pages: %s",
+                         self.progress_model.total_pages, format_duration(self.progress_model.snapshot()["eta_seconds"]))
 
-        pages_processed = 0
-        global_textbox_counter = 0  # Global counter across all files
+            pages_processed = 0
+            page_offset = 0
+            global_textbox_counter = 0  # Global counter across all files
+            # File the job stopped at when the server stopped answering, if it did
+            stopped_at = None
         
-        for filepath in filepaths:
-            filename = os.path.basename(filepath)
-            self._update_gui(self.status_label.config, {"text": f"Translating {filename}..."})
+            for filepath, page_chars in zip(filepaths, page_workloads):
+                filename = os.path.basename(filepath)
+                self._publish_progress("status", text=f"Translating {filename}...")
+                try:
+                    out_path = os.path.join(output_dir, filename)
+                    with self._stage("translate_file"):
+                        translated_html, pages_processed, global_textbox_counter = self.translate_file(
+                            filepath, pages_processed, total_pages, global_textbox_counter, self.thinking_anchor.get(),
+                            sidecar_path=sidecar_path_for(out_path), page_offset=page_offset
+                        )
+                except OllamaUnavailable as e:
+                    logging.error(f"Stopping the job: {e}")
+                    self._update_gui(messagebox.showerror, "Error", f"Stopped translating at {filename}: {e}")
+                    stopped_at = filename
+                    break
+                except Exception as e:
+                    logging.error(e)
+                    self._update_gui(messagebox.showerror, "Error", f"Failed to translate {filename}: {e}")
+                else:
+                    with self._stage("save"):
+                        self.save_translated_file(translated_html, out_path)
+                    from reader_server import record_source_directory
+                    try:
+                        record_source_directory(output_dir, os.path.dirname(os.path.abspath(filepath)))
+                    except IOError as e:
+                        logging.warning(f"Could not record where the images of {filename} are: {e}")
+                # Pages of a file that failed won't be retried; take them out of the ETA
+                for page_index in range(page_offset, page_offset + len(page_chars)):
+                    self.progress_model.page_done(page_index)
+                page_offset += len(page_chars)
+
+            if stopped_at is not None:
+                # The remaining files weren't translated; the error dialog has already said why
+                self._publish_progress("status", text=f"Translation stopped at {stopped_at}. {self._format_job_metrics()}")
+            else:
+                self._publish_progress("progress", value=100)
+                self._publish_progress("status", text=f"Translation complete. {self._format_job_metrics()}")
+                self._update_gui(messagebox.showinfo, "Success", "All pages have been translated.")
+        except Exception as e:
+            logging.error(f"Translation job failed: {e}")
+            self._publish_progress("status", text="Translation failed.")
+            self._update_gui(messagebox.showerror, "Error", f"Translation failed: {e}")
+        finally:
+            # Whatever stopped the job, leave the GUI able to start the next one
+            if self.trace_spool is not None:
+                self.trace_spool.close()
+                self.trace_spool = None
+            if self.progress_model is not None:
+                logging.info(self.progress_model.format_log_line())
+                self.progress_model = None
+            self._finish_model_job()
+            self._finish_profiler(output_dir, "translation")
+            self._update_gui(self.start_button.config, {"state": "normal"})
+            # on_closing may already have released it
+            if self.is_translating.locked():
+                self.is_translating.release()
+
+    def _build_model_router(self, model: str, use_fast_tier: bool = True) -> ModelRouter:
+        """Build the job's router from the GUI settings and remember the fast tier settings.
+
+        Args:
+            model (str): Model for the full tier
+            use_fast_tier (bool, optional): Add the fast tier if one is selected. Defaults to True.
+
+        Returns:
+            ModelRouter: Router with a full tier and, if configured, a fast tier
+        """
+        full_tier = ModelTier(FULL_TIER, model, self.context_length.get(), self.temperature.get())
+        fast_model = self.fast_model_name.get()
+        if not use_fast_tier or fast_model in ("", FAST_MODEL_DISABLED) or fast_model == model:
+            return ModelRouter(full_tier)
+
+        try:
+            fast_tier = ModelTier(FAST_TIER, fast_model, self.fast_context_length.get(), self.fast_temperature.get())
+            max_complexity = self.fast_max_complexity.get()
+        except tk.TclError as e:
+            logging.warning("Invalid fast model settings, using %s for every page: %s", model, e)
+            return ModelRouter(full_tier)
+
+        self.config_store.set('fast_model', fast_model)
+        self.config_store.set('fast_context_length', fast_tier.context_length)
+        self.config_store.set('fast_temperature', fast_tier.temperature)
+        self.config_store.set('fast_max_complexity', max_complexity)
+        return ModelRouter(full_tier, fast_tier, max_complexity=max_complexity)
+
+    def _start_model_job(self, model: str, use_fast_tier: bool = False) -> None:
+        """Warm up the job's models so load time is paid once, before the first page.
+
+        Each tier's model is loaded with its num_ctx and pinned for the configured keep_alive;
+        every request in the job repeats that keep_alive so Ollama doesn't evict it between pages.
+
+        Args:
+            model (str): Name of the model the job will use
+            use_fast_tier (bool, optional): Also route short pages to the fast model. Defaults to False.
+        """
+        self.model_router = self._build_model_router(model, use_fast_tier)
+        self.job_models = []
+        self.throughput_estimates = {
+            tier.model: ThroughputEstimate(self.ollama_api.load_throughput_prior(tier.model))
+            for tier in self.model_router.tiers
+        }
+        self.job_keep_alive = self.keep_alive.get().strip() or DEFAULT_KEEP_ALIVE
+        # Ollama treats numeric keep_alive values as seconds
+        if self.job_keep_alive.lstrip('-').isdigit():
+            self.job_keep_alive = int(self.job_keep_alive)
+        self.ollama_api.save_keep_alive(str(self.job_keep_alive))
+        self.job_metrics = {
+            "model_load_seconds": 0.0, "requests": 0, "request_load_seconds": 0.0,
+            "local_textboxes": 0, "sfx_textboxes": 0, "skipped_requests": 0,
+            "fast_tier_pages": 0, "escalations": 0,
+            "reasoning_tokens": 0, "translation_tokens": 0, "loop_aborts": 0, "truncated_responses": 0,
+        }
+        # The lexicon lives as long as the app; its stats are reported per job
+        self.sfx_lexicon.reset_stats()
+        self.ollama_api.save_think_mode(self.think_mode.get())
+        self.ollama_api.save_cap_output(self.cap_output.get())
+        try:
+            self.ollama_api.save_reasoning_budget(self.reasoning_budget.get())
+        except tk.TclError as e:
+            logging.warning("Invalid reasoning budget, using the saved one: %s", e)
+            self.reasoning_budget.set(self.ollama_api.load_reasoning_budget())
+
+        for tier in self.model_router.tiers:
+            self.job_models.append(tier.model)
+            self._publish_progress("status", text=f"Loading model {tier.model}...")
             try:
-                translated_html, pages_processed, global_textbox_counter = self.translate_file(
-                    filepath, pages_processed, total_pages, global_textbox_counter, self.thinking_anchor.get()
-                )
+                with self._stage("load_model"):
+                    load_seconds = self.ollama_api.load_model(tier.model, tier.context_length, self.job_keep_alive)
             except Exception as e:
-                logging.error(e)
-                self._update_gui(messagebox.showerror, "Error", f"Failed to translate {filename}: {e}")
-            else:
-                out_path = os.path.join(output_dir, filename)
-                self.save_translated_file(translated_html, out_path)
+                # Not fatal: the first request will load the model instead
+                logging.warning("Could not warm up model %s: %s", tier.model, e)
+                continue
+
+            self.job_metrics["model_load_seconds"] += load_seconds
+            logging.info("Model %s loaded in %.1fs (keep_alive=%s)", tier.model, load_seconds, self.job_keep_alive)
+
+    def _count_job_metric(self, name: str, amount: int = 1) -> None:
+        """Add `amount` to a counter in the running job's metrics."""
+        self.job_metrics[name] = self.job_metrics.get(name, 0) + amount
+
+    def _record_request_metrics(self, model: str | None = None, source_chars: int = 0) -> None:
+        """Add the metrics of the last Ollama response to the running job's totals.
+
+        Args:
+            model (str, optional): Model that answered; its speed estimate learns from the timings. Defaults to None.
+            source_chars (int, optional): Source characters the request sent. Defaults to 0.
+        """
+        metrics = self.ollama_api.last_response_metrics
+        if model in self.throughput_estimates:
+            self.throughput_estimates[model].observe(metrics, source_chars)
+        self.job_metrics["requests"] = self.job_metrics.get("requests", 0) + 1
+        self.job_metrics["request_load_seconds"] = (
+            self.job_metrics.get("request_load_seconds", 0.0) + metrics.get("load_duration", 0) / 1e9
+        )
+        if "reasoning_tokens" in metrics:
+            self._count_job_metric("reasoning_tokens", metrics["reasoning_tokens"])
+            self._count_job_metric("translation_tokens", metrics["translation_tokens"])
+            logging.info("Decode tokens: %d reasoning, %d translation",
+                         metrics["reasoning_tokens"], metrics["translation_tokens"])
+
+    def _generation_budget(self, model: str, textbox_texts: list[str], anchor: str | None) -> tuple[int | None, bool | None]:
+        """num_predict and think values for a translation request.
+
+        Args:
+            model (str): Model the request goes to
+            textbox_texts (list[str]): Source text of every textbox in the request
+            anchor (str | None): Thinking block tag name the system prompt may ask for
+
+        Returns:
+            tuple[int | None, bool | None]: (num_predict, think); None leaves the Ollama default
+        """
+        think_mode = self.think_mode.get()
+        think = None
+        if think_mode != THINK_MODE_DEFAULT and self.ollama_api.supports_thinking(model):
+            think = think_mode == THINK_MODE_ON
+
+        if not self.cap_output.get():
+            return None, think
+
+        # Leave room for reasoning unless it's off both in Ollama and in the system prompt
+        reasoning_expected = think_mode != THINK_MODE_OFF or (
+            anchor and f"<{anchor}>" in self.ollama_api.get_system_prompt()
+        )
+        try:
+            reasoning_budget = self.reasoning_budget.get() if reasoning_expected else 0
+        except tk.TclError:
+            reasoning_budget = self.ollama_api.load_reasoning_budget()
+        source_chars = sum(len(text) for text in textbox_texts)
+        return estimate_num_predict(source_chars, len(textbox_texts), reasoning_budget), think
 
-        self._update_gui(self.progress.config, {"value": 100})
-        self._update_gui(self.status_label.config, {"text": "Translation complete."})
-        self._update_gui(messagebox.showinfo, "Success", "All pages have been translated.")
-        self._update_gui(self.start_button.config, {"state": "normal"})
+    def _request_deadline(self, model: str, prompt: str, output_tokens: int) -> float:
+        """Seconds a request to `model` may take, from its measured speed and the request's size.
 
-        self.is_translating.release()
+        Args:
+            model (str): Model the request goes to
+            prompt (str): User prompt as sent, RAG context included
+            output_tokens (int): Tokens the response is expected to decode, reasoning included
 
-    def start_translation_thread(self, filepaths: os.PathLike, output_dir: os.PathLike, total_text_boxes: int | str = "?"):
-        thread = threading.Thread(target=self.start_translation, args=(filepaths, self.output_dir.get(), total_text_boxes))
+        Returns:
+            float: Deadline for OllamaAPI.generate
+        """
+        estimate = self.throughput_estimates.get(model)
+        if estimate is None:
+            estimate = ThroughputEstimate(self.ollama_api.load_throughput_prior(model))
+        prompt_chars = len(prompt) + len(self.ollama_api.get_system_prompt())
+        return request_deadline(estimate, prompt_chars * PROMPT_TOKENS_PER_CHAR, output_tokens)
+
+    def _finish_model_job(self) -> None:
+        """Log the job's model metrics and unload its models."""
+        if not self.job_models:
+            return
+        logging.info("Job metrics for %s: %s", ", ".join(self.job_models), self._format_job_metrics())
+        sfx_stats = self.sfx_lexicon.stats()
+        logging.info("SFX lexicon: %d/%d lookups hit (%.1f%%), most frequent: %s",
+                     sfx_stats["hits"], sfx_stats["lookups"], sfx_stats["hit_rate"] * 100, sfx_stats["top"])
+        patch_stats = self.patch_cache.stats()
+        logging.info("Viewer patch cache: %d hits, %d misses, %d entries",
+                     patch_stats["hits"], patch_stats["misses"], patch_stats["entries"])
+        for model, estimate in self.throughput_estimates.items():
+            if estimate.requests:
+                logging.info("Measured speed of %s: prefill %.0f tok/s, decode %.1f tok/s",
+                             model, estimate.prefill_tokens_per_second, estimate.decode_tokens_per_second)
+                self.ollama_api.save_throughput_prior(model, estimate.to_prior())
+        for model in self.job_models:
+            self.ollama_api.unload_model(model)
+        self.job_models = []
+        self.model_router = None
+        self.job_keep_alive = None
+
+    def _format_job_metrics(self) -> str:
+        return (f"Model load: {self.job_metrics.get('model_load_seconds', 0.0):.1f}s, "
+                f"{self.job_metrics.get('requests', 0)} requests "
+                f"(reload time during job: {self.job_metrics.get('request_load_seconds', 0.0):.1f}s), "
+                f"{self.job_metrics.get('local_textboxes', 0)} textboxes resolved without the model "
+                f"({self.job_metrics.get('sfx_textboxes', 0)} from the SFX lexicon), "
+                f"{self.job_metrics.get('skipped_requests', 0)} pages skipped, "
+                f"{self.job_metrics.get('fast_tier_pages', 0)} pages on the fast model "
+                f"({self.job_metrics.get('escalations', 0)} escalated), "
+                f"decode tokens: {self.job_metrics.get('reasoning_tokens', 0)} reasoning / "
+                f"{self.job_metrics.get('translation_tokens', 0)} translation, "
+                f"{self.job_metrics.get('loop_aborts', 0)} repetition loops aborted, "
+                f"{self.job_metrics.get('truncated_responses', 0)} responses cut off by the output cap")
+
+    def start_translation_thread(self, filepaths: os.PathLike, output_dir: os.PathLike, total_text_boxes: int | str = "?",
+                                 page_workloads: list[list[int]] | None = None):
+        thread = threading.Thread(target=self.start_translation,
+                                  args=(filepaths, self.output_dir.get(), total_text_boxes, page_workloads))
         thread.start()
 
     def start_translation_helper(self) -> None:
         self._update_gui(self.start_button.config, {"state": "disabled"})
-        self._update_gui(self.status_label.config, {"text": "Starting translation..."})
-        self._update_gui(self.progress.config, {"value": 0})
+        self._publish_progress("status", text="Starting translation...")
+        self._publish_progress("progress", value=0)
 
         input_files = self.get_html_files(self.input_dir.get())
         if not input_files:
@@ -387,9 +945,10 @@ class MokuroTranslator(TkinterDnD.Tk):
         if not os.path.exists(self.output_dir.get()):
             os.makedirs(self.output_dir.get())
 
-        total_pages = self.count_pages_in_files(input_files)
+        page_workloads = self.collect_page_workloads(input_files)
+        total_pages = sum(len(page_chars) for page_chars in page_workloads)
 
-        self.start_translation_thread(input_files, self.output_dir.get(), total_pages)
+        self.start_translation_thread(input_files, self.output_dir.get(), total_pages, page_workloads)
     
     def generate_summary_helper(self) -> None:
         """Helper method to start summary generation in a separate thread."""
@@ -414,8 +973,8 @@ class MokuroTranslator(TkinterDnD.Tk):
         # Disable buttons and start processing
         self._update_gui(self.summary_button.config, {"state": "disabled"})
         self._update_gui(self.start_button.config, {"state": "disabled"})
-        self._update_gui(self.status_label.config, {"text": "Generating summary..."})
-        self._update_gui(self.progress.config, {"value": 0})
+        self._publish_progress("status", text="Generating summary...")
+        self._publish_progress("progress", value=0)
         
         # Start summary generation in background thread
         summary_thread = threading.Thread(target=self.generate_model_context_summary)
@@ -429,7 +988,7 @@ class MokuroTranslator(TkinterDnD.Tk):
             status_text: Status message to display
             estimated_time: Optional estimated time remaining in seconds
         """
-        self._update_gui(self.progress.config, {"value": phase_progress})
+        self._publish_progress("progress", value=phase_progress)
         
         if estimated_time:
             if estimated_time > 60:
@@ -438,10 +997,11 @@ class MokuroTranslator(TkinterDnD.Tk):
                 time_str = f" (est. {estimated_time}s remaining)"
             status_text += time_str
         
-        self._update_gui(self.status_label.config, {"text": status_text})
+        self._publish_progress("status", text=status_text)
 
     def generate_model_context_summary(self):
         """Generate a comprehensive story summary from all textboxes with detailed progress tracking."""
+        self._start_profiler()
         try:
             # Phase 1: Get input files (0-5%)
             self.update_summary_progress(0, "Scanning for HTML files...")
@@ -458,7 +1018,8 @@ class MokuroTranslator(TkinterDnD.Tk):
             
             # Phase 2: Collect all textboxes from all files (5-25%)
             self.update_summary_progress(5, "Collecting textboxes from files...")
-            all_textboxes_data = self.collect_all_textboxes_with_progress(input_files)
+            with self._stage("collect_textboxes"):
+                all_textboxes_data = self.collect_all_textboxes_with_progress(input_files)
             
             if not all_textboxes_data:
                 self._update_gui(messagebox.showinfo, "Info", "No textboxes found in the HTML files.")
@@ -466,7 +1027,8 @@ class MokuroTranslator(TkinterDnD.Tk):
             
             # Phase 3: Format the request (25-30%)
             self.update_summary_progress(25, "Formatting request for AI model...")
-            summary_request = self.format_summary_request(all_textboxes_data)
+            with self._stage("format_request"):
+                summary_request = self.format_summary_request(all_textboxes_data)
             
             # Check context length
             estimated_tokens = len(summary_request.split())
@@ -480,121 +1042,98 @@ class MokuroTranslator(TkinterDnD.Tk):
             self.update_summary_progress(30, f"Request formatted ({estimated_tokens} tokens)")
             
             # Phase 4: Generate summary with AI (30-85%)
-            # Estimate time based on token count (rough estimate: 10-20 tokens per second)
-            estimated_generation_time = max(30, estimated_tokens // 15)  # Conservative estimate
-            self.update_summary_progress(30, "Generating summary with AI model...", estimated_generation_time)
+            # Load the model up front so the load time isn't counted as generation time
+            self._start_model_job(self.model_name.get())
+            
+            # Predict the time from the model's measured speed; the estimate is refined as tokens stream in
+            generation_progress = GenerationProgress(
+                self.throughput_estimates[self.model_name.get()],
+                prompt_tokens=len(summary_request),
+                expected_output_tokens=SUMMARY_BASE_TOKENS + SUMMARY_TOKENS_PER_PAGE * all_textboxes_data.page_count
+            )
+            self.update_summary_progress(30, "Generating summary with AI model...",
+                                         int(generation_progress.update(0)["eta_seconds"]))
             
             summary_system_prompt = "You are being given text from a manga or doujin. In English, first output a markdown format summary of the story as a whole, and then a detailed summary of each page."
             
-            # Use a custom API call with the summary system prompt with progress simulation
-            summary_response = self.generate_summary_with_progress(summary_request, summary_system_prompt, estimated_generation_time)
+            # Use a custom API call with the summary system prompt, reporting progress as it streams
+            with self._stage("generate_summary"):
+                summary_response = self.generate_summary_with_progress(summary_request, summary_system_prompt, generation_progress)
             
             # Phase 5: Save summary to file (85-100%)
             self.update_summary_progress(85, "Saving summary to file...")
             
             summary_file_path = os.path.join(self.output_dir.get(), "SummaryForRAG.txt")
-            self.save_summary_file(summary_response, summary_file_path)
+            with self._stage("save"):
+                self.save_summary_file(summary_response, summary_file_path)
             
             self.update_summary_progress(95, "Summary file saved successfully")
             
             # Complete
-            self.update_summary_progress(100, "Summary generation complete!")
+            self.update_summary_progress(100, f"Summary generation complete! {self._format_job_metrics()}")
             self._update_gui(messagebox.showinfo, "Success", f"Summary saved to: {summary_file_path}")
             
         except Exception as e:
             logging.error(f"Summary generation failed: {e}")
             self._update_gui(messagebox.showerror, "Error", f"Failed to generate summary: {e}")
-            self._update_gui(self.status_label.config, {"text": "Summary generation failed."})
+            self._publish_progress("status", text="Summary generation failed.")
         
         finally:
+            self._finish_model_job()
+            self._finish_profiler(self.output_dir.get(), "summary")
+            
             # Re-enable buttons
             self._update_gui(self.summary_button.config, {"state": "normal"})
             self._update_gui(self.start_button.config, {"state": "normal"})
     
-    def collect_all_textboxes_with_progress(self, filepaths: list[os.PathLike]) -> list[dict]:
+    def collect_all_textboxes_with_progress(self, filepaths: list[os.PathLike]) -> TextboxStore:
         """Collect all textboxes from all HTML files with detailed progress tracking.
         
         Args:
             filepaths: List of HTML file paths to process
             
         Returns:
-            List of dictionaries containing textbox data with page information
+            TextboxStore: Non-empty textboxes with their page numbers and file names
         """
-        all_textboxes = []
-        global_textbox_counter = 0
-        global_page_counter = 0
+        total_files = len(filepaths)
         
-        # Sort files for consistent ordering
-        sorted_filepaths = sorted(filepaths)
-        total_files = len(sorted_filepaths)
+        def on_file(file_index, filename):
+            # Update progress for file processing (5-25% range)
+            file_progress = 5 + (file_index / total_files) * 20
+            self.update_summary_progress(file_progress, f"Processing {filename} ({file_index + 1}/{total_files})")
         
-        for file_index, filepath in enumerate(sorted_filepaths):
-            try:
-                # Update progress for file processing (5-25% range)
-                file_progress = 5 + (file_index / total_files) * 20
-                filename = os.path.basename(filepath)
-                self.update_summary_progress(file_progress, f"Processing {filename} ({file_index + 1}/{total_files})")
-                
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    soup = BeautifulSoup(f, 'lxml')
-                
-                # Find all page containers
-                page_containers = soup.find_all('div', class_='pageContainer')
-                
-                for page_container in page_containers:
-                    global_page_counter += 1
-                    page_textboxes = []
-                    
-                    # Find all textboxes in this page
-                    textboxes = page_container.find_all('div', class_='textBox')
-                    
-                    for textbox in textboxes:
-                        global_textbox_counter += 1
-                        text_content = self.extract_textbox_text(textbox)
-                        
-                        if text_content.strip():  # Only include non-empty textboxes
-                            page_textboxes.append({
-                                'textbox_number': global_textbox_counter,
-                                'text': text_content.strip()
-                            })
-                    
-                    # Add page data if it has textboxes
-                    if page_textboxes:
-                        all_textboxes.append({
-                            'page_number': global_page_counter,
-                            'file_name': os.path.basename(filepath),
-                            'textboxes': page_textboxes
-                        })
-                        
-            except Exception as e:
-                logging.error(f"Failed to process file {filepath}: {e}")
-                continue
+        all_textboxes = self.collect_all_textboxes(filepaths, on_file)
         
         # Final progress update for this phase
-        total_pages = len(all_textboxes)
-        total_textboxes = sum(len(page['textboxes']) for page in all_textboxes)
-        self.update_summary_progress(25, f"Collected {total_textboxes} textboxes from {total_pages} pages")
+        self.update_summary_progress(25, f"Collected {len(all_textboxes)} textboxes from {all_textboxes.page_count} pages")
         
         return all_textboxes
 
-    def collect_all_textboxes(self, filepaths: list[os.PathLike]) -> list[dict]:
+    def collect_all_textboxes(self, filepaths: list[os.PathLike], on_file=None) -> TextboxStore:
         """Collect all textboxes from all HTML files with page grouping.
         
         Args:
             filepaths: List of HTML file paths to process
+            on_file: Called with (file index, file name) before each file is read
             
         Returns:
-            List of dictionaries containing textbox data with page information
+            TextboxStore: Non-empty textboxes with their page numbers and file names
         """
-        all_textboxes = []
+        from bs4 import BeautifulSoup
+
+        all_textboxes = TextboxStore()
         global_textbox_counter = 0
         global_page_counter = 0
         
         # Sort files for consistent ordering
         sorted_filepaths = sorted(filepaths)
         
-        for filepath in sorted_filepaths:
+        for file_index, filepath in enumerate(sorted_filepaths):
             try:
+                filename = os.path.basename(filepath)
+                if on_file:
+                    on_file(file_index, filename)
+                
                 with open(filepath, 'r', encoding='utf-8') as f:
                     soup = BeautifulSoup(f, 'lxml')
                 
@@ -603,28 +1142,16 @@ class MokuroTranslator(TkinterDnD.Tk):
                 
                 for page_container in page_containers:
                     global_page_counter += 1
-                    page_textboxes = []
                     
                     # Find all textboxes in this page
                     textboxes = page_container.find_all('div', class_='textBox')
                     
                     for textbox in textboxes:
                         global_textbox_counter += 1
-                        text_content = self.extract_textbox_text(textbox)
+                        text_content = self.extract_textbox_text(textbox).strip()
                         
-                        if text_content.strip():  # Only include non-empty textboxes
-                            page_textboxes.append({
-                                'textbox_number': global_textbox_counter,
-                                'text': text_content.strip()
-                            })
-                    
-                    # Add page data if it has textboxes
-                    if page_textboxes:
-                        all_textboxes.append({
-                            'page_number': global_page_counter,
-                            'file_name': os.path.basename(filepath),
-                            'textboxes': page_textboxes
-                        })
+                        if text_content:  # Only include non-empty textboxes
+                            all_textboxes.append(filename, global_page_counter, global_textbox_counter, text_content)
                         
             except Exception as e:
                 logging.error(f"Failed to process file {filepath}: {e}")
@@ -632,42 +1159,38 @@ class MokuroTranslator(TkinterDnD.Tk):
         
         return all_textboxes
     
-    def format_summary_request(self, all_textboxes_data: list[dict]) -> str:
+    def format_summary_request(self, all_textboxes: TextboxStore) -> str:
         """Format the collected textbox data into a request string.
         
         Args:
-            all_textboxes_data: List of page data with textboxes
+            all_textboxes: Textboxes from collect_all_textboxes
             
         Returns:
             Formatted request string with page groupings
         """
         request_parts = []
         
-        for page_data in all_textboxes_data:
-            page_num = page_data['page_number']
-            textboxes = page_data['textboxes']
-            
+        for page_num, _, textboxes in all_textboxes.pages():
             # Add page header
             request_parts.append(f"[Page {page_num}]")
             
             # Add all textboxes for this page
-            for textbox_data in textboxes:
-                textbox_num = textbox_data['textbox_number']
-                text = textbox_data['text']
-                request_parts.append(f"Textbox {textbox_num}: \"{text}\"")
+            for textbox in textboxes:
+                request_parts.append(f"Textbox {textbox.textbox_number}: \"{textbox.text}\"")
             
             # Add blank line between pages
             request_parts.append("")
         
         return '\n'.join(request_parts)
     
-    def generate_summary_with_progress(self, request_text: str, system_prompt: str, estimated_time: int) -> str:
-        """Generate summary with simulated progress updates during AI generation.
+    def generate_summary_with_progress(self, request_text: str, system_prompt: str,
+                                       generation_progress: GenerationProgress) -> str:
+        """Generate summary with progress updates from the tokens streamed so far.
         
         Args:
             request_text: The formatted request with all textboxes
             system_prompt: Custom system prompt for summary generation
-            estimated_time: Estimated generation time in seconds
+            generation_progress: Time prediction for the request, updated as tokens arrive
             
         Returns:
             Generated summary text
@@ -677,6 +1200,7 @@ class MokuroTranslator(TkinterDnD.Tk):
         
         # Store the result and completion flag
         result = {"response": None, "error": None, "completed": False}
+        monitor = GenerationMonitor(self.thinking_anchor.get(), detect_loops=False)
         
         def generate_in_background():
             """Generate summary in background thread."""
@@ -695,8 +1219,13 @@ class MokuroTranslator(TkinterDnD.Tk):
                     self.model_name.get(),
                     rag_enhanced_request,
                     context_length=self.context_length.get(),
-                    temperature=self.temperature.get()
+                    temperature=self.temperature.get(),
+                    keep_alive=self.job_keep_alive,
+                    monitor=monitor,
+                    deadline=request_deadline(generation_progress.estimate, generation_progress.prompt_tokens,
+                                              generation_progress.expected_output_tokens)
                 )
+                self._record_request_metrics(self.model_name.get(), len(request_text))
                 
                 # Restore the original system prompt
                 self.ollama_api.current_system_prompt = original_prompt
@@ -715,35 +1244,22 @@ class MokuroTranslator(TkinterDnD.Tk):
         generation_thread = threading.Thread(target=generate_in_background)
         generation_thread.start()
         
-        # Simulate progress updates while generation is running
-        start_time = time.time()
+        # Report progress while generation is running
         progress_start = 30  # Starting progress percentage
         progress_end = 85    # Ending progress percentage
         
         while not result["completed"]:
-            elapsed_time = time.time() - start_time
+            decoded_tokens = monitor.reasoning_tokens + monitor.translation_tokens
+            progress = generation_progress.update(decoded_tokens)
             
-            # Calculate progress based on elapsed time vs estimated time
-            if estimated_time > 0:
-                time_progress = min(elapsed_time / estimated_time, 0.95)  # Cap at 95% until complete
-            else:
-                time_progress = 0.5  # Default to 50% if no estimate
-            
-            # Map time progress to our progress range (30-85%)
-            current_progress = progress_start + (time_progress * (progress_end - progress_start))
-            
-            # Calculate remaining time
-            if elapsed_time > 0 and time_progress > 0:
-                remaining_time = max(0, int((estimated_time - elapsed_time)))
-            else:
-                remaining_time = estimated_time
+            # Map progress to our progress range (30-85%)
+            current_progress = progress_start + (progress["fraction"] * (progress_end - progress_start))
+            status_text = "Generating summary with AI model..."
+            if decoded_tokens:
+                status_text += f" {decoded_tokens} tokens, {progress['decode_tokens_per_second']:.1f} tok/s"
             
             # Update progress
-            self.update_summary_progress(
-                int(current_progress), 
-                "Generating summary with AI model...", 
-                remaining_time
-            )
+            self.update_summary_progress(int(current_progress), status_text, int(progress["eta_seconds"]))
             
             # Wait a bit before next update
             time.sleep(1)
@@ -819,9 +1335,9 @@ class MokuroTranslator(TkinterDnD.Tk):
             recent_text (str): _description_
         """
         progress_percentage = (boxes_processed / total_text_boxes) * 100
-        self._update_gui(self.progress.config, {"value": progress_percentage})
-        self._update_gui(self.line_count_label.config, {"text": f"{boxes_processed}/{total_text_boxes}"})
-        self._update_gui(self.last_translation_label.config, {"text": f"Last: {recent_text[:50]}..."})
+        self._publish_progress("progress", value=progress_percentage)
+        self._publish_progress("line_count", text=f"{boxes_processed}/{total_text_boxes}")
+        self._publish_progress("last_translation", text=f"Last: {recent_text[:50]}...")
 
     def translate_file(
             self,
@@ -829,7 +1345,9 @@ class MokuroTranslator(TkinterDnD.Tk):
             pages_processed_start: int,
             total_pages: int,
             global_textbox_counter: int,
-            anchor: str | None = "think"
+            anchor: str | None = "think",
+            sidecar_path: os.PathLike | None = None,
+            page_offset: int = 0
         ) -> tuple[str, int, int]:
         """Returns the translation of all text in a file using page-based translation.
 
@@ -840,96 +1358,37 @@ class MokuroTranslator(TkinterDnD.Tk):
             global_textbox_counter (int): Global textbox counter across all files
             anchor (str | None): If anchor is present in the API response,
                 remove all text between the first 2 occurences of anchor.
+            sidecar_path (os.PathLike | None): If given, also write the translations
+                and their layout hints to this sidecar file.
+            page_offset (int): Index of the file's first page in the job's progress model
 
         Returns:
             tuple[str, int, int]: (translated HTML, total pages processed, updated global textbox counter)
         """
-        with open(filepath, 'r', encoding='utf-8') as f:
+        from bs4 import BeautifulSoup
+
+        with self._stage("parse_html"), open(filepath, 'r', encoding='utf-8') as f:
             soup = BeautifulSoup(f, 'lxml')
 
-        # Part 1: Enhanced CSS Modifications
-        style_tag = soup.find('style')
-        if style_tag:
-            css = style_tag.string or ''
-            
-            # Modify default textBox p styles to enable text wrapping by default
-            css = css.replace(
-                'white-space: nowrap;',
-                'white-space: normal;\n    word-wrap: break-word;'
-            )
-            
-            # Add enhanced feature styles
-            css += ALWAYS_SHOW_TRANSLATION_JS_FUNC
-            style_tag.string = css
-
-        # Part 2: HTML Modifications - Add new menu options
-        dropdown_content = soup.find('div', class_='dropdown-content')
-        if dropdown_content:
-            # Find the toggle OCR text boxes option to insert after it
-            toggle_ocr_input = soup.find('input', id='menuToggleOCRTextBoxes')
-            if toggle_ocr_input:
-                toggle_ocr_label = toggle_ocr_input.parent
-                
-                # Add "Always show translation" option
-                always_show_label = soup.new_tag('label', **{'class': 'dropdown-option'})
-                always_show_label.string = 'Always show translation'
-                always_show_input = soup.new_tag('input', type='checkbox', id='menuAlwaysShowTranslation')
-                always_show_label.append(always_show_input)
-                
-                # Add "Constrain text" option  
-                constrain_label = soup.new_tag('label', **{'class': 'dropdown-option'})
-                constrain_label.string = 'Constrain text'
-                constrain_input = soup.new_tag('input', type='checkbox', id='menuConstrainText')
-                constrain_label.append(constrain_input)
-                
-                # Insert after existing toggle OCR option
-                toggle_ocr_label.insert_after(always_show_label)
-                always_show_label.insert_after(constrain_label)
-
-        # Part 3: JavaScript Modifications
-        script_tag = soup.find_all('script')[-1]
-        if script_tag and script_tag.string:
-            js_code = script_tag.string
-            original_js_length = len(js_code)
-
-            # Update defaultState - Add new properties without removing existing ones
-            js_code = re.sub(r'(toggleOCRTextBoxes\s*:\s*false,)',
-                             r'\1\n    alwaysShowTranslation: false,\n    constrainText: false,', js_code)
-
-            # Update updateUI - Add new checkbox updates
-            js_code = re.sub(r"(document\.getElementById\('menuToggleOCRTextBoxes'\)\.checked = state\.toggleOCRTextBoxes;)",
-                             r'\1\n    document.getElementById("menuAlwaysShowTranslation").checked = state.alwaysShowTranslation;\n    document.getElementById("menuConstrainText").checked = state.constrainText;', js_code)
-
-            # Remove initTextBoxes and its call using safe method
-            js_code = self.remove_init_text_boxes(js_code)
-            js_code = js_code.replace('initTextBoxes();', '')
-
-            # Add new event listeners using safe method
-            js_code = self.add_new_event_listeners(js_code)
-            
-            # Replace updateProperties function using safe method
-            js_code = self.replace_update_properties_function(js_code)
-
-            # Restore proper page navigation (ensure pages are properly hidden/shown)
-            js_code = js_code.replace(
-                UPDATE_PAGE_JS_ORIGINAL,
-                UPDATE_PAGE_JS_FUNC
-            )
-            
-            # Validate JavaScript syntax
-            if not self.check_balanced_braces(js_code):
-                self._update_gui(messagebox.showerror, "JavaScript Error", 
-                               f"Unbalanced braces detected in JavaScript for {os.path.basename(filepath)}. "
-                               f"Original length: {original_js_length}, New length: {len(js_code)}")
-                # Write debug file
-                with open(f'debug_js_{os.path.basename(filepath)}.js', 'w', encoding='utf-8') as f:
-                    f.write(js_code)
-            
-            script_tag.string = js_code
+        lazy_pages = self.lazy_pages.get()
+
+        # Parts 1-3: CSS, menu and JavaScript patches for the viewer
+        with self._stage("patch_viewer"):
+            patch_report = patch_viewer(soup, lazy_pages, self.patch_cache)
+        if not patch_report["balanced"]:
+            js_code = patch_report["js_code"]
+            self._update_gui(messagebox.showerror, "JavaScript Error", 
+                           f"Unbalanced braces detected in JavaScript for {os.path.basename(filepath)}. "
+                           f"Original length: {patch_report['original_js_length']}, New length: {len(js_code)}")
+            # Write debug file
+            with open(f'debug_js_{os.path.basename(filepath)}.js', 'w', encoding='utf-8') as f:
+                f.write(js_code)
 
         # Part 4: Page-Based Translation Processing
         pages_processed = pages_processed_start
         page_containers = soup.find_all('div', class_='pageContainer')
+        with self._stage("collect_source_texts"):
+            source_texts = collect_source_texts(page_containers, os.path.basename(filepath)) if sidecar_path else None
         
         # Use the global textbox counter passed from the calling function
         textbox_counter = global_textbox_counter
@@ -938,25 +1397,55 @@ class MokuroTranslator(TkinterDnD.Tk):
         for page_index, page_container in enumerate(page_containers):
             try:
                 # Translate this page and update counter
-                textbox_counter = self.translate_page(page_container, textbox_counter, anchor)
+                with self._stage("translate_page"):
+                    textbox_counter = self.translate_page(page_container, textbox_counter, anchor)
                 pages_processed += 1
                 
-                # Update progress
-                progress_percentage = (pages_processed / total_pages) * 100
-                self._update_gui(self.progress.config, {"value": progress_percentage})
-                self._update_gui(self.line_count_label.config, {"text": f"Page {pages_processed}/{total_pages}"})
-                
                 # Update status with current page info
                 filename = os.path.basename(filepath)
-                self._update_gui(self.status_label.config, {"text": f"Translating {filename} - Page {page_index + 1}"})
+                self._publish_progress("status", text=f"Translating {filename} - Page {page_index + 1}")
                 
+            except OllamaUnavailable:
+                raise
             except Exception as e:
                 logging.error(f"Failed to translate page {page_index + 1} in {filepath}: {e}")
                 # Continue with next page even if this one fails
                 textbox_counter += len(page_container.find_all('div', class_='textBox'))
-                continue
+            
+            self._publish_page_progress(page_offset + page_index, pages_processed, total_pages)
+        
+        if sidecar_path:
+            with self._stage("sidecar"):
+                records = collect_translations(page_containers, source_texts)
+                try:
+                    write_sidecar(sidecar_path, records, source=os.path.basename(filepath), model=self.model_name.get())
+                    logging.info("Wrote %d translations to %s", len(records), sidecar_path)
+                except IOError as e:
+                    logging.error(f"Could not write translation sidecar: {e}")
+
+        if lazy_pages:
+            with self._stage("dehydrate_pages"):
+                dehydrated_pages = dehydrate_pages(soup)
+            logging.info("Stored %d pages of %s as lazy data islands", dehydrated_pages, os.path.basename(filepath))
+
+        with self._stage("serialize_html"):
+            translated_html = str(soup.prettify())
+        return translated_html, pages_processed, textbox_counter
+
+    def _publish_page_progress(self, page_index: int, pages_processed: int, total_pages: int | str) -> None:
+        """Update the progress bar and ETA after a page, and log the ETA now and then for unattended runs."""
+        if self.progress_model is None:
+            if isinstance(total_pages, int) and total_pages:
+                self._publish_progress("progress", value=(pages_processed / total_pages) * 100)
+            self._publish_progress("line_count", text=f"Page {pages_processed}/{total_pages}")
+            return
         
-        return str(soup.prettify()), pages_processed, textbox_counter
+        self.progress_model.page_done(page_index)
+        snapshot = self.progress_model.snapshot()
+        self._publish_progress("progress", value=snapshot["fraction"] * 100)
+        self._publish_progress("line_count", text=self.progress_model.format_status(snapshot))
+        if self.progress_model.log_due():
+            logging.info(self.progress_model.format_log_line(snapshot))
 
     def translate_page(self, page_container, textbox_counter_start, anchor, max_retries=3, retry_delay=1):
         """Translate all textboxes in a single page using page-based translation with retry logic.
@@ -978,114 +1467,192 @@ class MokuroTranslator(TkinterDnD.Tk):
         if not textboxes:
             return textbox_counter_start
         
-        # Enhance textbox attributes for all textboxes
-        for textbox in textboxes:
-            # Remove vertical writing mode for better horizontal text display
-            if textbox.has_attr('style') and 'writing-mode' in textbox['style']:
-                style_attr = textbox['style']
-                new_style = re.sub(r'writing-mode\s*:\s*vertical-rl\s*;?', '', style_attr).strip()
-                textbox['style'] = new_style
-            
-            # Add data attributes for JavaScript processing
-            self.enhance_text_box_attributes(textbox)
+        # Drop vertical writing mode, widen narrow boxes and add the data attributes the viewer uses
+        with self._stage("layout"):
+            page_width = parse_box_style(page_container.get('style', '')).get('width')
+            layout_textboxes(textboxes, page_width)
         
-        # Build request string for this page
+        # Build request string for this page; boxes that need no model (punctuation,
+        # numbers, text already in Latin script, known sound effects) are resolved locally instead
         request_parts = []
         textbox_texts = []
+        model_texts = []
+        expected_textbox_nums = set()
+        local_translations = {}
         
         for i, textbox in enumerate(textboxes):
             textbox_num = textbox_counter_start + i + 1
             text = self.extract_textbox_text(textbox)
-            if text.strip():
-                request_parts.append(f'Textbox {textbox_num}: "{text}"')
-                textbox_texts.append(text)
-            else:
+            if not text.strip():
                 textbox_texts.append("")
+                continue
+            
+            textbox_texts.append(text)
+            local_translation = resolve_locally(text)
+            if local_translation is None:
+                local_translation = self.sfx_lexicon.lookup(text)
+                if local_translation is not None:
+                    self._count_job_metric("sfx_textboxes")
+            if local_translation is not None:
+                local_translations[textbox_num] = local_translation
+            else:
+                request_parts.append(f'Textbox {textbox_num}: "{text}"')
+                model_texts.append(text)
+                expected_textbox_nums.add(textbox_num)
+        
+        self._count_job_metric("local_textboxes", len(local_translations))
         
         if not request_parts:
+            # Nothing left for the model on this page
+            if local_translations:
+                self._count_job_metric("skipped_requests")
+                self.apply_merged_translations(textboxes, local_translations, textbox_counter_start, anchor)
             return textbox_counter_start + len(textboxes)
         
         # Send to Ollama with context length
         full_request = '\n'.join(request_parts)
         
+        # Structured mode asks Ollama to constrain the output to TRANSLATION_RESPONSE_SCHEMA
+        use_structured_output = self.structured_output.get()
+        if use_structured_output:
+            full_request = f"{full_request}\n{STRUCTURED_OUTPUT_INSTRUCTIONS}"
+        
+        # Dialogue-light pages go to the fast tier if one is configured
+        router = self.model_router or self._build_model_router(self.model_name.get(), use_fast_tier=False)
+        tier = router.route_page(model_texts)
+        if tier is not router.full_tier:
+            self._count_job_metric("fast_tier_pages")
+        
         # Initialize merged translations dictionary
         merged_translations = {}
+        # Set once a response is cut off by num_predict; later attempts go uncapped
+        uncapped = False
         
         # Retry loop for page translation
         for attempt in range(max_retries):
-            logging.info(f"=== TRANSLATION REQUEST (Attempt {attempt + 1}/{max_retries}) ===")
-            logging.info(f"Model: {self.model_name.get()}")
-            logging.info(f"Context Length: {self.context_length.get()}")
-            logging.info(f"Temperature: {self.temperature.get()}")
-            logging.info(f"Request:\n{full_request}")
-            logging.info(f"=== END REQUEST ===")
+            # Full payloads go to the job's trace file; the console only gets a one-line summary
+            request_trace_id = self._spool_trace("request", full_request, attempt=attempt + 1)
+            logging.info("Translation request %s (attempt %d/%d): %s model=%s ctx=%d temp=%s, %d textboxes, %d chars",
+                         request_trace_id, attempt + 1, max_retries, tier.name, tier.model,
+                         tier.context_length, tier.temperature, len(expected_textbox_nums), len(full_request))
+            logging.debug("Request:\n%s", full_request)
             
             try:
                 # Add RAG context to the request
-                rag_enhanced_request = self.format_request_with_rag(full_request)
+                # Budgeted against this tier's context; the fast tier's may be much smaller
+                rag_enhanced_request = self.format_request_with_rag(full_request, tier.context_length)
                 
-                response = self.ollama_api.generate(
-                    self.model_name.get(), 
-                    rag_enhanced_request, 
-                    context_length=self.context_length.get(),
-                    temperature=self.temperature.get()
+                num_predict, think = self._generation_budget(tier.model, model_texts, anchor)
+                if uncapped:
+                    num_predict = None
+                # Without a cap, expect what the cap would have allowed
+                expected_tokens = num_predict or estimate_num_predict(
+                    sum(len(text) for text in model_texts), len(model_texts), self.ollama_api.load_reasoning_budget()
                 )
+                with self._stage("ollama_request"):
+                    response = self.ollama_api.generate(
+                        tier.model, 
+                        rag_enhanced_request, 
+                        context_length=tier.context_length,
+                        temperature=tier.temperature,
+                        response_format=TRANSLATION_RESPONSE_SCHEMA if use_structured_output else None,
+                        keep_alive=self.job_keep_alive,
+                        num_predict=num_predict,
+                        think=think,
+                        monitor=GenerationMonitor(anchor),
+                        deadline=self._request_deadline(tier.model, rag_enhanced_request, expected_tokens)
+                    )
+                self._record_request_metrics(tier.model, sum(len(text) for text in model_texts))
+                if num_predict and self.ollama_api.last_response_metrics.get("done_reason") == DONE_REASON_LENGTH:
+                    # A cut-off response looks malformed; retrying with the same cap would fail again
+                    self._count_job_metric("truncated_responses")
+                    logging.warning("Attempt %d: response hit the %d token cap, retrying without it", attempt + 1, num_predict)
+                    uncapped = True
                 
-                # Debug logging: Log the raw response
-                logging.info(f"=== RAW RESPONSE (Attempt {attempt + 1}) ===")
-                logging.info(f"Response length: {len(response)} characters")
-                logging.info(f"Response:\n{response}")
-                logging.info(f"=== END RESPONSE ===")
+                response_trace_id = self._spool_trace("response", response, attempt=attempt + 1, request_id=request_trace_id)
+                logging.info("Raw response %s (attempt %d): %d characters", response_trace_id, attempt + 1, len(response))
+                logging.debug("Response:\n%s", response)
                 
-                # Parse this attempt's translations
-                attempt_translations = self.parse_ollama_response(response)
+                # Parse this attempt's translations, preferring structured output when enabled
+                with self._stage("parse_response"):
+                    attempt_translations = None
+                    if use_structured_output:
+                        attempt_translations = parse_structured_translations(
+                            remove_between_anchors(response, anchor) if anchor else response,
+                            expected_textbox_nums
+                        )
+                        if attempt_translations is None:
+                            logging.warning(f"Attempt {attempt + 1}: Structured output was not valid JSON, falling back to regex parsing")
+                    if attempt_translations is None:
+                        attempt_translations = self.parse_ollama_response(response)
                 
                 # Merge successful translations (don't overwrite existing good translations)
                 for textbox_num, translation in attempt_translations.items():
                     if translation and translation.strip():  # Only merge non-empty translations
                         merged_translations[textbox_num] = translation
-                        logging.info(f"Attempt {attempt + 1}: Successfully translated textbox {textbox_num}")
+                        logging.debug("Attempt %d: Successfully translated textbox %d", attempt + 1, textbox_num)
                 
                 # Check if we have all translations
-                expected_textbox_nums = set(range(textbox_counter_start + 1, textbox_counter_start + len(textboxes) + 1))
                 translated_textbox_nums = set(merged_translations.keys())
                 missing_textboxes = expected_textbox_nums - translated_textbox_nums
                 
                 if not missing_textboxes:
-                    logging.info(f"=== PAGE TRANSLATION COMPLETE ===")
-                    logging.info(f"All {len(textboxes)} textboxes translated successfully after {attempt + 1} attempt(s)")
-                    logging.info(f"=== END PAGE TRANSLATION ===")
+                    logging.debug("All %d textboxes translated successfully after %d attempt(s)", len(expected_textbox_nums), attempt + 1)
                     break
                 else:
-                    logging.warning(f"Attempt {attempt + 1}: Missing translations for textboxes: {sorted(missing_textboxes)}")
+                    logging.warning("Attempt %d: Missing translations for textboxes: %s", attempt + 1, sorted(missing_textboxes))
+                    tier = self._escalate_tier(router, tier)
                     if attempt < max_retries - 1:  # Don't delay after the last attempt
-                        logging.info(f"Retrying in {retry_delay} seconds...")
+                        logging.info("Retrying in %s seconds...", retry_delay)
                         time.sleep(retry_delay)
                 
+            except OllamaUnavailable:
+                # Retrying can't help; let the job stop instead of failing page by page
+                raise
+                
+            except RepetitionLoopError as e:
+                self._count_job_metric("loop_aborts")
+                logging.warning("Attempt %d: %s", attempt + 1, e)
+                tier = self._escalate_tier(router, tier)
+                if attempt < max_retries - 1:
+                    logging.info("Retrying in %s seconds...", retry_delay)
+                    time.sleep(retry_delay)
+                continue
+                
             except Exception as e:
-                logging.error(f"Translation request failed on attempt {attempt + 1}: {e}")
+                logging.error("Translation request failed on attempt %d: %s", attempt + 1, e)
+                tier = self._escalate_tier(router, tier)
                 if attempt < max_retries - 1:
-                    logging.info(f"Retrying in {retry_delay} seconds...")
+                    logging.info("Retrying in %s seconds...", retry_delay)
                     time.sleep(retry_delay)
                 continue
         
         # Apply all merged translations to textboxes
-        self.apply_merged_translations(textboxes, merged_translations, textbox_counter_start, anchor)
+        merged_translations.update(local_translations)
+        with self._stage("apply_translations"):
+            self.apply_merged_translations(textboxes, merged_translations, textbox_counter_start, anchor)
         
         # Final success report
         expected_count = len([t for t in textbox_texts if t.strip()])  # Only count non-empty textboxes
         actual_count = len(merged_translations)
         success_rate = (actual_count / expected_count * 100) if expected_count > 0 else 100
         
-        logging.info(f"=== FINAL PAGE RESULTS ===")
-        logging.info(f"Successfully translated {actual_count}/{expected_count} textboxes ({success_rate:.1f}%)")
+        logging.info("Page results: translated %d/%d textboxes (%.1f%%)", actual_count, expected_count, success_rate)
         if actual_count < expected_count:
-            missing_nums = set(range(textbox_counter_start + 1, textbox_counter_start + len(textboxes) + 1)) - set(merged_translations.keys())
-            logging.warning(f"Final missing textboxes: {sorted(missing_nums)}")
-        logging.info(f"=== END PAGE RESULTS ===")
+            missing_nums = expected_textbox_nums - set(merged_translations.keys())
+            logging.warning("Final missing textboxes: %s", sorted(missing_nums))
         
         return textbox_counter_start + len(textboxes)
     
+    def _escalate_tier(self, router: ModelRouter, tier: ModelTier) -> ModelTier:
+        """Move a failed page to the next tier up; returns `tier` if there is none."""
+        next_tier = router.escalate(tier)
+        if next_tier is None:
+            return tier
+        self._count_job_metric("escalations")
+        logging.info("Escalating page from %s to %s", tier.model, next_tier.model)
+        return next_tier
+
     def apply_merged_translations(self, textboxes, merged_translations, counter_start, anchor):
         """Apply merged translations from multiple attempts to textboxes"""
         try:
@@ -1100,7 +1667,10 @@ class MokuroTranslator(TkinterDnD.Tk):
                         cleaned_translation = remove_between_anchors(translation, anchor)
                         
                         # Apply translation to textbox
-                        self.scorched_earth_clear_and_rebuild(textbox, cleaned_translation)
+                        with self._stage("rebuild_textbox"):
+                            self.scorched_earth_clear_and_rebuild(textbox, cleaned_translation)
+                        with self._stage("fit_font_size"):
+                            self.annotate_fitted_font_size(textbox, cleaned_translation)
                         
                         # Add text length class for styling hints
                         text_length = len(cleaned_translation)
@@ -1114,15 +1684,14 @@ class MokuroTranslator(TkinterDnD.Tk):
                         successful_translations += 1
                         
                         # Update last translation display
-                        self._update_gui(self.last_translation_label.config, 
-                                       {"text": f"Last: {cleaned_translation[:50]}..."})
+                        self._publish_progress("last_translation", text=f"Last: {cleaned_translation[:50]}...")
                     else:
-                        logging.warning(f"Empty translation for textbox {expected_num}")
+                        logging.warning("Empty translation for textbox %d", expected_num)
                 else:
-                    logging.warning(f"Missing translation for textbox {expected_num}")
+                    logging.warning("Missing translation for textbox %d", expected_num)
                     # Keep original text
             
-            logging.info(f"Successfully applied {successful_translations}/{len(textboxes)} translations")
+            logging.debug("Successfully applied %d/%d translations", successful_translations, len(textboxes))
             
         except Exception as e:
             logging.error(f"Translation application failed: {e}")
@@ -1146,7 +1715,10 @@ class MokuroTranslator(TkinterDnD.Tk):
                         cleaned_translation = remove_between_anchors(translation, anchor)
                         
                         # Apply translation to textbox
-                        self.scorched_earth_clear_and_rebuild(textbox, cleaned_translation)
+                        with self._stage("rebuild_textbox"):
+                            self.scorched_earth_clear_and_rebuild(textbox, cleaned_translation)
+                        with self._stage("fit_font_size"):
+                            self.annotate_fitted_font_size(textbox, cleaned_translation)
                         
                         # Add text length class for styling hints
                         text_length = len(cleaned_translation)
@@ -1160,15 +1732,14 @@ class MokuroTranslator(TkinterDnD.Tk):
                         successful_translations += 1
                         
                         # Update last translation display
-                        self._update_gui(self.last_translation_label.config, 
-                                       {"text": f"Last: {cleaned_translation[:50]}..."})
+                        self._publish_progress("last_translation", text=f"Last: {cleaned_translation[:50]}...")
                     else:
-                        logging.warning(f"Empty translation for textbox {expected_num}")
+                        logging.warning("Empty translation for textbox %d", expected_num)
                 else:
-                    logging.warning(f"Missing translation for textbox {expected_num}")
+                    logging.warning("Missing translation for textbox %d", expected_num)
                     # Keep original text
             
-            logging.info(f"Successfully applied {successful_translations}/{len(textboxes)} translations")
+            logging.debug("Successfully applied %d/%d translations", successful_translations, len(textboxes))
             
         except Exception as e:
             logging.error(f"Translation parsing failed: {e}")
@@ -1178,24 +1749,22 @@ class MokuroTranslator(TkinterDnD.Tk):
     def parse_ollama_response(self, response):
         """Parse Ollama response with multiple fallback strategies"""
         
-        logging.info(f"=== PARSING RESPONSE ===")
-        
         # Strategy 1: Exact format match
         pattern1 = r'Textbox\s+(\d+):\s*"([^"]*)"'
         matches = re.findall(pattern1, response, re.MULTILINE | re.DOTALL)
         
-        logging.info(f"Strategy 1 (exact format) found {len(matches)} matches: {matches}")
+        logging.debug("Strategy 1 (exact format) found %d matches: %s", len(matches), matches)
         
         if matches:
             result = self.process_matches(matches)
-            logging.info(f"Strategy 1 result: {result}")
+            logging.debug("Strategy 1 result: %s", result)
             return result
         
         # Strategy 2: Handle missing quotes
         pattern2 = r'Textbox\s+(\d+):\s*([^\n\r]+)'
         matches = re.findall(pattern2, response, re.MULTILINE)
         
-        logging.info(f"Strategy 2 (missing quotes) found {len(matches)} matches: {matches}")
+        logging.debug("Strategy 2 (missing quotes) found %d matches: %s", len(matches), matches)
         
         if matches:
             # Clean up matches that might have quotes or other formatting
@@ -1205,14 +1774,13 @@ class MokuroTranslator(TkinterDnD.Tk):
                 text = text.strip().strip('"\'')
                 cleaned_matches.append((num, text))
             result = self.process_matches(cleaned_matches)
-            logging.info(f"Strategy 2 result: {result}")
+            logging.debug("Strategy 2 result: %s", result)
             return result
         
         # Strategy 3: Line-by-line parsing for malformed responses
-        logging.info("Falling back to line-by-line parsing")
+        logging.debug("Falling back to line-by-line parsing")
         result = self.parse_line_by_line(response)
-        logging.info(f"Strategy 3 result: {result}")
-        logging.info(f"=== END PARSING ===")
+        logging.debug("Strategy 3 result: %s", result)
         return result
     
     def process_matches(self, matches):
@@ -1273,8 +1841,90 @@ class MokuroTranslator(TkinterDnD.Tk):
         return translations
 
     def save_translated_file(self, translated_html: str, output_filepath: str) -> None:
+        from reader_server import precompress
+
         with open(output_filepath, 'w', encoding='utf-8') as f:
             f.write(translated_html)
+        
+        # Compressed copies for the reader server (`main.py serve`) to send as they are
+        with self._stage("precompress"):
+            for path in (output_filepath, sidecar_path_for(output_filepath)):
+                try:
+                    if os.path.exists(path):
+                        precompress(path)
+                except IOError as e:
+                    logging.warning(f"Could not write compressed copies of {path}: {e}")
+        
+        # Keep the library search index current; a failure here doesn't affect the translation
+        try:
+            with self._stage("library_index"):
+                indexed = self.library_index.index_volume(output_filepath)
+            logging.info("Indexed %d textboxes of %s for library search", indexed, os.path.basename(output_filepath))
+        except (sqlite3.Error, IOError, ValueError, KeyError) as e:
+            logging.warning(f"Could not add {output_filepath} to the library index: {e}")
+
+    def _spool_trace(self, kind: str, payload: str, **fields) -> str | None:
+        """Write a large payload to the current job's trace file.
+
+        Returns:
+            str | None: The trace id to reference in log messages, or None outside a job
+        """
+        if self.trace_spool is None:
+            return None
+        return self.trace_spool.spool(kind, payload, **fields)
+
+    def _publish_progress(self, key: str, **config) -> None:
+        """Queue a progress widget update; safe to call from any thread.
+
+        Args:
+            key (str): One of "progress", "status", "line_count" or "last_translation"
+            **config: Widget options to apply
+        """
+        self.progress_bus.publish(key, **config)
+
+    def _drain_progress(self) -> None:
+        """Apply the latest pending progress state, then reschedule. Runs on the Tk main loop."""
+        widgets = {
+            "progress": self.progress,
+            "status": self.status_label,
+            "line_count": self.line_count_label,
+            "last_translation": self.last_translation_label,
+        }
+        with self._stage("tk_progress"):
+            for key, config in self.progress_bus.drain().items():
+                try:
+                    widgets[key].config(**config)
+                except (KeyError, tk.TclError) as e:
+                    logging.error("Progress update for %s failed: %s", key, e)
+        
+        self.after(PROGRESS_FRAME_MS, self._drain_progress)
+
+    def _stage(self, name: str):
+        """Time a block as a stage of the running job's profile; a no-op when the job isn't profiled."""
+        profiler = self.profiler
+        return profiler.stage(name) if profiler is not None else nullcontext()
+
+    def _start_profiler(self) -> None:
+        """Start profiling the calling job thread (and the Tk main loop) if profiling is on."""
+        self.profiler = None
+        if not self.profile_jobs.get():
+            return
+        self.profiler = JobProfiler(self.profile_mode)
+        self.profiler.start(thread_ids=[threading.main_thread().ident])
+        logging.info("Profiling this job (%s)", self.profile_mode)
+
+    def _finish_profiler(self, output_dir: os.PathLike, label: str) -> None:
+        """Stop the job's profiler, log its stage breakdown and write the report to <output_dir>/profiles."""
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return
+        profiler.stop()
+        logging.info("Stage breakdown:\n%s", profiler.stage_table())
+        try:
+            paths = profiler.write_report(os.path.join(output_dir, "profiles"), label)
+            logging.info("Wrote profile to %s", ", ".join(paths))
+        except OSError as e:
+            logging.warning(f"Could not write the profile report: {e}")
 
     def _update_gui(self, func, *args, **kwargs):
         if self.winfo_exists():
@@ -1286,147 +1936,27 @@ class MokuroTranslator(TkinterDnD.Tk):
             except Exception as e:
                 logging.error(f"GUI update failed: {e}")
 
-    def check_balanced_braces(self, js_code):
-        """Check if JavaScript code has balanced braces"""
-        stack = []
-        for char in js_code:
-            if char == '{':
-                stack.append(char)
-            elif char == '}':
-                if not stack:
-                    return False
-                stack.pop()
-        return len(stack) == 0
-
-    def remove_init_text_boxes(self, js_code):
-        """Safely remove initTextBoxes function"""
-        # Look for the function with proper brace matching
-        pattern = r'function\s+initTextBoxes\s*\(\)\s*\{'
-        match = re.search(pattern, js_code)
-        
-        if not match:
-            return js_code
-            
-        start_pos = match.start()
-        brace_start = match.end() - 1  # Position of opening brace
-        
-        # Count braces to find the matching closing brace
-        brace_count = 1
-        pos = brace_start + 1
-        
-        while pos < len(js_code) and brace_count > 0:
-            if js_code[pos] == '{':
-                brace_count += 1
-            elif js_code[pos] == '}':
-                brace_count -= 1
-            pos += 1
-        
-        if brace_count == 0:
-            # Found the complete function, remove it
-            return js_code[:start_pos] + js_code[pos:]
-        
-        return js_code  # Could not find complete function
-
-    def replace_update_properties_function(self, js_code):
-        """Safely replace updateProperties function"""
-        # First, let's find the function start
-        function_start = js_code.find('function updateProperties()')
-        if function_start == -1:
-            return js_code  # Function not found, return unchanged
-        
-        # Find the opening brace
-        brace_start = js_code.find('{', function_start)
-        if brace_start == -1:
-            return js_code
-        
-        # Count braces to find the matching closing brace
-        brace_count = 1
-        pos = brace_start + 1
-        
-        while pos < len(js_code) and brace_count > 0:
-            if js_code[pos] == '{':
-                brace_count += 1
-            elif js_code[pos] == '}':
-                brace_count -= 1
-            pos += 1
-        
-        if brace_count == 0:    # Found the complete function
-            # Replace the entire function
-            new_js_code = (js_code[:function_start] + 
-                          PROPERTIES_JS_FUNC + 
-                          js_code[pos:])
-            return new_js_code
-        
-        return js_code  # Could not find complete function
-
-    def add_new_event_listeners(self, js_code):
-        """Add new event listeners without removing existing ones"""
-        # Find the location after the existing toggleOCRTextBoxes event listener
-        toggle_listener_pattern = r"(document\.getElementById\('menuToggleOCRTextBoxes'\)\.addEventListener\('click',\s*function\s*\(\)\s*\{[^}]*\}\s*,\s*false\);)"
-        
-        return re.sub(toggle_listener_pattern, r'\1' + LISTENER_JS_FUNC, js_code)
-
-    def enhance_text_box_attributes(self, text_box):
-        """Add data attributes to text boxes for JavaScript processing"""
-        if not text_box.has_attr('style'):
+    def annotate_fitted_font_size(self, text_box, translation):
+        """Precompute the font size at which the translation fits the box.
+
+        The viewer applies data-fit-font-size directly and only measures boxes
+        marked data-fit-overflow (or whose estimate turns out to overflow).
+        """
+        try:
+            width = float(text_box['data-box-width'])
+            height = float(text_box['data-box-height'])
+        except (KeyError, ValueError):
             return
-            
-        style = text_box['style']
-        
-        # Extract dimensions from style attribute
-        width_match = re.search(r'width:\s*(\d+)', style)
-        height_match = re.search(r'height:\s*(\d+)', style)
-        left_match = re.search(r'left:\s*(\d+)', style)
-        top_match = re.search(r'top:\s*(\d+)', style)
-        
-        # Enforce minimum width of 130 pixels for better readability
-        if width_match:
-            current_width = int(width_match.group(1))
-            if current_width < 130:
-                # Calculate the offset needed to center the wider box
-                width_increase = 130 - current_width
-                left_offset = width_increase // 2
-                
-                # Update the data attribute to minimum width
-                text_box['data-box-width'] = "130"
-                # Update the actual style width to minimum width
-                style = re.sub(r'width:\s*\d+', 'width:130', style)
-                
-                # Update left position to keep the box centered
-                if left_match:
-                    current_left = int(left_match.group(1))
-                    new_left = current_left - left_offset
-                    style = re.sub(r'left:\s*\d+', f'left:{new_left}', style)
-                    text_box['data-box-left'] = str(new_left)
-                
-                text_box['style'] = style
-                # Use the enforced width for calculations
-                width = 130
-            else:
-                text_box['data-box-width'] = width_match.group(1)
-                width = current_width
-        
-        if height_match:
-            text_box['data-box-height'] = height_match.group(1)
-        if left_match:
-            text_box['data-box-left'] = left_match.group(1)
-        if top_match:
-            text_box['data-box-top'] = top_match.group(1)
-        
-        # Calculate aspect ratio for better text fitting
-        if width_match and height_match:
-            height = int(height_match.group(1))
-            aspect_ratio = width / height if height > 0 else 1
-            text_box['data-aspect-ratio'] = f"{aspect_ratio:.2f}"
-            
-            # Add size category based on area
-            area = width * height
-            if area > 50000:
-                text_box['data-size-category'] = 'large'
-            elif area > 10000:
-                text_box['data-size-category'] = 'medium'
-            else:
-                text_box['data-size-category'] = 'small'
+        
+        max_size = MAX_FONT_SIZE
+        original_size = box_font_size(text_box.get('style', ''))
+        if original_size:
+            max_size = max(MIN_FONT_SIZE, min(max_size, int(original_size)))
+        
+        font_size, text_fits = fit_font_size(translation, width, height, max_size=max_size)
+        text_box['data-fit-font-size'] = str(font_size)
+        if not text_fits:
+            text_box['data-fit-overflow'] = "1"
 
     def scorched_earth_clear_and_rebuild(self, box, translation):
         """Enhanced text replacement with complete original text removal"""
@@ -1579,7 +2109,7 @@ class MokuroTranslator(TkinterDnD.Tk):
         combined_text = ' '.join(text_parts).strip()
         
         # Log what we extracted for debugging
-        logging.info(f"Extracted text from textbox: '{combined_text}'")
+        logging.debug("Extracted text from textbox: '%s'", combined_text)
         
         return combined_text
 
@@ -1708,58 +2238,25 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.after(500, lambda: self.restore_rag_drop_area_appearance())
     
     def load_rag_file(self, file_path: str) -> bool:
-        """Load a RAG file and add it to the collection.
+        """Add a RAG file to the collection; it is indexed in the background.
         
         Args:
             file_path: Path to the file to load
             
         Returns:
-            bool: True if file was successfully loaded, False otherwise
+            bool: True if file was accepted, False otherwise
         """
         try:
-            # Check if file already exists
-            for existing_file in self.rag_files:
-                if existing_file['path'] == file_path:
-                    logging.info(f"File already loaded: {file_path}")
-                    return False
-            
-            # Check file extension
-            _, ext = os.path.splitext(file_path.lower())
-            if ext not in ['.txt', '.md', '.json', '.csv', '.log']:
-                logging.warning(f"Unsupported file type: {ext}")
-                return False
-            
-            # Check file size (limit to 10MB)
-            file_size = os.path.getsize(file_path)
-            if file_size > 10 * 1024 * 1024:  # 10MB limit
-                messagebox.showwarning("File Too Large", f"File {os.path.basename(file_path)} is too large (>10MB). Skipping.")
-                return False
-            
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read().strip()
-            
-            if not content:
-                logging.warning(f"Empty file: {file_path}")
-                return False
-            
-            # Add to RAG files collection
-            self.rag_files.append({
-                'path': file_path,
-                'name': os.path.basename(file_path),
-                'content': content,
-                'size': len(content)
-            })
-            
-            # Invalidate cache
-            self.rag_content_cache = ""
-            
-            logging.info(f"Successfully loaded RAG file: {file_path}")
+            self.rag_store.add(file_path)
+            logging.info(f"Added RAG file: {file_path}")
             return True
-            
-        except Exception as e:
+        except RagFileTooLarge as e:
+            messagebox.showwarning("File Too Large", f"{e}. Skipping.")
+        except RagFileRejected as e:
+            logging.warning(str(e))
+        except OSError as e:
             logging.error(f"Failed to load RAG file {file_path}: {e}")
-            return False
+        return False
     
     def remove_selected_rag_files(self):
         """Remove selected files from the RAG collection."""
@@ -1769,14 +2266,9 @@ class MokuroTranslator(TkinterDnD.Tk):
                 messagebox.showinfo("No Selection", "Please select files to remove.")
                 return
             
-            # Remove files in reverse order to maintain indices
-            for index in reversed(selected_indices):
-                if 0 <= index < len(self.rag_files):
-                    removed_file = self.rag_files.pop(index)
-                    logging.info(f"Removed RAG file: {removed_file['name']}")
+            for removed_file in self.rag_store.remove(selected_indices):
+                logging.info(f"Removed RAG file: {removed_file.name}")
             
-            # Invalidate cache and update display
-            self.rag_content_cache = ""
             self.update_rag_display()
             
         except Exception as e:
@@ -1785,13 +2277,13 @@ class MokuroTranslator(TkinterDnD.Tk):
     
     def clear_all_rag_files(self):
         """Clear all RAG files."""
-        if not self.rag_files:
+        rag_files = self.rag_store.documents
+        if not rag_files:
             messagebox.showinfo("No Files", "No RAG files to clear.")
             return
         
-        if messagebox.askyesno("Clear All Files", f"Are you sure you want to remove all {len(self.rag_files)} RAG files?"):
-            self.rag_files.clear()
-            self.rag_content_cache = ""
+        if messagebox.askyesno("Clear All Files", f"Are you sure you want to remove all {len(rag_files)} RAG files?"):
+            self.rag_store.clear()
             self.update_rag_display()
             logging.info("Cleared all RAG files")
     
@@ -1801,16 +2293,22 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.rag_files_listbox.delete(0, tk.END)
         
         # Add files to listbox with status indicators
-        for rag_file in self.rag_files:
-            size_kb = rag_file['size'] / 1024
-            display_text = f"✓ {rag_file['name']} ({size_kb:.1f} KB)"
+        rag_files = self.rag_store.documents
+        for rag_file in rag_files:
+            size_kb = rag_file.size / 1024
+            if not rag_file.indexed.is_set():
+                status = "…"
+            elif rag_file.error:
+                status = "✗"
+            else:
+                status = "✓"
+            display_text = f"{status} {rag_file.name} ({size_kb:.1f} KB)"
             self.rag_files_listbox.insert(tk.END, display_text)
         
         # Update info label and drop area appearance based on loaded files
-        if self.rag_files:
-            total_size = sum(f['size'] for f in self.rag_files)
-            total_size_kb = total_size / 1024
-            self.rag_info_label.config(text=f"{len(self.rag_files)} files ({total_size_kb:.1f} KB)")
+        if rag_files:
+            total_size_kb = self.rag_store.total_bytes / 1024
+            self.rag_info_label.config(text=f"{len(rag_files)} files ({total_size_kb:.1f} KB)")
             
             # Update drop area to show RAG is active
             self.update_drop_area_for_loaded_files()
@@ -1821,7 +2319,7 @@ class MokuroTranslator(TkinterDnD.Tk):
     
     def update_drop_area_for_loaded_files(self):
         """Update drop area appearance when RAG files are loaded."""
-        file_count = len(self.rag_files)
+        file_count = len(self.rag_store.documents)
         if file_count == 1:
             status_text = "📁 RAG Active (1 file loaded)"
         else:
@@ -1838,42 +2336,37 @@ class MokuroTranslator(TkinterDnD.Tk):
         self.rag_drop_label.config(bg="#f1f8e9")
         self.rag_status_label.config(bg="#f1f8e9")
     
-    def get_rag_context(self) -> str:
+    def get_rag_context(self, context_length: int | None = None) -> str:
         """Get formatted RAG context for inclusion in requests.
         
+        The context is limited to a share of the model's context window; see rag_context_budget.
+        
+        Args:
+            context_length (int, optional): num_ctx of the request's model tier. Defaults to the
+                context slider (the full tier).
+        
         Returns:
             str: Formatted RAG context or empty string if no files
         """
-        if not self.rag_files:
-            return ""
-        
-        # Use cached content if available
-        if self.rag_content_cache:
-            return self.rag_content_cache
-        
-        # Build RAG context
-        context_parts = ["=== RAG CONTEXT ==="]
-        
-        for rag_file in self.rag_files:
-            context_parts.append(f"\n--- {rag_file['name']} ---")
-            context_parts.append(rag_file['content'])
-        
-        context_parts.append("\n=== END RAG CONTEXT ===\n")
-        
-        # Cache the result
-        self.rag_content_cache = '\n'.join(context_parts)
-        return self.rag_content_cache
+        if context_length is None:
+            try:
+                context_length = self.context_length.get()
+            except tk.TclError:
+                context_length = self.ollama_api.load_context_length()
+        return self.rag_store.context(rag_context_budget(context_length))
     
-    def format_request_with_rag(self, original_request: str) -> str:
+    def format_request_with_rag(self, original_request: str, context_length: int | None = None) -> str:
         """Format a request with RAG context if available.
         
         Args:
             original_request: The original request text
+            context_length (int, optional): num_ctx the request is sent with, which bounds the
+                RAG context. Defaults to the context slider (the full tier).
             
         Returns:
             str: Request with RAG context prepended, or original if no RAG
         """
-        rag_context = self.get_rag_context()
+        rag_context = self.get_rag_context(context_length)
         if not rag_context:
             return original_request
         
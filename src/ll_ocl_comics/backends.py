@@ -0,0 +1,554 @@
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+
+from deadlines import CircuitBreaker, RequestTimedOut, RequestStalled, CONNECT_TIMEOUT_SECONDS, STALL_SECONDS
+from generation_budget import GenerationMonitor, RepetitionLoopError
+from logging_utils import LazyJson
+
+# Server APIs the translator can talk to. "openai" is any server with OpenAI's
+# /v1/chat/completions, such as llama.cpp's llama-server or vLLM
+BACKEND_OLLAMA = "ollama"
+BACKEND_OPENAI = "openai"
+BACKENDS = (BACKEND_OLLAMA, BACKEND_OPENAI)
+
+DEFAULT_BASE_URLS = {
+    BACKEND_OLLAMA: "http://localhost:11434",
+    BACKEND_OPENAI: "http://localhost:8080",
+}
+
+# Sent as a bearer token to OpenAI-compatible servers started with an API key
+API_KEY_ENV_VAR = "LL_OCL_COMICS_API_KEY"
+
+# Statuses from /api/chat meaning the server doesn't have it (older Ollama builds and
+# proxies), as opposed to a failed request; only these fall back to /api/generate, and
+# only without an Ollama error body (see is_missing_endpoint)
+FALLBACK_STATUS_CODES = (404, 405, 501)
+
+
+def is_read_timeout(error: Exception) -> bool:
+    """True if a requests ConnectionError wraps a read timeout rather than a failed connection."""
+    from urllib3.exceptions import ReadTimeoutError
+
+    return any(isinstance(arg, ReadTimeoutError) for arg in error.args)
+
+
+def ollama_error(response) -> str | None:
+    """The message of an Ollama {"error": ...} body, or None if the response has none."""
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    error = body.get("error") if isinstance(body, dict) else None
+    return str(error) if error else None
+
+
+def is_missing_endpoint(response) -> bool:
+    """True if an error response means the server has no such endpoint.
+
+    Ollama itself answers a 404 with {"error": "model \"x\" not found, ..."} when the model
+    is missing; a server without the endpoint sends a bare status (or a proxy's page).
+    """
+    return response.status_code in FALLBACK_STATUS_CODES and ollama_error(response) is None
+
+
+def response_socket(response):
+    """The socket a streamed requests response is reading from, or None if it can't be found."""
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    if sock is None:
+        # Connection: close responses detach the socket from the connection; it's
+        # still reachable through the http.client response's file object
+        file_object = getattr(getattr(response.raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(file_object, "raw", None), "_sock", None)
+    return sock
+
+
+def make_backend(name: str, base_url: str | None = None) -> "Backend":
+    """Create the backend for a server API.
+
+    Args:
+        name (str): One of BACKENDS
+        base_url (str, optional): Server URL. Defaults to the backend's DEFAULT_BASE_URLS entry.
+
+    Raises:
+        ValueError: If `name` isn't a known backend
+
+    Returns:
+        Backend: The backend
+    """
+    if name == BACKEND_OLLAMA:
+        return OllamaBackend(base_url or DEFAULT_BASE_URLS[name])
+    if name == BACKEND_OPENAI:
+        return OpenAICompatibleBackend(base_url or DEFAULT_BASE_URLS[name], api_key=os.environ.get(API_KEY_ENV_VAR))
+    raise ValueError(f"Unknown backend {name!r}, expected one of {', '.join(BACKENDS)}")
+
+
+class Backend(ABC):
+    """A model server behind OllamaAPI.
+
+    Subclasses implement one HTTP API. Options and response metrics use Ollama's
+    names (num_ctx, num_predict, prompt_eval_count, eval_duration, ...), which
+    backends for other APIs translate, so the rest of the app doesn't know which
+    server it is talking to.
+    """
+
+    name = ""
+
+    def __init__(self, base_url: str, stall_seconds: float = STALL_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.stall_seconds = stall_seconds
+        # Fails generate() fast once the server stops answering, instead of timing out request by request
+        self.circuit_breaker = CircuitBreaker()
+
+    @abstractmethod
+    def check_connection(self) -> bool:
+        """Raise if the server can't be reached.
+
+        Raises:
+            RequestException: If the server couldn't be reached
+
+        Returns:
+            bool: True
+        """
+
+    @abstractmethod
+    def list_models(self) -> list[dict]:
+        """Models the server offers, in the shape of Ollama's /api/tags entries (name, digest, ...)."""
+
+    @abstractmethod
+    def get_model_info(self, model: str) -> dict:
+        """Details of a model in the shape of Ollama's /api/show, or {} if unavailable."""
+
+    def load_model(self, model: str, context_length: int | None, keep_alive: str | int) -> float:
+        """Load a model ahead of the first request and return the seconds it took (0 if the server doesn't load on demand)."""
+        return 0.0
+
+    def unload_model(self, model: str) -> bool:
+        """Ask the server to free a model's memory. True if it did or there was nothing to do."""
+        return True
+
+    @abstractmethod
+    def generate(self, model: str, system_prompt: str, prompt: str, options: dict,
+                 monitor: GenerationMonitor | None, deadline_at: float) -> tuple[str, dict]:
+        """Run one chat completion.
+
+        Args:
+            model (str): Name of the model to use
+            system_prompt (str): System message
+            prompt (str): User message
+            options (dict): Any of num_ctx, temperature, num_predict, format, keep_alive and think,
+                as OllamaAPI.generate takes them
+            monitor (GenerationMonitor | None): Stream the response through it if given
+            deadline_at (float): time.monotonic() value the response must be read by
+
+        Raises:
+            RequestTimedOut: If no complete response arrived before the deadline
+            RequestStalled: If a streamed response stopped sending data
+            RepetitionLoopError: If the monitor aborted the generation
+            RequestException: If the request failed or the server returned an error
+
+        Returns:
+            tuple[str, dict]: The response text and its metrics under Ollama's RESPONSE_METRIC_FIELDS names
+        """
+
+    def _post(self, path: str, body: dict, stream: bool, deadline_at: float, headers: dict | None = None):
+        """POST to the server, with the time left until `deadline_at` as the read timeout.
+
+        The read timeout also covers waiting for the first streamed byte (prefill can
+        take minutes); see _iter_lines for the limit between streamed lines.
+
+        Raises:
+            RequestTimedOut: If the server didn't start answering before the deadline
+            RequestException: If the request failed or the server returned an error status
+
+        Returns:
+            requests.Response: The response, its body unread if `stream`
+        """
+        import requests
+
+        read_timeout = max(1.0, deadline_at - time.monotonic())
+        try:
+            response = requests.post(f"{self.base_url}{path}", json=body, stream=stream, headers=headers,
+                                     timeout=(CONNECT_TIMEOUT_SECONDS, read_timeout))
+        except requests.exceptions.ConnectionError as e:
+            self.circuit_breaker.record_failure(e)
+            if is_read_timeout(e):
+                raise RequestTimedOut(f"No response from {self.base_url} within {read_timeout:.0f}s") from e
+            raise
+        except requests.exceptions.Timeout as e:
+            self.circuit_breaker.record_failure(e)
+            raise RequestTimedOut(f"No response from {self.base_url} within {read_timeout:.0f}s") from e
+        # A complete answer, error statuses included, means the server is up; a stream
+        # only counts once it has been read to the end (see _stream_finished)
+        if not stream or not response.ok:
+            self.circuit_breaker.record_success()
+        response.raise_for_status()
+        return response
+
+    def _stream_finished(self) -> None:
+        """Record that the server answered a streamed request: it was read to the end, or
+        ended early with an error payload, unparseable data or a repetition loop."""
+        self.circuit_breaker.record_success()
+
+    def _iter_lines(self, response, deadline_at: float):
+        """Yield the lines of a streamed response until it ends.
+
+        Reads time out after stall_seconds without data, and the stream is abandoned
+        once `deadline_at` has passed. Both count against the circuit breaker.
+
+        Raises:
+            RequestStalled: If the server stopped sending data
+            RequestTimedOut: If the deadline passed mid-stream
+        """
+        import requests
+
+        sock = response_socket(response)
+        if sock is not None:
+            sock.settimeout(self.stall_seconds)
+
+        try:
+            for line in response.iter_lines():
+                if time.monotonic() > deadline_at:
+                    response.close()
+                    raise RequestTimedOut("Generation still running at its deadline")
+                yield line
+        except requests.exceptions.ConnectionError as e:
+            # requests reports a read timeout inside a streamed body as a ConnectionError
+            if not is_read_timeout(e):
+                self.circuit_breaker.record_failure(e)
+                raise
+            response.close()
+            error = RequestStalled(f"No data from {self.base_url} for {self.stall_seconds}s")
+            self.circuit_breaker.record_failure(error)
+            raise error from e
+        except RequestTimedOut as e:
+            self.circuit_breaker.record_failure(e)
+            raise
+
+
+class OllamaBackend(Backend):
+    """Ollama's native API: /api/chat, falling back to /api/generate on servers without it."""
+
+    name = BACKEND_OLLAMA
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URLS[BACKEND_OLLAMA], stall_seconds: float = STALL_SECONDS):
+        super().__init__(base_url, stall_seconds)
+        # Set once /api/chat turns out not to exist on this server
+        self.use_generate_endpoint = False
+
+    def check_connection(self) -> bool:
+        import requests
+
+        try:
+            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response.raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            e.add_note(f"Failed to connect to Ollama at {self.base_url}. Is it running?")
+            raise e
+
+    def list_models(self) -> list[dict]:
+        import requests
+
+        response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+        response.raise_for_status()
+        return response.json().get('models', [])
+
+    def get_model_info(self, model: str) -> dict:
+        import requests
+
+        try:
+            response = requests.post(f"{self.base_url}/api/show", json={"name": model}, timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not get model info for {model}: {e}")
+            return {}
+
+    def load_model(self, model: str, context_length: int | None, keep_alive: str | int) -> float:
+        """Send an empty prompt to /api/generate, which makes Ollama load the model with the
+        given num_ctx and keep it resident for `keep_alive`.
+
+        Raises:
+            RequestException: If the model could not be loaded
+        """
+        import requests
+
+        request_data = {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}
+        if context_length and context_length > 0:
+            request_data["options"] = {"num_ctx": context_length}
+
+        response = requests.post(f"{self.base_url}/api/generate", json=request_data, timeout=600)
+        response.raise_for_status()
+        return response.json().get("load_duration", 0) / 1e9
+
+    def unload_model(self, model: str) -> bool:
+        import requests
+
+        try:
+            response = requests.post(f"{self.base_url}/api/generate", json={"model": model, "keep_alive": 0}, timeout=30)
+            response.raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not unload model {model}: {e}")
+            return False
+
+    def generate(self, model: str, system_prompt: str, prompt: str, options: dict,
+                 monitor: GenerationMonitor | None, deadline_at: float) -> tuple[str, dict]:
+        import requests
+
+        # Fields shared by both endpoints
+        common_fields = {"stream": monitor is not None}
+        model_options = {key: options[key] for key in ("num_ctx", "temperature", "num_predict") if key in options}
+        if model_options:
+            common_fields["options"] = model_options
+        for key in ("format", "keep_alive", "think"):
+            if key in options:
+                common_fields[key] = options[key]
+
+        if not self.use_generate_endpoint:
+            request_data = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                **common_fields
+            }
+            try:
+                response_data = self._request(request_data, "/api/chat", monitor, "message", "content", deadline_at)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None:
+                    raise
+                if not is_missing_endpoint(e.response):
+                    # e.g. the model isn't pulled: a normal error, the endpoint is fine
+                    error = ollama_error(e.response)
+                    if error is None:
+                        raise
+                    raise requests.exceptions.HTTPError(f"{e.response.status_code}: {error}",
+                                                        response=e.response) from e
+                logging.warning(f"Ollama has no /api/chat ({e.response.status_code}), using /api/generate from now on")
+                self.use_generate_endpoint = True
+            else:
+                text = response_data["content"] if monitor is not None else response_data['message']['content']
+                return text, response_data
+
+        # Fallback: generate endpoint with the system prompt folded into the prompt
+        fallback_data = {
+            "model": model,
+            "prompt": f"System: {system_prompt}\n\nUser: {prompt}",
+            **common_fields
+        }
+        if monitor is not None:
+            # Start the fallback with a fresh count
+            monitor.reset()
+        response_data = self._request(fallback_data, "/api/generate", monitor, None, "response", deadline_at)
+        return response_data['response'], response_data
+
+    def _request(self, request_data: dict, path: str, monitor: GenerationMonitor | None,
+                 message_key: str | None, text_key: str, deadline_at: float) -> dict:
+        """Send a generation request; returns the body, or the final chunk with the full text under `text_key` when streaming."""
+        import requests
+
+        logging.debug("Sending request: %s", LazyJson(request_data))
+        response = self._post(path, request_data, monitor is not None, deadline_at)
+        if monitor is None:
+            response_data = response.json()
+            logging.debug("Received response: %s", LazyJson(response_data))
+            return response_data
+
+        final_chunk = {}
+        for line in self._iter_lines(response, deadline_at):
+            if not line:
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                self._stream_finished()
+                raise
+            if "error" in chunk:
+                self._stream_finished()
+                raise requests.exceptions.RequestException(chunk["error"])
+            part = (chunk.get(message_key) or {}) if message_key else chunk
+            if not monitor.feed(part.get(text_key, ""), part.get("thinking", "")):
+                response.close()
+                self._stream_finished()
+                raise RepetitionLoopError(f"Generation aborted after repeating {monitor.loop_unit!r}")
+            if chunk.get("done"):
+                final_chunk = chunk
+                break
+        self._stream_finished()
+        final_chunk[text_key] = monitor.content
+        return final_chunk
+
+
+class OpenAICompatibleBackend(Backend):
+    """Servers with OpenAI's /v1/chat/completions and /v1/models, such as llama.cpp's
+    llama-server or vLLM, which batch concurrent requests.
+
+    num_ctx and keep_alive have no equivalent (these servers fix the context size and
+    keep their model loaded from startup) and aren't sent. num_predict is sent as
+    max_tokens, `format` as response_format, and `think` as the chat template's
+    enable_thinking switch.
+    """
+
+    name = BACKEND_OPENAI
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URLS[BACKEND_OPENAI], stall_seconds: float = STALL_SECONDS,
+                 api_key: str | None = None):
+        super().__init__(base_url, stall_seconds)
+        self.api_key = api_key
+        # /v1/models entries from the last listing, for get_model_info
+        self._listed_models = {}
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def check_connection(self) -> bool:
+        import requests
+
+        try:
+            response = requests.get(f"{self.base_url}/v1/models", headers=self._headers(), timeout=5)
+            response.raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            e.add_note(f"Failed to connect to the OpenAI-compatible server at {self.base_url}. Is it running?")
+            raise e
+
+    def list_models(self) -> list[dict]:
+        import requests
+
+        response = requests.get(f"{self.base_url}/v1/models", headers=self._headers(), timeout=10)
+        response.raise_for_status()
+        self._listed_models = {entry["id"]: entry for entry in response.json().get("data", [])}
+        # No digests: metadata is re-read when the catalog's TTL runs out
+        return [{"name": model_id, "digest": None} for model_id in self._listed_models]
+
+    def get_model_info(self, model: str) -> dict:
+        if model not in self._listed_models:
+            try:
+                self.list_models()
+            except Exception as e:
+                logging.warning(f"Could not get model info for {model}: {e}")
+                return {}
+        entry = self._listed_models.get(model) or {}
+        # vLLM reports max_model_len; llama-server reports the context it was started with under meta
+        context_length = entry.get("max_model_len") or (entry.get("meta") or {}).get("n_ctx") \
+            or (entry.get("meta") or {}).get("n_ctx_train")
+        if not context_length:
+            return {}
+        return {"model_info": {"server.context_length": context_length}}
+
+    def request_body(self, model: str, system_prompt: str, prompt: str, options: dict, stream: bool) -> dict:
+        """The /v1/chat/completions body for a request with Ollama-named `options`."""
+        body = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "stream": stream,
+        }
+        if stream:
+            body["stream_options"] = {"include_usage": True}
+        if "temperature" in options:
+            body["temperature"] = options["temperature"]
+        if "num_predict" in options:
+            body["max_tokens"] = options["num_predict"]
+        response_format = options.get("format")
+        if response_format == "json":
+            body["response_format"] = {"type": "json_object"}
+        elif isinstance(response_format, dict):
+            body["response_format"] = {"type": "json_schema", "json_schema": {"name": "response", "schema": response_format}}
+        if "think" in options:
+            body["chat_template_kwargs"] = {"enable_thinking": options["think"]}
+        return body
+
+    def generate(self, model: str, system_prompt: str, prompt: str, options: dict,
+                 monitor: GenerationMonitor | None, deadline_at: float) -> tuple[str, dict]:
+        import requests
+
+        body = self.request_body(model, system_prompt, prompt, options, stream=monitor is not None)
+        logging.debug("Sending request: %s", LazyJson(body))
+        started = time.perf_counter()
+        response = self._post("/v1/chat/completions", body, monitor is not None, deadline_at, self._headers())
+
+        if monitor is None:
+            response_data = response.json()
+            logging.debug("Received response: %s", LazyJson(response_data))
+            choice = response_data["choices"][0]
+            text = choice["message"].get("content") or ""
+            return text, self.response_metrics(response_data, started, None, choice.get("finish_reason"))
+
+        first_token_at = None
+        finish_reason = None
+        final_chunk = {}
+        for line in self._iter_lines(response, deadline_at):
+            # Server-sent events: "data: {...}" lines, ending with "data: [DONE]"
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                self._stream_finished()
+                raise
+            if "error" in chunk:
+                self._stream_finished()
+                raise requests.exceptions.RequestException(chunk["error"].get("message", chunk["error"])
+                                                           if isinstance(chunk["error"], dict) else chunk["error"])
+            for choice in chunk.get("choices") or []:
+                finish_reason = choice.get("finish_reason") or finish_reason
+                delta = choice.get("delta") or {}
+                content, reasoning = delta.get("content") or "", delta.get("reasoning_content") or ""
+                if not (content or reasoning):
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if not monitor.feed(content, reasoning):
+                    response.close()
+                    self._stream_finished()
+                    raise RepetitionLoopError(f"Generation aborted after repeating {monitor.loop_unit!r}")
+            if chunk.get("usage") or chunk.get("timings"):
+                final_chunk = chunk
+        self._stream_finished()
+        return monitor.content, self.response_metrics(final_chunk, started, first_token_at, finish_reason)
+
+    @staticmethod
+    def response_metrics(response_data: dict, started: float, first_token_at: float | None,
+                         finish_reason: str | None = None) -> dict:
+        """Ollama-style metrics for a completion: token counts from `usage`, durations
+        from llama-server's `timings` if present, otherwise from the client's clock.
+
+        Args:
+            response_data (dict): Non-streamed body, or the streamed chunk carrying usage
+            started (float): time.perf_counter() when the request was sent
+            first_token_at (float | None): time.perf_counter() of the first streamed token
+            finish_reason (str, optional): The choice's finish_reason, reported as done_reason
+                ("length" when max_tokens cut it off). Defaults to None.
+
+        Returns:
+            dict: Metrics in nanoseconds under RESPONSE_METRIC_FIELDS names
+        """
+        finished = time.perf_counter()
+        usage = response_data.get("usage") or {}
+        metrics = {"total_duration": int((finished - started) * 1e9), "load_duration": 0}
+        if finish_reason:
+            metrics["done_reason"] = finish_reason
+        if "prompt_tokens" in usage:
+            metrics["prompt_eval_count"] = usage["prompt_tokens"]
+        if "completion_tokens" in usage:
+            metrics["eval_count"] = usage["completion_tokens"]
+
+        timings = response_data.get("timings") or {}
+        if "prompt_ms" in timings and "predicted_ms" in timings:
+            metrics["prompt_eval_duration"] = int(timings["prompt_ms"] * 1e6)
+            metrics["eval_duration"] = int(timings["predicted_ms"] * 1e6)
+        elif first_token_at is not None:
+            metrics["prompt_eval_duration"] = int((first_token_at - started) * 1e9)
+            metrics["eval_duration"] = int((finished - first_token_at) * 1e9)
+        return metrics
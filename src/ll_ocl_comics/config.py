@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+CONFIG_FILENAME = "mokuro_translator_config.json"
+
+# The config lives next to this module unless LL_OCL_COMICS_CONFIG points elsewhere,
+# so it no longer depends on the directory the app was launched from.
+DEFAULT_CONFIG_PATH = os.environ.get(
+    "LL_OCL_COMICS_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILENAME)
+)
+
+# Seconds to wait after the last change before writing to disk
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+
+def atomic_write_json(path: os.PathLike, data) -> None:
+    """Write JSON to a temporary file next to `path`, then rename it over `path`.
+
+    Readers never observe a partially written file.
+
+    Raises:
+        IOError: If the file could not be written
+    """
+    target_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(target_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=target_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ConfigStore:
+    """In-memory view of the translator config file with debounced, atomic persistence.
+
+    The file is read once on construction. Setters update memory immediately and
+    schedule a write on a timer thread; further changes within the debounce window
+    reset the timer, so dragging a slider produces a single write. Writes go to a
+    temporary file in the same directory that is then renamed over the config file.
+    """
+
+    def __init__(self, path: os.PathLike = DEFAULT_CONFIG_PATH, debounce: float = SAVE_DEBOUNCE_SECONDS):
+        self.path = path
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self._data = self._read()
+
+    def _read(self) -> dict:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    if isinstance(data, dict):
+                        return data
+                    logging.warning("Config file %s does not contain an object. Using defaults.", self.path)
+        except (json.JSONDecodeError, IOError) as e:
+            logging.warning(f"Could not load config file: {e}. Using defaults.")
+        return {}
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def get_int(self, key: str, default: int) -> int:
+        try:
+            return int(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: float) -> float:
+        try:
+            return float(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool) -> bool:
+        return bool(self.get(key, default))
+
+    def get_str(self, key: str, default: str) -> str:
+        value = self.get(key, default)
+        return value if isinstance(value, str) else default
+
+    def set(self, key: str, value) -> None:
+        """Update a value in memory and schedule a debounced save."""
+        with self._lock:
+            if key in self._data and self._data[key] == value:
+                return
+            self._data[key] = value
+            self._dirty = True
+            self._schedule_save()
+
+    def delete(self, key: str) -> None:
+        """Remove a value in memory and schedule a debounced save."""
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self._dirty = True
+                self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> bool:
+        """Write any unsaved changes to disk immediately.
+
+        A timer that fired while another flush was writing finds nothing left to
+        save, so no write lands after a flush has returned.
+
+        Returns:
+            bool: True if the file is up to date
+        """
+        # Serialize writers so an older snapshot can never be renamed over a newer one
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return True
+                self._dirty = False
+                data = dict(self._data)
+
+            try:
+                atomic_write_json(self.path, data)
+                return True
+            except IOError as e:
+                logging.error(f"Could not save config file: {e}")
+                with self._lock:
+                    self._dirty = True
+                return False
@@ -0,0 +1,133 @@
+import threading
+import time
+
+# Connecting to a local server is instant when it's up; anything slower means it isn't
+CONNECT_TIMEOUT_SECONDS = 5
+
+# Once a streamed response has started, Ollama sends a chunk per token; this long
+# without one means the server has wedged
+STALL_SECONDS = 60
+
+# Deadlines allow this multiple of the predicted request time, and never less than
+# the minimum (covers reloading an evicted model and a cold prompt cache)
+DEADLINE_SLACK = 3.0
+MIN_DEADLINE_SECONDS = 300
+
+# For requests made without a deadline, such as the story summary's fallback path
+DEFAULT_DEADLINE_SECONDS = 3600
+
+# Consecutive connection failures, timeouts or stalls that open the circuit breaker,
+# and how long it then fails requests without contacting the server
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_SECONDS = 60
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half-open"
+
+
+class RequestTimedOut(Exception):
+    """Raised when an Ollama request runs past its deadline."""
+
+
+class RequestStalled(RequestTimedOut):
+    """Raised when a streamed Ollama response stops sending data."""
+
+
+class OllamaUnavailable(Exception):
+    """Raised without contacting Ollama while the circuit breaker is open."""
+
+
+def request_deadline(estimate, prompt_tokens: float, output_tokens: float,
+                     slack: float = DEADLINE_SLACK, minimum: float = MIN_DEADLINE_SECONDS) -> float:
+    """Seconds a request may take before it's abandoned, from the model's measured speed.
+
+    Example:
+        At 400 tok/s prefill, 25 tok/s decode and 0.5 s overhead, 2000 prompt tokens and
+        500 output tokens predict 25.5 s; with the default slack that is 76.5 s, raised
+        to the 300 s minimum.
+
+    Args:
+        estimate (ThroughputEstimate): Prefill/decode speed and per-request overhead of the model
+        prompt_tokens (float): Tokens the server has to prefill (system prompt, RAG context and request)
+        output_tokens (float): Tokens the response is expected to decode, reasoning included
+        slack (float, optional): Multiple of the predicted time to allow. Defaults to DEADLINE_SLACK.
+        minimum (float, optional): Lower bound in seconds. Defaults to MIN_DEADLINE_SECONDS.
+
+    Returns:
+        float: The deadline in seconds
+    """
+    predicted = (estimate.request_overhead_seconds
+                 + prompt_tokens / estimate.prefill_tokens_per_second
+                 + output_tokens / estimate.decode_tokens_per_second)
+    return max(minimum, predicted * slack)
+
+
+class CircuitBreaker:
+    """Fails requests fast once the server has stopped answering.
+
+    While closed, requests go through and consecutive failures are counted. After
+    `failure_threshold` in a row it opens, and check() raises OllamaUnavailable
+    without contacting the server. After `reset_seconds` a single trial request is
+    let through (half-open): its success closes the breaker, its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def check(self) -> bool:
+        """Let a request through, or refuse it while the breaker is open.
+
+        Raises:
+            OllamaUnavailable: If the breaker is open, or half-open with its trial request in flight
+
+        Returns:
+            bool: True if this request is the half-open trial; pass it to end_trial when it's done
+        """
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return False
+            if self.state == BREAKER_OPEN and self._clock() - self.opened_at >= self.reset_seconds:
+                self.state = BREAKER_HALF_OPEN
+                return True
+            retry_in = max(0.0, self.opened_at + self.reset_seconds - self._clock())
+            raise OllamaUnavailable(f"Ollama is not responding ({self.last_error}); "
+                                    f"not retrying for another {retry_in:.0f}s")
+
+    def record_success(self) -> None:
+        """The server answered; close the breaker."""
+        with self._lock:
+            self.state = BREAKER_CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def end_trial(self) -> None:
+        """The trial request is over. If it recorded neither outcome, the server still
+        answered (every way of not reaching it is recorded as a failure), so close the
+        breaker rather than leave it half-open and refusing every request."""
+        with self._lock:
+            if self.state == BREAKER_HALF_OPEN:
+                self.state = BREAKER_CLOSED
+                self.failures = 0
+                self.opened_at = None
+
+    def record_failure(self, error=None) -> None:
+        """The server couldn't be reached or stopped answering.
+
+        Args:
+            error (Exception | str, optional): What went wrong, for the OllamaUnavailable message. Defaults to None.
+        """
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = BREAKER_OPEN
+                self.opened_at = self._clock()
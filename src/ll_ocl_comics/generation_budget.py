@@ -0,0 +1,160 @@
+import logging
+
+# num_predict budget: decode tokens allowed per source character and per textbox
+# (the "Textbox N: " prefix, quotes and newline), plus a floor for tiny pages
+OUTPUT_TOKENS_PER_SOURCE_CHAR = 2.0
+OUTPUT_TOKENS_PER_TEXTBOX = 12
+MIN_NUM_PREDICT = 128
+
+# Extra decode tokens allowed for a <think> block or Ollama think mode
+DEFAULT_REASONING_BUDGET = 1024
+
+# Repetition loop detection: a unit of MIN_LOOP_PERIOD..MAX_LOOP_PERIOD characters
+# repeated LOOP_REPEATS times in a row at the end of the output, covering at least
+# MIN_LOOP_CHARS so a long scream ("AAAAAAAAAAAAAAAA!") isn't mistaken for a loop
+MIN_LOOP_PERIOD = 4
+MAX_LOOP_PERIOD = 200
+LOOP_REPEATS = 6
+MIN_LOOP_CHARS = 64
+
+# Characters decoded between loop checks
+LOOP_CHECK_INTERVAL = 64
+
+
+class RepetitionLoopError(Exception):
+    """Raised when a streamed generation is aborted because it started repeating itself."""
+
+
+def estimate_num_predict(source_chars: int, textbox_count: int, reasoning_budget: int = 0) -> int:
+    """Decode-token cap for a translation request, derived from its input.
+
+    Example:
+        estimate_num_predict(40, 3) returns 128 (the floor)
+        estimate_num_predict(200, 10, reasoning_budget=1024) returns 1544
+
+    Args:
+        source_chars (int): Characters of source text sent to the model.
+        textbox_count (int): Number of textboxes in the request.
+        reasoning_budget (int, optional): Tokens allowed for reasoning on top of the
+            translation. Defaults to 0.
+
+    Returns:
+        int: Value for Ollama's num_predict option
+    """
+    translation_budget = int(source_chars * OUTPUT_TOKENS_PER_SOURCE_CHAR + textbox_count * OUTPUT_TOKENS_PER_TEXTBOX)
+    return max(MIN_NUM_PREDICT, translation_budget) + max(0, reasoning_budget)
+
+
+def find_repetition_loop(text: str, min_period: int = MIN_LOOP_PERIOD, max_period: int = MAX_LOOP_PERIOD,
+                         repeats: int = LOOP_REPEATS) -> str | None:
+    """Return the repeated unit if `text` ends with `repeats` back-to-back copies of it.
+
+    Example:
+        find_repetition_loop('Textbox 1: "' + "Wait... " * 8) returns "Wait... "
+
+    Args:
+        text (str): Output decoded so far.
+
+    Returns:
+        str | None: The repeating unit, or None if the tail isn't looping
+    """
+    for period in range(min_period, min(max_period, len(text) // repeats) + 1):
+        unit = text[-period:]
+        if not unit.strip():
+            continue
+        if text.endswith(unit * max(repeats, -(-MIN_LOOP_CHARS // period))):
+            return unit
+    return None
+
+
+class GenerationMonitor:
+    """Watches a streamed generation: splits decode tokens into reasoning and
+    translation, and flags repetition loops so the request can be aborted.
+
+    Ollama streams one token per chunk, so chunks are counted as tokens. Text inside
+    `<anchor>...</anchor>` and Ollama's separate `thinking` field count as reasoning.
+    """
+
+    def __init__(self, anchor: str | None = "think", detect_loops: bool = True):
+        self.anchor_open = f"<{anchor}>" if anchor else None
+        self.anchor_close = f"</{anchor}>" if anchor else None
+        self.detect_loops = detect_loops
+        self._carry_length = len(self.anchor_close) - 1 if anchor else 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything seen so far, e.g. before retrying on another endpoint."""
+        self.reasoning_tokens = 0
+        self.translation_tokens = 0
+        self.loop_unit = None
+        self._in_reasoning = False
+        self._content = []
+        self._tail = ""
+        self._unchecked_chars = 0
+        self._carry = ""
+
+    @property
+    def content(self) -> str:
+        return ''.join(self._content)
+
+    def feed(self, content: str = "", thinking: str = "") -> bool:
+        """Account for one streamed chunk.
+
+        Args:
+            content (str, optional): Response text in the chunk. Defaults to "".
+            thinking (str, optional): Text from Ollama's thinking field. Defaults to "".
+
+        Returns:
+            bool: False if the generation should be aborted
+        """
+        if thinking:
+            self.reasoning_tokens += 1
+            return self._check_loop(thinking)
+
+        if not content:
+            return True
+
+        self._content.append(content)
+        # Look at the end of the previous chunk too, in case a tag was split across chunks
+        window = self._carry + content
+        self._carry = window[-self._carry_length:] if self._carry_length else ""
+        tag = self.anchor_close if self._in_reasoning else self.anchor_open
+        if tag and tag in window:
+            # The chunk that completes a tag belongs to the reasoning block
+            self._in_reasoning = not self._in_reasoning
+            self.reasoning_tokens += 1
+        elif self._in_reasoning:
+            self.reasoning_tokens += 1
+        else:
+            self.translation_tokens += 1
+        return self._check_loop(content)
+
+    def _check_loop(self, text: str) -> bool:
+        self._tail = (self._tail + text)[-max(MAX_LOOP_PERIOD * LOOP_REPEATS, MIN_LOOP_CHARS * 2):]
+        if not self.detect_loops:
+            return True
+        self._unchecked_chars += len(text)
+        if self._unchecked_chars < LOOP_CHECK_INTERVAL:
+            return True
+        self._unchecked_chars = 0
+        self.loop_unit = find_repetition_loop(self._tail)
+        if self.loop_unit is not None:
+            logging.warning("Aborting generation: output is repeating %r", self.loop_unit)
+            return False
+        return True
+
+    def token_split(self, eval_count: int | None = None) -> tuple[int, int]:
+        """Reasoning and translation decode tokens.
+
+        Args:
+            eval_count (int, optional): Ollama's exact decode count. If given, it is
+                split in the proportion observed while streaming. Defaults to None.
+
+        Returns:
+            tuple[int, int]: (reasoning tokens, translation tokens)
+        """
+        counted = self.reasoning_tokens + self.translation_tokens
+        if not eval_count or not counted:
+            return self.reasoning_tokens, self.translation_tokens
+        reasoning = round(eval_count * self.reasoning_tokens / counted)
+        return reasoning, eval_count - reasoning
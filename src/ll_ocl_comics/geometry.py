@@ -0,0 +1,177 @@
+import re
+
+# Narrow textboxes are widened to this many px so short translations stay readable
+MIN_BOX_WIDTH = 130
+
+# data-size-category thresholds (box area in px²)
+LARGE_BOX_AREA = 50000
+MEDIUM_BOX_AREA = 10000
+
+# left/top/width/height in a textbox's inline style; the lookbehind skips max-width and friends
+BOX_STYLE_PATTERN = re.compile(r'(?<![\w-])(left|top|width|height)\s*:\s*(-?\d+(?:\.\d+)?)')
+WRITING_MODE_PATTERN = re.compile(r'writing-mode\s*:\s*vertical-rl\s*;?')
+
+
+def parse_box_style(style: str) -> dict[str, float]:
+    """The left, top, width and height (px) set in a textbox's inline style, in one scan."""
+    values = {}
+    for name, value in BOX_STYLE_PATTERN.findall(style or ''):
+        values.setdefault(name, float(value))
+    return values
+
+
+def format_px(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def find_overlaps(rects: list[tuple[float, float, float, float]]) -> list[tuple[int, int]]:
+    """Index pairs of intersecting rectangles, found with a sweep along the x axis.
+
+    Boxes are visited by left edge; only boxes whose right edge is past the current
+    left edge stay active, so each box is compared with its horizontal neighbours
+    rather than the whole page.
+
+    Args:
+        rects (list[tuple]): (left, top, width, height) per box
+
+    Returns:
+        list[tuple[int, int]]: (i, j) pairs with i < j
+    """
+    order = sorted(range(len(rects)), key=lambda i: rects[i][0])
+    active = []
+    pairs = []
+    for i in order:
+        left, top, width, height = rects[i]
+        active = [j for j in active if rects[j][0] + rects[j][2] > left]
+        for j in active:
+            if rects[j][1] < top + height and top < rects[j][1] + rects[j][3]:
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+    return pairs
+
+
+def widen_rects(rects: list[tuple[float, float, float, float]], page_width: float | None = None,
+                min_width: int = MIN_BOX_WIDTH) -> list[tuple[float, float]]:
+    """Widen narrow boxes to `min_width` around their centre without creating overlaps.
+
+    A widened box may not grow into a neighbour it didn't already overlap: the gap
+    to a neighbour that stays put is the limit, and two widening neighbours split the
+    gap between them. A box that hits a limit on one side is shifted towards the
+    other, and one that can't reach `min_width` takes all the room it has. Boxes
+    that started inside the page stay inside it.
+
+    Example:
+        widen_rects([(100, 0, 50, 40)]) returns [(60, 130)]
+        widen_rects([(100, 0, 50, 40), (160, 0, 300, 40)]) returns [(30, 130), (160, 300)]
+
+    Args:
+        rects (list[tuple]): (left, top, width, height) per box
+        page_width (float, optional): Width of the page in px. Defaults to None.
+        min_width (int, optional): Width narrow boxes are widened to. Defaults to MIN_BOX_WIDTH.
+
+    Returns:
+        list[tuple[float, float]]: (left, width) per box
+    """
+    increases = [max(0, min_width - width) for _, _, width, _ in rects]
+
+    # Only boxes within reach of each other's widening can conflict
+    reach = [(left - increase, top, width + 2 * increase, height)
+             for (left, top, width, height), increase in zip(rects, increases)]
+    low = [left - increase for (left, _, _, _), increase in zip(rects, increases)]
+    high = [left + width + increase for (left, _, width, _), increase in zip(rects, increases)]
+    for i, (left, _, width, _) in enumerate(rects):
+        if page_width is not None and left >= 0 and left + width <= page_width:
+            low[i] = max(low[i], 0)
+            high[i] = min(high[i], page_width)
+
+    for i, j in find_overlaps(reach):
+        if not (increases[i] or increases[j]):
+            continue
+        a, b = (i, j) if rects[i][0] <= rects[j][0] else (j, i)
+        a_right = rects[a][0] + rects[a][2]
+        b_left = rects[b][0]
+        if a_right > b_left:
+            continue  # mokuro already drew these overlapping; widening doesn't change that
+        if increases[a] and increases[b]:
+            boundary = (a_right + b_left) // 2
+        else:
+            boundary = b_left if increases[a] else a_right
+        high[a] = min(high[a], boundary)
+        low[b] = max(low[b], boundary)
+
+    placements = []
+    for (left, _, width, _), increase, lo, hi in zip(rects, increases, low, high):
+        if not increase:
+            placements.append((left, width))
+            continue
+        new_width = min(width + increase, hi - lo)
+        new_left = min(max(left - increase // 2, lo), hi - new_width)
+        placements.append((new_left, new_width))
+    return placements
+
+
+def size_category(area: float) -> str:
+    if area > LARGE_BOX_AREA:
+        return 'large'
+    if area > MEDIUM_BOX_AREA:
+        return 'medium'
+    return 'small'
+
+
+def layout_textboxes(textboxes, page_width: float | None = None, min_width: int = MIN_BOX_WIDTH) -> dict:
+    """Prepare a page's textboxes for horizontal translated text.
+
+    Parses every box's inline style once, drops vertical writing mode, widens narrow
+    boxes (widen_rects) and writes the style and the data-box-*, data-aspect-ratio
+    and data-size-category attributes the viewer uses back in one pass.
+
+    Args:
+        textboxes: The page's `.textBox` elements
+        page_width (float, optional): Width of the page in px. Defaults to None.
+        min_width (int, optional): Width narrow boxes are widened to. Defaults to MIN_BOX_WIDTH.
+
+    Returns:
+        dict: widened (boxes made wider) and constrained (widened boxes that had to
+            shift or stay narrower than min_width to avoid a neighbour or the page edge)
+    """
+    styles = [WRITING_MODE_PATTERN.sub('', textbox.get('style', '')).strip() for textbox in textboxes]
+    boxes = [parse_box_style(style) for style in styles]
+
+    # Geometry is only resolved for boxes with a complete rectangle
+    complete = [i for i, box in enumerate(boxes) if len(box) == 4]
+    rects = [(boxes[i]['left'], boxes[i]['top'], boxes[i]['width'], boxes[i]['height']) for i in complete]
+    placements = dict(zip(complete, widen_rects(rects, page_width, min_width)))
+
+    stats = {"widened": 0, "constrained": 0}
+    for i, (textbox, style, box) in enumerate(zip(textboxes, styles, boxes)):
+        if not textbox.has_attr('style'):
+            continue
+
+        updated = dict(box)
+        if i in placements:
+            updated['left'], updated['width'] = placements[i]
+        elif 'width' in box and box['width'] < min_width:
+            # Without a full rectangle there's nothing to check against; widen as before
+            updated['width'] = min_width
+            if 'left' in box:
+                updated['left'] = box['left'] - (min_width - box['width']) // 2
+
+        if updated.get('width', 0) > box.get('width', 0):
+            stats["widened"] += 1
+            if updated['width'] < min_width or (
+                    'left' in box and updated['left'] != box['left'] - (min_width - box['width']) // 2):
+                stats["constrained"] += 1
+
+        if updated != box:
+            style = BOX_STYLE_PATTERN.sub(lambda m: f"{m.group(1)}:{format_px(updated[m.group(1)])}", style)
+        textbox['style'] = style
+
+        for name in ('width', 'height', 'left', 'top'):
+            if name in updated:
+                textbox[f'data-box-{name}'] = format_px(updated[name])
+        if 'width' in updated and 'height' in updated:
+            width, height = updated['width'], updated['height']
+            textbox['data-aspect-ratio'] = f"{width / height if height > 0 else 1:.2f}"
+            textbox['data-size-category'] = size_category(width * height)
+
+    return stats
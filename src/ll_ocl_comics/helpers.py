@@ -1,3 +1,5 @@
+import json
+
 
 def remove_between_anchors(text: str, anchor: str) -> str:
     """Removes everything from the first occurrence of `anchor` (an HTML tag
@@ -32,6 +34,51 @@ def remove_between_anchors(text: str, anchor: str) -> str:
 
     return result.strip()
 
+def parse_structured_translations(response: str, expected_ids) -> dict[int, str] | None:
+    """Parses a structured (JSON) translation response into a mapping of
+    textbox number to translated text. Accepts either a bare array of
+    {"id", "text"} objects or an object holding that array under
+    "translations". Entries whose id is not in `expected_ids` are dropped.
+
+    Example:
+        response='{"translations": [{"id": 3, "text": "Hello"}]}'
+        expected_ids={3, 4}
+        returns {3: "Hello"}
+
+    Args:
+        response (str): The raw response content from the model.
+        expected_ids (Iterable[int]): Textbox numbers that were sent in the request.
+
+    Returns:
+        dict[int, str] | None: The validated translations, or None if the
+            response is not valid structured output (callers should fall back
+            to regex parsing).
+    """
+    try:
+        data = json.loads(response)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+    if isinstance(data, dict):
+        data = data.get("translations")
+    if not isinstance(data, list):
+        return None
+
+    expected = set(expected_ids)
+    translations = {}
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            textbox_num = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        text = entry.get("text")
+        if textbox_num in expected and isinstance(text, str):
+            translations[textbox_num] = text
+
+    return translations
+
 if __name__ == "__main__":
     s = "<think> I think I am string. </think> Strong!"
     print(remove_between_anchors(s, "think"))  # outputs: Strong!
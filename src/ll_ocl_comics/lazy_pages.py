@@ -0,0 +1,65 @@
+import json
+import re
+
+# Class of the <script type="application/json"> data island holding a page's textboxes
+LAZY_PAGE_DATA_CLASS = "lazy-page-data"
+
+# Attribute the page background URL is moved to until the viewer materializes the page
+LAZY_BACKGROUND_ATTR = "data-lazy-bg"
+
+BACKGROUND_IMAGE_PATTERN = re.compile(r'background-image\s*:\s*url\(("[^"]*"|\'[^\']*\'|[^)]*)\)\s*;?', re.IGNORECASE)
+
+
+def page_data_json(html: str) -> str:
+    """JSON for a page's data island, safe to embed inside a <script> element."""
+    return json.dumps({"html": html}, ensure_ascii=False).replace("</", "<\\/")
+
+
+def dehydrate_page(soup, page_container) -> int:
+    """Move a page's textboxes into a JSON data island and defer its background image.
+
+    Args:
+        soup: BeautifulSoup document the page belongs to
+        page_container: The page's `.pageContainer` element
+
+    Returns:
+        int: Number of textboxes moved into the data island
+    """
+    textboxes = page_container.find_all('div', class_='textBox', recursive=False)
+    html = ''.join(str(textbox) for textbox in textboxes)
+    for textbox in textboxes:
+        textbox.decompose()
+
+    style = page_container.get('style', '')
+    background = BACKGROUND_IMAGE_PATTERN.search(style)
+    if background:
+        page_container[LAZY_BACKGROUND_ATTR] = background.group(1)
+        page_container['style'] = BACKGROUND_IMAGE_PATTERN.sub('', style).strip()
+
+    for image in page_container.find_all('img'):
+        image['loading'] = 'lazy'
+        image['decoding'] = 'async'
+
+    data_island = soup.new_tag('script', type='application/json', **{'class': LAZY_PAGE_DATA_CLASS})
+    data_island.string = page_data_json(html)
+    page_container.insert(0, data_island)
+    return len(textboxes)
+
+
+def dehydrate_pages(soup) -> int:
+    """Dehydrate every page of a translated mokuro document for lazy materialization.
+
+    The viewer script (LAZY_PAGES_JS_FUNC) rebuilds the current page and its
+    neighbours from their data islands and drops pages that move out of range,
+    so the live DOM stays the same size regardless of the volume's length.
+
+    Args:
+        soup: BeautifulSoup document
+
+    Returns:
+        int: Number of pages dehydrated
+    """
+    page_containers = soup.find_all('div', class_='pageContainer')
+    for page_container in page_containers:
+        dehydrate_page(soup, page_container)
+    return len(page_containers)
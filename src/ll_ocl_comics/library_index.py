@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from config import DEFAULT_CONFIG_PATH
+from lazy_pages import LAZY_PAGE_DATA_CLASS
+from sidecar import collect_translations, read_sidecar, sidecar_path_for
+
+# The index sits next to the config file
+DEFAULT_LIBRARY_INDEX_PATH = os.path.join(os.path.dirname(DEFAULT_CONFIG_PATH), "library_index.sqlite3")
+
+LIBRARY_INDEX_VERSION = 1
+
+# The trigram tokenizer matches substrings, which works for Japanese (no spaces between
+# words) as well as English; shorter queries fall back to a scan of the text columns
+MIN_FTS_QUERY_CHARS = 3
+
+SEARCH_FIELDS = ("source", "translation")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS volumes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS textboxes (
+    id INTEGER PRIMARY KEY,
+    volume_id INTEGER NOT NULL REFERENCES volumes(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    box INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS textboxes_volume ON textboxes(volume_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS textbox_text USING fts5(
+    source, translation, content='textboxes', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS textboxes_insert AFTER INSERT ON textboxes BEGIN
+    INSERT INTO textbox_text(rowid, source, translation) VALUES (new.id, new.source, new.translation);
+END;
+CREATE TRIGGER IF NOT EXISTS textboxes_delete AFTER DELETE ON textboxes BEGIN
+    INSERT INTO textbox_text(textbox_text, rowid, source, translation)
+    VALUES ('delete', old.id, old.source, old.translation);
+END;
+"""
+
+
+def translated_records(html_path: os.PathLike) -> list[dict]:
+    """Textbox records for a translated volume: from its sidecar if there is one,
+    otherwise from the HTML (without source text, which the translation replaced).
+    """
+    from bs4 import BeautifulSoup
+
+    sidecar_path = sidecar_path_for(html_path)
+    if os.path.exists(sidecar_path):
+        try:
+            return read_sidecar(sidecar_path)[1]
+        except ValueError as e:
+            logging.warning(f"Ignoring sidecar {sidecar_path}: {e}")
+
+    with open(html_path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'lxml')
+    page_containers = soup.find_all('div', class_='pageContainer')
+    # Lazy page output keeps each page's textboxes in a JSON data island
+    for page_container in page_containers:
+        data_island = page_container.find('script', class_=LAZY_PAGE_DATA_CLASS)
+        if data_island is not None:
+            page_html = json.loads(data_island.string or '{}').get('html', '')
+            data_island.replace_with(BeautifulSoup(page_html, 'html.parser'))
+    return collect_translations(page_containers)
+
+
+def fts_phrase(text: str) -> str:
+    """`text` as an FTS5 phrase, so quotes and operators in it are matched literally."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+class LibraryIndex:
+    """SQLite FTS5 index of every translated volume's source and translated text.
+
+    Each call opens its own connection, so the index can be updated from the
+    translation thread and queried from anywhere else.
+    """
+
+    def __init__(self, path: os.PathLike = DEFAULT_LIBRARY_INDEX_PATH):
+        self.path = path
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the index, creating it on first use.
+
+        Raises:
+            sqlite3.Error: If the database can't be opened
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys = ON")
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, LIBRARY_INDEX_VERSION):
+                connection.close()
+                raise sqlite3.DatabaseError(f"{self.path} has unsupported index version {version}")
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {LIBRARY_INDEX_VERSION}")
+            self._initialized = True
+        return connection
+
+    def index_volume(self, html_path: os.PathLike, records: list[dict] | None = None) -> int:
+        """Add or replace a translated volume in the index.
+
+        Args:
+            html_path (os.PathLike): The translated HTML file
+            records (list[dict], optional): Sidecar records for it. Defaults to None
+                (read the sidecar or the HTML).
+
+        Raises:
+            sqlite3.Error: If the index can't be written
+            IOError: If the volume can't be read
+
+        Returns:
+            int: Number of textboxes indexed
+        """
+        path = os.path.abspath(html_path)
+        if records is None:
+            records = translated_records(path)
+        stat = os.stat(path)
+        rows = [(record["page"], record["box"], record.get("source", ""), record.get("text", ""))
+                for record in records]
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM volumes WHERE path = ?", (path,))
+                volume_id = connection.execute(
+                    "INSERT INTO volumes (path, name, mtime, size, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                    (path, os.path.basename(path), stat.st_mtime, stat.st_size, time.time())
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO textboxes (volume_id, page, box, source, translation) VALUES (?, ?, ?, ?, ?)",
+                    [(volume_id, *row) for row in rows]
+                )
+        finally:
+            connection.close()
+        return len(rows)
+
+    def update(self, directory: os.PathLike) -> dict:
+        """Bring the index up to date with the translated volumes under `directory`.
+
+        Volumes whose file (or sidecar) changed since they were indexed are re-read,
+        new ones are added and ones that no longer exist are dropped.
+
+        Returns:
+            dict: indexed, unchanged, removed and failed volume counts
+        """
+        html_paths = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith('.html'):
+                    path = os.path.abspath(os.path.join(root, name))
+                    html_paths[path] = os.stat(path)
+
+        connection = self.connect()
+        try:
+            known = {row["path"]: row for row in connection.execute("SELECT path, mtime, size, indexed_at FROM volumes")}
+            prefix = os.path.join(os.path.abspath(directory), '')
+            removed = [path for path in known if path.startswith(prefix) and path not in html_paths]
+            with connection:
+                connection.executemany("DELETE FROM volumes WHERE path = ?", [(path,) for path in removed])
+        finally:
+            connection.close()
+
+        stats = {"indexed": 0, "unchanged": 0, "removed": len(removed), "failed": 0}
+        for path, stat in sorted(html_paths.items()):
+            row = known.get(path)
+            sidecar_path = sidecar_path_for(path)
+            sidecar_mtime = os.path.getmtime(sidecar_path) if os.path.exists(sidecar_path) else 0
+            if (row is not None and row["mtime"] == stat.st_mtime and row["size"] == stat.st_size
+                    and sidecar_mtime <= row["indexed_at"]):
+                stats["unchanged"] += 1
+                continue
+            try:
+                self.index_volume(path)
+                stats["indexed"] += 1
+            except (IOError, ValueError, KeyError) as e:
+                logging.warning(f"Could not index {path}: {e}")
+                stats["failed"] += 1
+        return stats
+
+    def search(self, query: str, field: str | None = None, limit: int = 20, volume: str | None = None) -> list[dict]:
+        """Find textboxes whose source or translation contains `query`.
+
+        Args:
+            query (str): Text to look for (matched as a substring, case-insensitively)
+            field (str, optional): "source" or "translation". Defaults to None (both).
+            limit (int, optional): Maximum results. Defaults to 20.
+            volume (str, optional): Only search volumes whose file name contains this. Defaults to None.
+
+        Raises:
+            ValueError: If `field` isn't one of SEARCH_FIELDS
+
+        Returns:
+            list[dict]: volume, path, page, box, source and translation per match, in the order
+                the volumes were indexed
+        """
+        if field is not None and field not in SEARCH_FIELDS:
+            raise ValueError(f"Unknown search field {field!r}")
+        query = query.strip()
+        if not query:
+            return []
+
+        fields = (field,) if field else SEARCH_FIELDS
+        volume_filter, volume_params = "", []
+        if volume:
+            volume_filter = " AND instr(volumes.name, ?) > 0"
+            volume_params = [volume]
+
+        if len(query) >= MIN_FTS_QUERY_CHARS:
+            columns = "{" + " ".join(fields) + "}" if len(fields) > 1 else fields[0]
+            sql = ("SELECT volumes.name AS volume, volumes.path, textboxes.page, textboxes.box, "
+                   "textboxes.source, textboxes.translation FROM textbox_text "
+                   "JOIN textboxes ON textboxes.id = textbox_text.rowid "
+                   "JOIN volumes ON volumes.id = textboxes.volume_id "
+                   f"WHERE textbox_text MATCH ?{volume_filter} ORDER BY textbox_text.rowid LIMIT ?")
+            params = [f"{columns} : {fts_phrase(query)}", *volume_params, limit]
+        else:
+            # Too short for trigrams: scan the text columns
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            condition = " OR ".join(f"textboxes.{name} LIKE ? ESCAPE '\\'" for name in fields)
+            sql = ("SELECT volumes.name AS volume, volumes.path, textboxes.page, textboxes.box, "
+                   "textboxes.source, textboxes.translation FROM textboxes "
+                   "JOIN volumes ON volumes.id = textboxes.volume_id "
+                   f"WHERE ({condition}){volume_filter} ORDER BY textboxes.id LIMIT ?")
+            params = [*([pattern] * len(fields)), *volume_params, limit]
+
+        connection = self.connect()
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def stats(self) -> dict:
+        """volumes and textboxes in the index."""
+        connection = self.connect()
+        try:
+            return {
+                "volumes": connection.execute("SELECT count(*) FROM volumes").fetchone()[0],
+                "textboxes": connection.execute("SELECT count(*) FROM textboxes").fetchone()[0],
+            }
+        finally:
+            connection.close()
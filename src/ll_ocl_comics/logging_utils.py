@@ -0,0 +1,166 @@
+import atexit
+import gzip
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Uncompressed bytes written to a trace segment before rolling over to the next one
+TRACE_SEGMENT_BYTES = 32 * 1024 * 1024
+# Number of trace segments kept per job; older segments are deleted
+TRACE_BACKUP_COUNT = 5
+
+_listener = None
+
+
+def configure_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """Route all logging through a queue so worker threads never block on terminal I/O.
+
+    Records are handed to a QueueHandler on the root logger and written to stdout by a
+    QueueListener running on its own thread. Calling this more than once is a no-op.
+
+    Args:
+        level (int, optional): Root logger level. Defaults to logging.INFO.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class LazyJson:
+    """Defers json.dumps until a log record is actually formatted.
+
+    Example:
+        logging.debug("Sending request: %s", LazyJson(request_data))
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return json.dumps(self.data, indent=2, ensure_ascii=False)
+
+
+class TraceSpool:
+    """Writes large prompt/response payloads to a compressed, rotating per-job trace file.
+
+    Each payload is stored as one JSON line in `<job_id>.<n>.jsonl.gz` inside `trace_dir`
+    and is referenced from the console log by the id returned from `spool`. Compression
+    and disk writes happen on a background thread, so `spool` only enqueues.
+    """
+
+    def __init__(self, trace_dir: os.PathLike, job_id: str | None = None,
+                 max_bytes: int = TRACE_SEGMENT_BYTES, backup_count: int = TRACE_BACKUP_COUNT):
+        self.trace_dir = trace_dir
+        self.job_id = job_id or time.strftime("job-%Y%m%d-%H%M%S")
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._counter = itertools.count(1)
+        self._queue = queue.SimpleQueue()
+        self._segment = 0
+        self._segment_bytes = 0
+        self._file = None
+
+        os.makedirs(self.trace_dir, exist_ok=True)
+        self._writer = threading.Thread(target=self._write_loop, name=f"trace-{self.job_id}", daemon=True)
+        self._writer.start()
+
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.trace_dir, f"{self.job_id}.{self._segment}.jsonl.gz")
+
+    def spool(self, kind: str, payload: str, **fields) -> str:
+        """Queue a payload for writing and return the id it will be stored under.
+
+        Args:
+            kind (str): Payload type, e.g. "request" or "response"
+            payload (str): The payload text
+            **fields: Extra JSON-serializable metadata stored with the payload
+
+        Returns:
+            str: Trace id, e.g. "job-20250101-120000#42"
+        """
+        trace_id = f"{self.job_id}#{next(self._counter)}"
+        self._queue.put({"id": trace_id, "kind": kind, "time": time.time(), **fields, "payload": payload})
+        return trace_id
+
+    def close(self) -> None:
+        """Flush queued payloads and close the current segment."""
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._write(json.dumps(record, ensure_ascii=False) + "\n")
+            except (OSError, TypeError, ValueError) as e:
+                # Never let tracing failures reach the translation thread
+                sys.stderr.write(f"Trace spool write failed: {e}\n")
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, line: str) -> None:
+        data = line.encode("utf-8")
+        if self._file is None or self._segment_bytes + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._segment_bytes += len(data)
+
+    def _rotate(self) -> None:
+        if self._file:
+            self._file.close()
+            self._segment += 1
+        self._file = gzip.open(self.current_path, "wb", compresslevel=6)
+        self._segment_bytes = 0
+
+        expired = self._segment - self.backup_count
+        if expired >= 0:
+            expired_path = os.path.join(self.trace_dir, f"{self.job_id}.{expired}.jsonl.gz")
+            if os.path.exists(expired_path):
+                os.remove(expired_path)
+
+
+def read_trace(path: os.PathLike) -> list[dict]:
+    """Read every record from a trace segment written by TraceSpool.
+
+    Args:
+        path (os.PathLike): Path to a .jsonl.gz trace segment
+
+    Returns:
+        list[dict]: The stored records, in write order
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
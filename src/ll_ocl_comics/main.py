@@ -1,31 +1,213 @@
 
-from app import MokuroTranslator
+import time
+
+# Taken before anything else is imported so startup timings include import time
+STARTED_AT = time.perf_counter()
+
+from logging_utils import configure_logging
+import argparse
 import logging
+import os
 import sys
 import traceback
 
-def main():
-    # Configure logging to show debug output in terminal
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+# Startup benchmark results are appended here (next to the config file) unless a file is given
+STARTUP_BENCHMARK_FILENAME = "startup_benchmark.jsonl"
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Translate mokuro manga HTML with a local LLM. Runs the GUI without a command.")
+    parser.add_argument("--profile", nargs="?", const="sample", choices=["sample", "cprofile"],
+                        help="Profile every GUI job and write stage timings and a stack profile to <output dir>/profiles "
+                             "(default mode: sample, cheap enough for long runs; cprofile records every call)")
+    parser.add_argument("--backend", choices=["ollama", "openai"],
+                        help="Model server API: ollama, or openai for servers with /v1/chat/completions such as "
+                             "llama.cpp's llama-server or vLLM (remembered for later runs)")
+    parser.add_argument("--server-url", help="URL of the model server (remembered for later runs; "
+                                             "default: the saved one, or the backend's usual local port)")
+    parser.add_argument("--startup-benchmark", nargs="?", const="", metavar="FILE",
+                        help="Open the GUI, append the time to first paint and to interactive to FILE "
+                             f"(default: {STARTUP_BENCHMARK_FILENAME} next to the config file) and exit")
+    subparsers = parser.add_subparsers(dest="command")
+
+    apply_parser = subparsers.add_parser("apply", help="Merge a translation sidecar into a mokuro HTML file")
+    apply_parser.add_argument("sidecar", help="Sidecar written during translation (<name>.translations.jsonl)")
+    apply_parser.add_argument("html", help="mokuro HTML file to apply it to")
+    apply_parser.add_argument("-o", "--output", help="Output file (default: <name>.translated.html next to the HTML file)")
+    apply_parser.add_argument("--link", action="store_true",
+                              help="Load the sidecar in the viewer at runtime instead of writing the translations into the HTML")
+    apply_parser.add_argument("--lazy-pages", action="store_true", help="Write lazy page output")
+
+    index_parser = subparsers.add_parser("index", help="Add the translated volumes in a directory to the library search index")
+    index_parser.add_argument("directory", help="Directory of translated HTML files (searched recursively)")
+    index_parser.add_argument("--index", help="Index database (default: next to the config file)")
+
+    search_parser = subparsers.add_parser("search", help="Search the source and translated text of the library")
+    search_parser.add_argument("query", help="Text to look for")
+    search_parser.add_argument("--field", choices=["source", "translation"], help="Only search this text (default: both)")
+    search_parser.add_argument("--volume", help="Only search volumes whose file name contains this")
+    search_parser.add_argument("-n", "--limit", type=int, default=20, help="Maximum results (default: 20)")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    search_parser.add_argument("--index", help="Index database (default: next to the config file)")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve translated volumes to browsers on the local network")
+    serve_parser.add_argument("directories", nargs="+", help="Output directories of translated HTML")
+    serve_parser.add_argument("--source", action="append", default=[],
+                              help="Another directory to find page images in (the input directories used "
+                                   "for translation are found automatically); can be repeated")
+    serve_parser.add_argument("--host", default="0.0.0.0", help="Address to listen on (default: every interface)")
+    # Left unset here so the GUI doesn't import the server for its default port
+    serve_parser.add_argument("--port", type=int,
+                              help="Port to listen on, 0 for any free one (default: the reader server's usual port)")
+
+    return parser
+
+def run_apply(args) -> int:
+    from sidecar import apply_sidecar_file, translated_path_for
+    from viewer_patch import PatchCache
+
+    output_path = args.output or translated_path_for(args.html)
+    # Overwriting the source would leave nothing to re-apply the sidecar to
+    if os.path.exists(output_path) and os.path.samefile(output_path, args.html):
+        print(f"ERROR: {output_path} is the mokuro file itself; choose another output with -o", file=sys.stderr)
+        return 1
+    try:
+        stats = apply_sidecar_file(args.html, args.sidecar, output_path, link=args.link,
+                                   lazy_pages=args.lazy_pages, patch_cache=PatchCache())
+    except (IOError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    from reader_server import precompress
+    try:
+        precompress(output_path)
+    except IOError as e:
+        logging.warning(f"Could not write compressed copies of {output_path}: {e}")
+
+    if args.link:
+        print(f"Linked {os.path.basename(args.sidecar)} into {output_path}")
+    else:
+        print(f"Applied {stats['applied']} translations to {output_path} "
+              f"({stats['missing']} missing, {stats['mismatched']} mismatched)")
+    return 0
+
+def open_library_index(args):
+    from library_index import DEFAULT_LIBRARY_INDEX_PATH, LibraryIndex
+
+    return LibraryIndex(args.index or DEFAULT_LIBRARY_INDEX_PATH)
+
+def run_index(args) -> int:
+    import sqlite3
+
+    try:
+        stats = open_library_index(args).update(args.directory)
+    except (sqlite3.Error, IOError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Indexed {stats['indexed']} volumes ({stats['unchanged']} unchanged, "
+          f"{stats['removed']} removed, {stats['failed']} failed)")
+    return 0
+
+def run_search(args) -> int:
+    import json
+    import sqlite3
+    import time
+
+    start = time.perf_counter()
+    try:
+        results = open_library_index(args).search(args.query, field=args.field, limit=args.limit, volume=args.volume)
+    except sqlite3.Error as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+            continue
+        print(f"{result['volume']} p.{result['page'] + 1} #{result['box'] + 1}")
+        if result['source']:
+            print(f"  {result['source']}")
+        print(f"  {result['translation']}")
+    if not args.json:
+        print(f"{len(results)} results in {elapsed_ms:.1f} ms")
+    return 0 if results else 1
+
+def run_serve(args) -> int:
+    import socket
+
+    from reader_server import DEFAULT_READER_PORT, ReaderServer
+
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            print(f"ERROR: {directory} is not a directory", file=sys.stderr)
+            return 1
+    port = DEFAULT_READER_PORT if args.port is None else args.port
+    try:
+        server = ReaderServer(args.directories, args.source, host=args.host, port=port)
+    except OSError as e:
+        print(f"ERROR: Could not listen on {args.host}:{port}: {e}", file=sys.stderr)
+        return 1
+
+    port = server.server_address[1]
+    host = args.host
+    if host in ("0.0.0.0", ""):
+        # The address other devices on the network can reach
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                probe.connect(("192.0.2.1", 9))
+                host = probe.getsockname()[0]
+        except OSError:
+            host = socket.gethostname()
+    print(f"Serving {len(server.volumes())} volumes at http://{host}:{port}/ (Ctrl+C to stop)")
+    for root in server.roots:
+        print(f"  {root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
+    return 0
+
+def main(argv=None):
+    # Log through a background queue listener so the translation thread never waits on the terminal
+    configure_logging(logging.INFO)
+    
+    args = build_parser().parse_args(argv)
+    if args.command == "apply":
+        return run_apply(args)
+    if args.command == "index":
+        return run_index(args)
+    if args.command == "search":
+        return run_search(args)
+    if args.command == "serve":
+        return run_serve(args)
+    
+    run_gui(args.profile, args.startup_benchmark, args.backend, args.server_url)
+
+def run_gui(profile_mode=None, startup_benchmark=None, backend=None, server_url=None):
+    from app import MokuroTranslator
     
-    # Set root logger level
-    logging.getLogger().setLevel(logging.INFO)
+    if startup_benchmark == "":
+        from config import DEFAULT_CONFIG_PATH
+        startup_benchmark = os.path.join(os.path.dirname(DEFAULT_CONFIG_PATH), STARTUP_BENCHMARK_FILENAME)
     
-    print("Starting Mokuro Translator with debug logging enabled...")
-    print("All translation requests and responses will be logged to this terminal.")
+    print("Starting Mokuro Translator...")
+    print("Translation summaries are logged to this terminal; full requests and responses")
+    print("are written to compressed trace files in <output dir>/traces.")
     print("=" * 60)
     
     try:
         # Create and run the app - let GUI initialization errors propagate
-        app = MokuroTranslator()
+        app = MokuroTranslator(server_url, profile_mode=profile_mode, started_at=STARTED_AT,
+                               startup_benchmark=startup_benchmark, backend=backend)
         print("GUI initialized successfully. Starting main loop...")
         app.mainloop()
+        if startup_benchmark:
+            timings = app.startup_timings
+            print(f"First paint after {timings['first_paint_seconds']:.3f}s, interactive after "
+                  f"{timings['interactive_seconds']:.3f}s (appended to {startup_benchmark})")
         print("Application closed normally.")
         
     except KeyboardInterrupt:
@@ -42,4 +224,4 @@ def main():
             pass
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from config import DEFAULT_CONFIG_PATH, atomic_write_json
+
+# The catalog cache sits next to the config file
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(DEFAULT_CONFIG_PATH), "model_catalog.json")
+
+# Seconds before cached model metadata is re-fetched from /api/show
+CATALOG_TTL_SECONDS = 24 * 60 * 60
+
+# Context length used when a model reports nothing usable
+DEFAULT_CONTEXT_LENGTH = 4096
+
+
+def parse_model_metadata(model_info: dict) -> dict:
+    """Extract the fields the translator cares about from an /api/show response.
+
+    Args:
+        model_info (dict): The JSON body returned by /api/show (may be empty)
+
+    Returns:
+        dict: context_length (int), parameter_size, quantization, family (str, "" if unknown)
+            and capabilities (list[str], e.g. ["completion", "thinking"])
+    """
+    details = model_info.get('details') or {}
+    parameter_size = details.get('parameter_size', '')
+    metadata = {
+        "context_length": None,
+        "parameter_size": parameter_size,
+        "quantization": details.get('quantization_level', ''),
+        "family": details.get('family', ''),
+        "capabilities": list(model_info.get('capabilities') or []),
+    }
+
+    # An explicit num_ctx in the modelfile parameters wins, since that's what Ollama will use
+    parameters = model_info.get('parameters')
+    if isinstance(parameters, dict) and 'num_ctx' in parameters:
+        metadata["context_length"] = int(parameters['num_ctx'])
+    elif isinstance(parameters, str):
+        ctx_match = re.search(r'num_ctx\s+(\d+)', parameters)
+        if ctx_match:
+            metadata["context_length"] = int(ctx_match.group(1))
+
+    if metadata["context_length"] is None and 'modelfile' in model_info:
+        ctx_match = re.search(r'PARAMETER\s+num_ctx\s+(\d+)', model_info['modelfile'], re.IGNORECASE)
+        if ctx_match:
+            metadata["context_length"] = int(ctx_match.group(1))
+
+    # Newer Ollama versions report the trained context length as "<architecture>.context_length"
+    if metadata["context_length"] is None:
+        for key, value in (model_info.get('model_info') or {}).items():
+            if key.endswith('.context_length'):
+                metadata["context_length"] = int(value)
+                break
+
+    # Estimate based on parameter size - this is a rough heuristic
+    if metadata["context_length"] is None and parameter_size:
+        if '70B' in parameter_size or '65B' in parameter_size:
+            metadata["context_length"] = 32768  # Large models typically support more context
+        elif '13B' in parameter_size or '7B' in parameter_size:
+            metadata["context_length"] = 8192   # Medium models
+        else:
+            metadata["context_length"] = 4096   # Smaller models
+
+    if metadata["context_length"] is None:
+        metadata["context_length"] = DEFAULT_CONTEXT_LENGTH
+
+    return metadata
+
+
+class ModelCatalog:
+    """Persistent cache of the installed Ollama models and their parsed metadata.
+
+    The last-known catalog is read from disk on construction so the GUI can show it
+    immediately; `refresh` (meant to run on a background thread) re-lists models and
+    only calls /api/show for models that are new, changed (different digest) or whose
+    metadata is older than the TTL.
+    """
+
+    def __init__(self, ollama_api, path: os.PathLike = DEFAULT_CATALOG_PATH, ttl: float = CATALOG_TTL_SECONDS):
+        self.ollama_api = ollama_api
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = self._read()
+        for name, entry in self._data["models"].items():
+            self.ollama_api.model_metadata.setdefault(name, entry["metadata"])
+
+    def _read(self) -> dict:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and data.get('base_url') == self.ollama_api.base_url:
+                    return data
+        except (json.JSONDecodeError, IOError) as e:
+            logging.warning(f"Could not load model catalog cache: {e}")
+        return {"base_url": self.ollama_api.base_url, "fetched_at": 0, "models": {}, "order": []}
+
+    def model_names(self) -> list[str]:
+        """Model names from the last successful refresh, in Ollama's order."""
+        with self._lock:
+            return list(self._data["order"])
+
+    def get_metadata(self, model_name: str) -> dict | None:
+        """Parsed metadata for a model, or None if it isn't in the catalog."""
+        with self._lock:
+            entry = self._data["models"].get(model_name)
+            return dict(entry["metadata"]) if entry else None
+
+    def max_context(self, model_name: str) -> int:
+        """Context length for a model, falling back to DEFAULT_CONTEXT_LENGTH if unknown."""
+        metadata = self.get_metadata(model_name)
+        return metadata["context_length"] if metadata else DEFAULT_CONTEXT_LENGTH
+
+    def is_stale(self) -> bool:
+        with self._lock:
+            return time.time() - self._data["fetched_at"] > self.ttl
+
+    def _fetch_entry(self, name: str, digest: str | None, previous: dict | None, now: float) -> dict:
+        """Fetch a model's metadata for the catalog.
+
+        When the server returns no metadata (failed /api/show, or an OpenAI-compatible server
+        that doesn't report a context size) the previous metadata is kept, or placeholder
+        metadata used, with fetched_at 0 so the next refresh asks again instead of caching
+        the guess for the whole TTL.
+        """
+        model_info = self.ollama_api.get_model_info(name)
+        if model_info:
+            return {"digest": digest, "fetched_at": now, "metadata": parse_model_metadata(model_info)}
+        logging.debug(f"No metadata for {name}, will ask again on the next refresh")
+        metadata = previous["metadata"] if previous else parse_model_metadata({})
+        return {"digest": digest, "fetched_at": 0, "metadata": metadata}
+
+    def refresh(self) -> list[str]:
+        """Re-list models from Ollama and update metadata where needed. Blocking.
+
+        Raises:
+            RequestException: If Ollama could not be reached
+
+        Returns:
+            list[str]: The current model names
+        """
+        now = time.time()
+        tags = self.ollama_api.list_models()
+
+        with self._lock:
+            cached = dict(self._data["models"])
+
+        models = {}
+        for tag in tags:
+            name = tag['name']
+            entry = cached.get(name)
+            # Entries cached before capabilities were parsed can't tell whether a model thinks
+            if (entry is None or entry.get('digest') != tag.get('digest')
+                    or now - entry.get('fetched_at', 0) > self.ttl
+                    or "capabilities" not in entry.get('metadata', {})):
+                entry = self._fetch_entry(name, tag.get('digest'), entry, now)
+            models[name] = entry
+            self.ollama_api.model_metadata[name] = entry["metadata"]
+
+        with self._lock:
+            self._data = {
+                "base_url": self.ollama_api.base_url,
+                "fetched_at": now,
+                "models": models,
+                "order": [tag['name'] for tag in tags],
+            }
+            data = dict(self._data)
+
+        try:
+            atomic_write_json(self.path, data)
+        except IOError as e:
+            logging.warning(f"Could not save model catalog cache: {e}")
+
+        return data["order"]
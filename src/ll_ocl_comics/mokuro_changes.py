@@ -34,76 +34,107 @@ function updateProperties() {
     // New feature toggles
     if (state.alwaysShowTranslation) {
         pc.classList.add('always-show-translation');
-        // Update text background positioning after DOM is ready
-        setTimeout(updateTextBackgrounds, 0);
     } else {
         pc.classList.remove('always-show-translation');
     }
     if (state.constrainText) {
         pc.classList.add('constrain-text');
-        // Apply smart font scaling when constrain text is enabled
-        applySmartFontScaling();
     } else {
         pc.classList.remove('constrain-text');
         // Reset font sizes when constrain text is disabled
         resetFontSizes();
     }
-}
-
-// Smart font scaling function
-function applySmartFontScaling() {
-    const textBoxes = document.querySelectorAll('.textBox');
+    // Font scaling and text backgrounds run for the visible pages on the next frame
+    scheduleLayout();
+}
+
+// Smart font scaling function.
+// The translator precomputes a fitted size per box (data-fit-font-size). Those sizes are
+// applied in one pass of writes, then read back in one pass (a single reflow); only boxes
+// that still overflow, or have no precomputed size, fall back to a measured binary search.
+function applySmartFontScaling(textBoxes) {
+    textBoxes = textBoxes || getVisibleTextBoxes();
+    const precomputed = [];
+    const toMeasure = [];
+    
+    // Pass 1: writes only
     textBoxes.forEach(textBox => {
         const paragraph = textBox.querySelector('p');
         if (!paragraph || !paragraph.textContent.trim()) return;
         
-        // Get text box dimensions from style attribute
-        const style = textBox.getAttribute('style');
-        // NOTE: Double backslashes below are intentional - this JavaScript code lives inside a Python string,
-        const widthMatch = style.match(/width:\\s*(\\d+)/);
-        const heightMatch = style.match(/height:\\s*(\\d+)/);
-        
-        if (!widthMatch || !heightMatch) return;
-        
-        const boxWidth = parseInt(widthMatch[1]);
-        const boxHeight = parseInt(heightMatch[1]);
-        
-        // Account for padding
-        const availableWidth = boxWidth - 4;
-        const availableHeight = boxHeight - 4;
+        const fitSize = parseInt(textBox.getAttribute('data-fit-font-size'));
+        if (fitSize && !textBox.hasAttribute('data-fit-overflow')) {
+            paragraph.style.fontSize = fitSize + 'px';
+            textBox.setAttribute('data-scaled-font-size', fitSize);
+            precomputed.push([textBox, paragraph]);
+        } else {
+            toMeasure.push([textBox, paragraph]);
+        }
+    });
+    
+    // Pass 2: reads only, to catch estimates the browser's font renders wider
+    precomputed.forEach(([textBox, paragraph]) => {
+        const box = getBoxDimensions(textBox);
+        if (box && (paragraph.scrollWidth > box.availableWidth || paragraph.scrollHeight > box.availableHeight)) {
+            toMeasure.push([textBox, paragraph]);
+        }
+    });
+    
+    // Pass 3: measured fallback
+    toMeasure.forEach(([textBox, paragraph]) => measureFontSize(textBox, paragraph));
+}
+
+// Text box content area from its style attribute, accounting for padding
+function getBoxDimensions(textBox) {
+    const style = textBox.getAttribute('style');
+    // NOTE: Double backslashes below are intentional - this JavaScript code lives inside a Python string,
+    const widthMatch = style.match(/width:\\s*(\\d+)/);
+    const heightMatch = style.match(/height:\\s*(\\d+)/);
+    
+    if (!widthMatch || !heightMatch) return null;
+    
+    return {
+        availableWidth: parseInt(widthMatch[1]) - 4,
+        availableHeight: parseInt(heightMatch[1]) - 4
+    };
+}
+
+// Binary search for the largest font size that fits, measuring each step
+function measureFontSize(textBox, paragraph) {
+    const box = getBoxDimensions(textBox);
+    if (!box) return;
+    
+    // Start with current font size or default
+    let fontSize = parseInt(window.getComputedStyle(paragraph).fontSize) || 16;
+    const minFontSize = 16;  // Minimum font size to prevent too small text
+    const maxFontSize = 60;
+    
+    // Binary search for optimal font size
+    let low = minFontSize;
+    let high = Math.min(fontSize, maxFontSize);
+    let bestSize = minFontSize;
+    
+    while (low <= high) {
+        const testSize = Math.floor((low + high) / 2);
+        paragraph.style.fontSize = testSize + 'px';
         
-        // Start with current font size or default
-        let fontSize = parseInt(window.getComputedStyle(paragraph).fontSize) || 16;
-        const minFontSize = 16;  // Minimum font size to prevent too small text
-        const maxFontSize = 60;
+        // Force reflow to get accurate measurements
+        paragraph.offsetHeight;
         
-        // Binary search for optimal font size
-        let low = minFontSize;
-        let high = Math.min(fontSize, maxFontSize);
-        let bestSize = minFontSize;
+        const textWidth = paragraph.scrollWidth;
+        const textHeight = paragraph.scrollHeight;
         
-        while (low <= high) {
-            const testSize = Math.floor((low + high) / 2);
-            paragraph.style.fontSize = testSize + 'px';
-            
-            // Force reflow to get accurate measurements
-            paragraph.offsetHeight;
-            
-            const textWidth = paragraph.scrollWidth;
-            const textHeight = paragraph.scrollHeight;
-            
-            if (textWidth <= availableWidth && textHeight <= availableHeight) {
-                bestSize = testSize;
-                low = testSize + 1;
-            } else {
-                high = testSize - 1;
-            }
+        if (textWidth <= box.availableWidth && textHeight <= box.availableHeight) {
+            bestSize = testSize;
+            low = testSize + 1;
+        } else {
+            high = testSize - 1;
         }
-        
-        // Apply the best font size found
-        paragraph.style.fontSize = bestSize + 'px';
-        textBox.setAttribute('data-scaled-font-size', bestSize);
-    });
+    }
+    
+    // Apply the best font size found
+    paragraph.style.fontSize = bestSize + 'px';
+    textBox.setAttribute('data-scaled-font-size', bestSize);
 }
 
 // Reset font sizes function
@@ -129,36 +160,110 @@ function measureTextDimensions(element) {
     };
 }
 
-// Debounced resize handler for responsive font scaling
-let resizeTimeout;
-function handleResize() {
-    clearTimeout(resizeTimeout);
-    resizeTimeout = setTimeout(() => {
-        if (state.constrainText) {
-            applySmartFontScaling();
+// Viewport-scoped layout: only pages on screen are laid out, at most once per frame.
+// An IntersectionObserver tracks which pages are visible (a page flip hides one page
+// and shows another), and a ResizeObserver replaces the global resize listeners.
+var viewportLayout = null;
+
+function ensureViewportLayout() {
+    if (viewportLayout) return viewportLayout;
+    
+    viewportLayout = {
+        visiblePages: new Set(),
+        dirtyPages: new Set(),
+        frame: 0
+    };
+    const pages = document.querySelectorAll('.pageContainer');
+    
+    if (window.IntersectionObserver) {
+        const intersectionObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    viewportLayout.visiblePages.add(entry.target);
+                    scheduleLayout(entry.target);
+                } else {
+                    viewportLayout.visiblePages.delete(entry.target);
+                }
+            });
+        });
+        pages.forEach(page => intersectionObserver.observe(page));
+    } else {
+        // No observer support: treat every page as visible
+        pages.forEach(page => viewportLayout.visiblePages.add(page));
+    }
+    
+    if (window.ResizeObserver) {
+        let observedOnce = false;
+        new ResizeObserver(() => {
+            // The observer fires once on observe(); the initial layout is already scheduled
+            if (observedOnce) scheduleLayout();
+            observedOnce = true;
+        }).observe(document.documentElement);
+    } else {
+        window.addEventListener('resize', () => scheduleLayout());
+    }
+    
+    return viewportLayout;
+}
+
+// Queue a layout pass for one page, or for every visible page
+function scheduleLayout(page) {
+    const layout = ensureViewportLayout();
+    if (page) {
+        layout.dirtyPages.add(page);
+    } else {
+        layout.visiblePages.forEach(visiblePage => layout.dirtyPages.add(visiblePage));
+    }
+    if (!layout.frame) {
+        layout.frame = requestAnimationFrame(runLayoutPass);
+    }
+}
+
+function runLayoutPass() {
+    const layout = ensureViewportLayout();
+    layout.frame = 0;
+    const textBoxes = [];
+    layout.dirtyPages.forEach(page => {
+        // Pages hidden since they were queued are laid out when they come back
+        if (layout.visiblePages.has(page)) {
+            textBoxes.push(...page.querySelectorAll('.textBox'));
         }
-    }, 250);
+    });
+    layout.dirtyPages.clear();
+    if (!textBoxes.length) return;
+    
+    if (state.constrainText) {
+        applySmartFontScaling(textBoxes);
+    }
+    if (state.alwaysShowTranslation) {
+        updateTextBackgrounds(textBoxes);
+    }
 }
 
-// Add resize listener
-window.addEventListener('resize', handleResize);
+function getVisibleTextBoxes() {
+    const textBoxes = [];
+    ensureViewportLayout().visiblePages.forEach(page => textBoxes.push(...page.querySelectorAll('.textBox')));
+    return textBoxes;
+}
 
-// Function to update text background positioning and sizing
-function updateTextBackgrounds() {
+// Function to update text background positioning and sizing.
+// All rectangles are read first, then all properties are written, so the pass costs one reflow.
+function updateTextBackgrounds(textBoxes) {
     if (!state.alwaysShowTranslation) return;
     
-    const textBoxes = document.querySelectorAll('.always-show-translation .textBox');
+    textBoxes = textBoxes || getVisibleTextBoxes();
+    
+    // Pass 1: reads only
+    const measurements = [];
     textBoxes.forEach(textBox => {
         const paragraph = textBox.querySelector('p');
         if (!paragraph || !paragraph.textContent.trim()) return;
         
-        // Force a reflow to get accurate measurements
-        paragraph.offsetHeight;
-        
-        // Get text dimensions
-        const textRect = paragraph.getBoundingClientRect();
-        const boxRect = textBox.getBoundingClientRect();
-        
+        measurements.push([textBox, paragraph.getBoundingClientRect(), textBox.getBoundingClientRect()]);
+    });
+    
+    // Pass 2: writes only
+    measurements.forEach(([textBox, textRect, boxRect]) => {
         // Calculate relative position within the textBox
         const relativeLeft = textRect.left - boxRect.left;
         const relativeTop = textRect.top - boxRect.top;
@@ -177,18 +282,11 @@ function updateTextBackgrounds() {
     });
 }
 
-// Update text backgrounds when window resizes
-window.addEventListener('resize', () => {
-    clearTimeout(resizeTimeout);
-    resizeTimeout = setTimeout(() => {
-        if (state.constrainText) {
-            applySmartFontScaling();
-        }
-        if (state.alwaysShowTranslation) {
-            updateTextBackgrounds();
-        }
-    }, 250);
-});
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', ensureViewportLayout);
+} else {
+    ensureViewportLayout();
+}
 """
 
 LISTENER_JS_FUNC = """
@@ -422,3 +520,89 @@ ALWAYS_SHOW_TRANSLATION_JS_FUNC = """
 UPDATE_PAGE_JS_ORIGINAL = """getPage(state.page_idx).style.display = "none";"""
 
 UPDATE_PAGE_JS_FUNC = """getPage(state.page_idx).style.display = "none";"""
+
+# Prepended to updatePage in lazy page mode so the target page and its neighbours
+# are materialized before the page is shown
+LAZY_UPDATE_PAGE_JS_FUNC = """if (typeof new_page_idx !== 'undefined') { materializeAround(new_page_idx); }
+getPage(state.page_idx).style.display = "none";"""
+
+# Appended to the viewer script in lazy page mode (see lazy_pages.dehydrate_pages).
+# Each page keeps its textboxes in a JSON data island; only pages within
+# LAZY_PAGE_RADIUS of the current page have live textbox DOM and a background image.
+LAZY_PAGES_JS_FUNC = """
+const LAZY_PAGE_RADIUS = 2;
+var lazyPageContainers = null;
+
+function getLazyPageContainers() {
+    if (!lazyPageContainers) {
+        lazyPageContainers = Array.from(document.querySelectorAll('.pageContainer'));
+    }
+    return lazyPageContainers;
+}
+
+function materializePage(container) {
+    if (container.hasAttribute('data-materialized')) return;
+    
+    const island = container.querySelector('script.lazy-page-data');
+    if (island) {
+        island.insertAdjacentHTML('afterend', JSON.parse(island.textContent).html);
+    }
+    const background = container.getAttribute('data-lazy-bg');
+    if (background) {
+        container.style.backgroundImage = 'url(' + background + ')';
+    }
+    container.setAttribute('data-materialized', '');
+    scheduleLayout(container);
+}
+
+function dematerializePage(container) {
+    if (!container.hasAttribute('data-materialized')) return;
+    
+    const island = container.querySelector('script.lazy-page-data');
+    const textBoxes = container.querySelectorAll('.textBox');
+    if (island) {
+        // Write the live textboxes back so edits made in the viewer survive
+        const html = Array.from(textBoxes, textBox => textBox.outerHTML).join('');
+        island.textContent = JSON.stringify({html: html}).replace(/<\\//g, '<\\\\/');
+    }
+    textBoxes.forEach(textBox => textBox.remove());
+    container.style.backgroundImage = '';
+    container.removeAttribute('data-materialized');
+}
+
+function materializeAround(pageIndex) {
+    getLazyPageContainers().forEach((container, index) => {
+        if (Math.abs(index - pageIndex) <= LAZY_PAGE_RADIUS) {
+            materializePage(container);
+        } else {
+            dematerializePage(container);
+        }
+    });
+}
+
+materializeAround(state.page_idx || 0);
+"""
+
+# Viewer-side sidecar loading (see sidecar.link_sidecar): fetches a .translations.jsonl
+# file and writes each record's text and layout attributes into its textbox
+SIDECAR_LOADER_JS_FUNC = """
+function loadTranslationSidecar(url) {
+    return fetch(url).then(response => response.text()).then(body => {
+        const pages = Array.from(document.querySelectorAll('.pageContainer'),
+                                 page => page.querySelectorAll('.textBox'));
+        // The first line is the sidecar header
+        body.split('\\n').slice(1).forEach(line => {
+            if (!line.trim()) return;
+            const record = JSON.parse(line);
+            const textBox = pages[record.page] && pages[record.page][record.box];
+            if (!textBox) return;
+            
+            Object.entries(record.attrs || {}).forEach(([name, value]) => textBox.setAttribute(name, value));
+            const paragraph = document.createElement('p');
+            paragraph.textContent = record.text;
+            textBox.replaceChildren(paragraph);
+        });
+        scheduleLayout();
+    });
+}
+"""
@@ -0,0 +1,224 @@
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# "sample" walks the stacks of the profiled threads on a timer, so its cost doesn't grow
+# with the number of calls and it can stay on for an overnight job; "cprofile" records
+# every call of the job thread (exact counts, but regex- and parser-heavy code runs slower)
+PROFILE_SAMPLE = "sample"
+PROFILE_CPROFILE = "cprofile"
+PROFILE_MODES = (PROFILE_SAMPLE, PROFILE_CPROFILE)
+
+# 100 Hz; each sample costs a few microseconds per profiled thread
+DEFAULT_SAMPLE_INTERVAL = 0.01
+
+# Functions listed in the report's cProfile summary
+PSTATS_TOP_FUNCTIONS = 30
+
+
+def frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples the Python stacks of a set of threads and counts them in collapsed form.
+
+    Each stack is rooted at the thread's name and, if a `stages` callback is given,
+    the stage the thread is in, so flamegraphs split the job by stage.
+    """
+
+    def __init__(self, thread_ids, interval: float = DEFAULT_SAMPLE_INTERVAL, stages=None):
+        self.thread_ids = set(thread_ids)
+        self.interval = interval
+        self.stages = stages
+        self.counts = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Record the current stack of every profiled thread once."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        for ident in self.thread_ids:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            root = [names.get(ident, str(ident))]
+            if self.stages is not None:
+                root += [f"[{stage}]" for stage in self.stages(ident)]
+            self.counts[tuple(root + stack[::-1])] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """The samples in the collapsed-stack format flamegraph.pl and speedscope read."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.counts.most_common())
+
+
+class JobProfiler:
+    """Wall time per pipeline stage, plus a sampling or cProfile profile of the job.
+
+    Stages are explicit `with profiler.stage(name):` blocks; they nest, and each
+    is reported with its total and self time (total minus its child stages).
+
+    Example:
+        profiler = JobProfiler()
+        profiler.start()
+        with profiler.stage("translate_file"):
+            with profiler.stage("parse_html"):
+                ...
+        profiler.stop()
+        profiler.write_report(output_dir, "translation")
+    """
+
+    def __init__(self, mode: str = PROFILE_SAMPLE, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}")
+        self.mode = mode
+        self.interval = interval
+        self.started_at = None
+        self.stopped_at = None
+        self._lock = threading.Lock()
+        self._stacks = {}
+        self._stages = {}  # path -> [calls, total seconds, child seconds]
+        self._order = {}
+        self._sampler = None
+        self._cprofile = None
+
+    def start(self, thread_ids=None) -> None:
+        """Start timing. Profiles the calling thread, and `thread_ids` too when sampling.
+
+        Args:
+            thread_ids (iterable, optional): Other threads to sample, e.g. the Tk main
+                thread. Defaults to None.
+        """
+        self.started_at = time.perf_counter()
+        if self.mode == PROFILE_CPROFILE:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler({threading.get_ident(), *(thread_ids or ())},
+                                         self.interval, self.current_stages)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.stopped_at = time.perf_counter()
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    def current_stages(self, thread_id: int) -> list[str]:
+        return list(self._stacks.get(thread_id, ()))
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as `name`, nested under the calling thread's current stage."""
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        stack.append(name)
+        path = tuple(stack)
+        with self._lock:
+            self._order.setdefault(path, len(self._order))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                entry = self._stages.setdefault(path, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+                if stack:
+                    self._stages.setdefault(tuple(stack), [0, 0.0, 0.0])[2] += elapsed
+
+    def stage_totals(self) -> dict[tuple, dict]:
+        """calls, total_seconds and self_seconds per stage path, parents before their children."""
+        with self._lock:
+            order = dict(self._order)
+            stages = {path: list(entry) for path, entry in self._stages.items()}
+        paths = sorted(stages, key=lambda path: [order.get(path[:i + 1], 0) for i in range(len(path))])
+        return {path: {"calls": stages[path][0], "total_seconds": stages[path][1],
+                       "self_seconds": stages[path][1] - stages[path][2]} for path in paths}
+
+    def stage_table(self) -> str:
+        """The stage breakdown as a fixed-width text table."""
+        wall = self.wall_seconds or 1.0
+        lines = [f"{'Stage':<36} {'Calls':>7} {'Total s':>10} {'Self s':>10} {'% wall':>7} {'Mean ms':>10}"]
+        for path, totals in self.stage_totals().items():
+            name = "  " * (len(path) - 1) + path[-1]
+            calls = totals["calls"]
+            lines.append(f"{name:<36} {calls:>7} {totals['total_seconds']:>10.2f} {totals['self_seconds']:>10.2f} "
+                         f"{totals['total_seconds'] / wall * 100:>7.1f} "
+                         f"{totals['total_seconds'] / calls * 1000 if calls else 0:>10.1f}")
+        lines.append(f"{'Wall time':<36} {'':>7} {self.wall_seconds:>10.2f}")
+        return '\n'.join(lines)
+
+    def write_report(self, directory: os.PathLike, label: str) -> list[str]:
+        """Write the job's profile to `directory`.
+
+        Files are named <label>-<timestamp>: .stages.txt (stage table), and either
+        .collapsed (sampled stacks) or .pstats (cProfile data, for `python -m pstats`
+        or snakeviz) with its top functions appended to the stage table.
+
+        Raises:
+            OSError: If the files can't be written
+
+        Returns:
+            list[str]: Paths of the files written
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}")
+        report = self.stage_table()
+        paths = []
+
+        if self._sampler is not None:
+            report += f"\n\n{self._sampler.samples} stack samples every {self.interval * 1000:g} ms"
+            with open(base + ".collapsed", 'w', encoding='utf-8') as f:
+                f.write(self._sampler.collapsed())
+            paths.append(base + ".collapsed")
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base + ".pstats")
+            paths.append(base + ".pstats")
+            import pstats
+            summary = io.StringIO()
+            pstats.Stats(self._cprofile, stream=summary).sort_stats("cumulative").print_stats(PSTATS_TOP_FUNCTIONS)
+            report += "\n\n" + summary.getvalue()
+
+        with open(base + ".stages.txt", 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+        paths.insert(0, base + ".stages.txt")
+        return paths
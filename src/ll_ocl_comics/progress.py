@@ -0,0 +1,42 @@
+import threading
+
+# How often the Tk main loop applies pending progress updates (10 Hz)
+PROGRESS_FRAME_MS = 100
+
+
+class ProgressBus:
+    """Thread-safe mailbox for GUI progress updates.
+
+    Worker threads publish widget configuration changes with `publish`; the Tk main
+    loop periodically calls `drain` and applies only the latest state per widget, so a
+    burst of updates from concurrent workers costs a single widget refresh per frame.
+
+    Example:
+        bus.publish("progress", value=10)
+        bus.publish("progress", value=20)
+        bus.drain() returns {"progress": {"value": 20}}
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def publish(self, key: str, **config) -> None:
+        """Record the latest configuration for a widget.
+
+        Args:
+            key (str): Name of the widget the update targets
+            **config: Widget options, e.g. text="..." or value=50
+        """
+        with self._lock:
+            self._pending.setdefault(key, {}).update(config)
+
+    def drain(self) -> dict[str, dict]:
+        """Take every pending update, leaving the bus empty.
+
+        Returns:
+            dict[str, dict]: Latest widget options keyed by widget name
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
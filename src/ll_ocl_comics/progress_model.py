@@ -0,0 +1,293 @@
+import time
+
+# Starting point for a model with no saved history
+DEFAULT_THROUGHPUT_PRIOR = {
+    "prefill_tokens_per_second": 400.0,
+    "decode_tokens_per_second": 25.0,
+    "decode_tokens_per_char": 1.5,
+    # System prompt, RAG context and request framing sent with every page
+    "prompt_base_tokens": 800.0,
+    # Server time per request outside prefill and decode (model bookkeeping, reloads)
+    "request_overhead_seconds": 0.5,
+}
+
+# Prompt tokens per source character (Japanese text is about one token per character)
+PROMPT_TOKENS_PER_CHAR = 1.0
+
+# A prior counts as this many requests of this size, so the first measurements refine it
+PRIOR_REQUESTS = 5
+PRIOR_REQUEST_CHARS = 100
+PRIOR_REQUEST_DECODE_TOKENS = 200
+
+# Wall-clock calibration (HTTP, parsing, retries, local work) starts after this many pages
+MIN_CALIBRATION_PAGES = 3
+CALIBRATION_BOUNDS = (0.5, 4.0)
+
+# Interval between progress lines in the log, for runs nobody is watching
+PROGRESS_LOG_SECONDS = 60
+
+
+def format_duration(seconds: float) -> str:
+    """Example: format_duration(7500) returns "2h 05m", format_duration(95) returns "1m 35s"."""
+    seconds = int(max(0, seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_finish_time(finish_at: float, now: float | None = None) -> str:
+    """Local clock time of `finish_at` (a time.time() value), with the weekday if it's not within a day."""
+    now = time.time() if now is None else now
+    return time.strftime("%H:%M" if finish_at - now < 20 * 3600 else "%a %H:%M", time.localtime(finish_at))
+
+
+class ThroughputEstimate:
+    """Prefill and decode speed of one model, learned from Ollama's response metrics.
+
+    The prior (saved by an earlier job, or DEFAULT_THROUGHPUT_PRIOR) counts as
+    PRIOR_REQUESTS requests' worth of evidence, so a job's first pages refine it
+    and later pages are dominated by what was actually measured.
+    """
+
+    def __init__(self, prior: dict | None = None):
+        self.prior = dict(DEFAULT_THROUGHPUT_PRIOR)
+        self.prior.update({key: float(value) for key, value in (prior or {}).items()
+                           if key in DEFAULT_THROUGHPUT_PRIOR and value and value > 0})
+        self.requests = 0
+        self.source_chars = 0
+        self.prompt_tokens = 0
+        self.prompt_seconds = 0.0
+        self.decode_tokens = 0
+        self.decode_seconds = 0.0
+        self.overhead_seconds = 0.0
+
+    def observe(self, metrics: dict, source_chars: int = 0) -> bool:
+        """Learn from one response's metrics (OllamaAPI.last_response_metrics).
+
+        Args:
+            metrics (dict): Ollama's *_count and *_duration (ns) fields
+            source_chars (int, optional): Source characters the request sent. Defaults to 0.
+
+        Returns:
+            bool: False if the metrics had no timings to learn from
+        """
+        if not metrics.get("eval_duration") and not metrics.get("prompt_eval_duration"):
+            return False
+        prompt_seconds = metrics.get("prompt_eval_duration", 0) / 1e9
+        decode_seconds = metrics.get("eval_duration", 0) / 1e9
+        self.requests += 1
+        self.source_chars += source_chars
+        self.prompt_tokens += metrics.get("prompt_eval_count", 0)
+        self.prompt_seconds += prompt_seconds
+        self.decode_tokens += metrics.get("eval_count", 0)
+        self.decode_seconds += decode_seconds
+        if metrics.get("total_duration"):
+            self.overhead_seconds += max(0.0, metrics["total_duration"] / 1e9 - prompt_seconds - decode_seconds)
+        return True
+
+    @property
+    def prefill_tokens_per_second(self) -> float:
+        prior_tokens = PRIOR_REQUESTS * (self.prior["prompt_base_tokens"] + PRIOR_REQUEST_CHARS * PROMPT_TOKENS_PER_CHAR)
+        return ((prior_tokens + self.prompt_tokens)
+                / (prior_tokens / self.prior["prefill_tokens_per_second"] + self.prompt_seconds))
+
+    @property
+    def decode_tokens_per_second(self) -> float:
+        prior_tokens = PRIOR_REQUESTS * PRIOR_REQUEST_DECODE_TOKENS
+        return ((prior_tokens + self.decode_tokens)
+                / (prior_tokens / self.prior["decode_tokens_per_second"] + self.decode_seconds))
+
+    @property
+    def decode_tokens_per_char(self) -> float:
+        prior_chars = PRIOR_REQUESTS * PRIOR_REQUEST_CHARS
+        return ((prior_chars * self.prior["decode_tokens_per_char"] + self.decode_tokens)
+                / (prior_chars + self.source_chars))
+
+    @property
+    def prompt_base_tokens(self) -> float:
+        measured = self.prompt_tokens - self.source_chars * PROMPT_TOKENS_PER_CHAR
+        return max(0.0, (PRIOR_REQUESTS * self.prior["prompt_base_tokens"] + measured)
+                   / (PRIOR_REQUESTS + self.requests))
+
+    @property
+    def request_overhead_seconds(self) -> float:
+        return ((PRIOR_REQUESTS * self.prior["request_overhead_seconds"] + self.overhead_seconds)
+                / (PRIOR_REQUESTS + self.requests))
+
+    def request_seconds(self, source_chars: int) -> float:
+        """Predicted server time for a request sending `source_chars` characters of source text."""
+        if source_chars <= 0:
+            return 0.0
+        fixed, per_char = self.cost_coefficients()
+        return fixed + per_char * source_chars
+
+    def cost_coefficients(self) -> tuple[float, float]:
+        """(seconds per request, seconds per source character) of the current estimate."""
+        prefill, decode = self.prefill_tokens_per_second, self.decode_tokens_per_second
+        fixed = self.request_overhead_seconds + self.prompt_base_tokens / prefill
+        per_char = PROMPT_TOKENS_PER_CHAR / prefill + self.decode_tokens_per_char / decode
+        return fixed, per_char
+
+    def to_prior(self) -> dict:
+        """The current estimate in the form the constructor takes, for saving."""
+        return {key: round(getattr(self, key), 3) for key in DEFAULT_THROUGHPUT_PRIOR}
+
+
+class ProgressModel:
+    """Progress and ETA of a translation job, weighted by how much text each page sends.
+
+    Each page costs the time its source text takes to prefill and decode at the
+    model's estimated speed (pages without text cost nothing). The ETA is the
+    predicted cost of the remaining pages, scaled by how long finished pages
+    really took against their prediction, which absorbs retries, parsing and
+    pages routed to a faster model.
+
+    Example:
+        model = ProgressModel([120, 0, 300], ThroughputEstimate())
+        model.page_done(0)
+        model.snapshot()["fraction"] is the share of predicted work in page 0
+    """
+
+    def __init__(self, page_chars: list[int], estimate: ThroughputEstimate, clock=time.monotonic):
+        self.page_chars = list(page_chars)
+        self.estimate = estimate
+        self.clock = clock
+        self.started_at = clock()
+        self._logged_at = self.started_at
+        self._done = bytearray(len(self.page_chars))
+        self.pages_done = 0
+        self._total_requests = sum(1 for chars in self.page_chars if chars > 0)
+        self._total_chars = sum(self.page_chars)
+        self._done_requests = 0
+        self._done_chars = 0
+
+    @property
+    def total_pages(self) -> int:
+        return len(self.page_chars)
+
+    def page_done(self, index: int) -> None:
+        """Mark a page finished (or given up on). Marking a page twice has no effect."""
+        if not 0 <= index < len(self._done) or self._done[index]:
+            return
+        self._done[index] = 1
+        self.pages_done += 1
+        chars = self.page_chars[index]
+        if chars > 0:
+            self._done_requests += 1
+            self._done_chars += chars
+
+    def _predicted_seconds(self, requests: int, chars: int) -> float:
+        fixed, per_char = self.estimate.cost_coefficients()
+        return fixed * requests + per_char * chars
+
+    def snapshot(self) -> dict:
+        """Where the job stands.
+
+        Returns:
+            dict: pages_done, total_pages, fraction (0-1), elapsed_seconds, eta_seconds,
+                finish_at (time.time() value), prefill_tokens_per_second,
+                decode_tokens_per_second and pages_per_minute
+        """
+        elapsed = max(0.0, self.clock() - self.started_at)
+        total = self._predicted_seconds(self._total_requests, self._total_chars)
+        done = self._predicted_seconds(self._done_requests, self._done_chars)
+        remaining = total - done
+
+        if total > 0:
+            fraction = done / total
+        else:
+            fraction = self.pages_done / self.total_pages if self.total_pages else 1.0
+
+        calibration = 1.0
+        if self.pages_done >= MIN_CALIBRATION_PAGES and done > 0:
+            low, high = CALIBRATION_BOUNDS
+            calibration = min(max(elapsed / done, low), high)
+        eta = remaining * calibration
+
+        return {
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "fraction": fraction,
+            "elapsed_seconds": elapsed,
+            "eta_seconds": eta,
+            "finish_at": time.time() + eta,
+            "prefill_tokens_per_second": self.estimate.prefill_tokens_per_second,
+            "decode_tokens_per_second": self.estimate.decode_tokens_per_second,
+            "pages_per_minute": self.pages_done / elapsed * 60 if elapsed > 0 else 0.0,
+        }
+
+    def format_status(self, snapshot: dict | None = None) -> str:
+        """Example: "Page 120/400 · ETA 2h 05m (06:40) · 31 tok/s" """
+        snapshot = snapshot or self.snapshot()
+        status = f"Page {snapshot['pages_done']}/{snapshot['total_pages']}"
+        if snapshot["pages_done"] < snapshot["total_pages"]:
+            status += (f" · ETA {format_duration(snapshot['eta_seconds'])}"
+                       f" ({format_finish_time(snapshot['finish_at'])})")
+        return status + f" · {snapshot['decode_tokens_per_second']:.0f} tok/s"
+
+    def format_log_line(self, snapshot: dict | None = None) -> str:
+        snapshot = snapshot or self.snapshot()
+        return (f"Progress: {snapshot['pages_done']}/{snapshot['total_pages']} pages "
+                f"({snapshot['fraction'] * 100:.1f}% of the work), "
+                f"ETA {format_duration(snapshot['eta_seconds'])} (finishes {format_finish_time(snapshot['finish_at'])}), "
+                f"{snapshot['pages_per_minute']:.1f} pages/min, "
+                f"prefill {snapshot['prefill_tokens_per_second']:.0f} tok/s, "
+                f"decode {snapshot['decode_tokens_per_second']:.1f} tok/s")
+
+    def log_due(self, interval: float = PROGRESS_LOG_SECONDS) -> bool:
+        """True at most once per `interval` seconds, for periodic progress lines."""
+        now = self.clock()
+        if now - self._logged_at < interval:
+            return False
+        self._logged_at = now
+        return True
+
+
+class GenerationProgress:
+    """Progress of a single long streamed request, such as the story summary.
+
+    Until the first token arrives, progress follows the predicted prefill time;
+    after that the decode rate is measured from the tokens streamed so far.
+    """
+
+    def __init__(self, estimate: ThroughputEstimate, prompt_tokens: int, expected_output_tokens: int,
+                 clock=time.monotonic):
+        self.estimate = estimate
+        self.prompt_tokens = prompt_tokens
+        self.expected_output_tokens = max(1, expected_output_tokens)
+        self.clock = clock
+        self.started_at = clock()
+        self.first_token_at = None
+
+    def update(self, decoded_tokens: int) -> dict:
+        """Progress after `decoded_tokens` output tokens.
+
+        Returns:
+            dict: fraction (0-0.95 until the request returns), eta_seconds and
+                decode_tokens_per_second (measured once decoding has started)
+        """
+        now = self.clock()
+        elapsed = now - self.started_at
+        decode_rate = self.estimate.decode_tokens_per_second
+        if decoded_tokens and self.first_token_at is None:
+            self.first_token_at = now
+
+        if self.first_token_at is None:
+            prefill_left = max(0.0, self.prompt_tokens / self.estimate.prefill_tokens_per_second - elapsed)
+            remaining = prefill_left + self.expected_output_tokens / decode_rate
+        else:
+            decoding_for = now - self.first_token_at
+            if decoding_for >= 1:
+                decode_rate = decoded_tokens / decoding_for
+            # Past the expected length, assume the output is nearly done rather than finished
+            tokens_left = max(self.expected_output_tokens - decoded_tokens, self.expected_output_tokens * 0.05)
+            remaining = tokens_left / decode_rate
+
+        total = elapsed + remaining
+        return {
+            "fraction": min(elapsed / total, 0.95) if total > 0 else 0.0,
+            "eta_seconds": remaining,
+            "decode_tokens_per_second": decode_rate,
+        }
@@ -0,0 +1,299 @@
+import codecs
+import logging
+import mmap
+import os
+import re
+import threading
+
+RAG_EXTENSIONS = ('.txt', '.md', '.json', '.csv', '.log')
+MAX_RAG_FILE_BYTES = 10 * 1024 * 1024
+
+# Chunks end at a blank line after CHUNK_BYTES, else at a newline, else at MAX_CHUNK_BYTES
+CHUNK_BYTES = 4 * 1024
+MAX_CHUNK_BYTES = 16 * 1024
+
+# Bytes read from the start of a file to detect its encoding
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# Share of the model's context window RAG may fill, and bytes of text per token (roughly, for UTF-8 prose)
+RAG_CONTEXT_SHARE = 0.5
+BYTES_PER_TOKEN = 3
+
+RAG_CONTEXT_HEADER = "=== RAG CONTEXT ==="
+RAG_CONTEXT_FOOTER = "\n=== END RAG CONTEXT ===\n"
+
+# Longest BOM first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be'), (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+
+class RagFileRejected(ValueError):
+    """Raised when a file can't be used as RAG context."""
+
+
+class RagFileTooLarge(RagFileRejected):
+    """Raised when a file is over MAX_RAG_FILE_BYTES."""
+
+
+def detect_encoding(sample: bytes) -> tuple[str, int]:
+    """Encoding of a file from its first bytes: BOM, then UTF-8, then charset_normalizer's guess.
+
+    Returns:
+        tuple[str, int]: (codec name, length of the BOM to skip)
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    try:
+        # Not final: the sample may end in the middle of a character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        pass
+    # Only files that aren't UTF-8 need the (slow to import) detector
+    from charset_normalizer import from_bytes
+
+    best = from_bytes(sample).best()
+    return (best.encoding if best else 'utf-8'), 0
+
+
+def rag_context_budget(context_length: int) -> int:
+    """Bytes of RAG text that fit in RAG_CONTEXT_SHARE of a `context_length`-token window."""
+    return int(context_length * RAG_CONTEXT_SHARE * BYTES_PER_TOKEN)
+
+
+def code_unit(encoding: str) -> int:
+    """Bytes per code unit; chunk boundaries must fall on a multiple of it."""
+    name = codecs.lookup(encoding).name
+    if name.startswith('utf-32'):
+        return 4
+    if name.startswith('utf-16'):
+        return 2
+    return 1
+
+
+class RagDocument:
+    """A reference file, memory-mapped and split into chunks by byte offset.
+
+    Nothing is decoded up front: `index` (run on a background thread) detects the
+    encoding from a sample and records chunk boundaries; `chunk` decodes one chunk
+    on demand.
+    """
+
+    def __init__(self, path: os.PathLike):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+        self.encoding = None
+        self.bom_length = 0
+        self.chunks = []  # (start, end) byte offsets
+        self.error = None
+        self.indexed = threading.Event()
+        self._file = None
+        self._map = None
+
+    @property
+    def ready(self) -> bool:
+        return self.indexed.is_set() and self.error is None
+
+    def index(self) -> None:
+        """Map the file, detect its encoding and find chunk boundaries. Blocking."""
+        try:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.encoding, self.bom_length = detect_encoding(self._map[:ENCODING_SAMPLE_BYTES])
+            self.chunks = self._find_chunks()
+            if not self.chunks:
+                raise RagFileRejected("file has no text")
+        except (OSError, ValueError, LookupError) as e:
+            self.error = e
+            self.close()
+        finally:
+            self.indexed.set()
+
+    def _find_chunks(self) -> list[tuple[int, int]]:
+        unit = code_unit(self.encoding)
+        paragraph = "\n\n".encode(self.encoding)
+        newline = "\n".encode(self.encoding)
+        blank_text = re.compile(rb'\s*') if unit == 1 else None
+
+        chunks = []
+        start, size = self.bom_length, len(self._map)
+        while start < size:
+            end = size
+            if size - start > MAX_CHUNK_BYTES:
+                end = (self._find_aligned(paragraph, start + CHUNK_BYTES, start + MAX_CHUNK_BYTES, unit)
+                       or self._find_aligned(newline, start + CHUNK_BYTES, start + MAX_CHUNK_BYTES, unit)
+                       or self._char_boundary(start + MAX_CHUNK_BYTES, unit))
+            if blank_text is None or not blank_text.fullmatch(self._map, start, end):
+                chunks.append((start, end))
+            start = end
+        return chunks
+
+    def _find_aligned(self, separator: bytes, start: int, end: int, unit: int) -> int | None:
+        position = self._map.find(separator, start, end)
+        while position != -1 and (position - self.bom_length) % unit:
+            position = self._map.find(separator, position + 1, end)
+        return position + len(separator) if position != -1 else None
+
+    def _char_boundary(self, position: int, unit: int) -> int:
+        position -= (position - self.bom_length) % unit
+        if self.encoding == 'utf-8':
+            # Don't split a UTF-8 sequence: back up over continuation bytes
+            while position > 0 and self._map[position] & 0xC0 == 0x80:
+                position -= 1
+        return position
+
+    def chunk(self, index: int) -> str:
+        start, end = self.chunks[index]
+        return self._map[start:end].decode(self.encoding, errors='ignore')
+
+    def chunk_bytes(self, index: int) -> int:
+        start, end = self.chunks[index]
+        return end - start
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RagStore:
+    """The RAG reference files and a size-bounded view of them for prompts.
+
+    `add` only checks the file's name and size, so dropping a file returns at once;
+    mapping and chunking happen on a background thread, and `on_change` is called
+    (from that thread) when a document finishes indexing.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._documents = []
+        self._context_cache = {}
+
+    @property
+    def documents(self) -> list[RagDocument]:
+        with self._lock:
+            return list(self._documents)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(document.size for document in self.documents)
+
+    def add(self, path: os.PathLike) -> RagDocument:
+        """Start indexing a file in the background.
+
+        Raises:
+            RagFileRejected: If the file is already loaded, unsupported or empty
+            RagFileTooLarge: If the file is over MAX_RAG_FILE_BYTES
+            OSError: If the file can't be read
+
+        Returns:
+            RagDocument: The new document (not yet indexed)
+        """
+        _, ext = os.path.splitext(path.lower())
+        if ext not in RAG_EXTENSIONS:
+            raise RagFileRejected(f"Unsupported file type: {ext}")
+        if any(document.path == path for document in self.documents):
+            raise RagFileRejected(f"File already loaded: {path}")
+        document = RagDocument(path)
+        if document.size > MAX_RAG_FILE_BYTES:
+            raise RagFileTooLarge(f"File {document.name} is too large (>{MAX_RAG_FILE_BYTES // (1024 * 1024)}MB)")
+        if not document.size:
+            raise RagFileRejected(f"Empty file: {path}")
+
+        with self._lock:
+            self._documents.append(document)
+            self._context_cache.clear()
+        threading.Thread(target=self._index, args=(document,), daemon=True).start()
+        return document
+
+    def _index(self, document: RagDocument) -> None:
+        document.index()
+        if document.error:
+            logging.error(f"Failed to load RAG file {document.path}: {document.error}")
+        else:
+            logging.info("Indexed RAG file %s: %d chunks, %s", document.name, len(document.chunks), document.encoding)
+        with self._lock:
+            self._context_cache.clear()
+        if self.on_change:
+            self.on_change()
+
+    def remove(self, indices) -> list[RagDocument]:
+        """Remove documents by position. Returns the removed documents."""
+        with self._lock:
+            removed = [self._documents[i] for i in sorted(set(indices)) if 0 <= i < len(self._documents)]
+        # A document still being indexed holds its file open until it's done
+        for document in removed:
+            document.indexed.wait()
+        with self._lock:
+            self._documents = [document for document in self._documents if document not in removed]
+            self._context_cache.clear()
+            for document in removed:
+                document.close()
+        return removed
+
+    def clear(self) -> None:
+        self.remove(range(len(self.documents)))
+
+    def wait_until_indexed(self, timeout: float | None = None) -> bool:
+        """Block until every document has been indexed. Returns False on timeout."""
+        return all(document.indexed.wait(timeout) for document in self.documents)
+
+    def context(self, max_bytes: int | None = None) -> str:
+        """RAG context for a prompt, with at most `max_bytes` of file text.
+
+        Waits for documents still being indexed. When everything doesn't fit, chunks
+        are taken round-robin from the documents so each file gets a share; each
+        document's chunks stay in file order.
+
+        Args:
+            max_bytes (int, optional): Limit on the chunk bytes included. Defaults to None (everything).
+
+        Returns:
+            str: Formatted RAG context, or "" if no document is loaded
+        """
+        self.wait_until_indexed()
+        with self._lock:
+            if max_bytes not in self._context_cache:
+                self._context_cache[max_bytes] = self._build_context(max_bytes)
+            return self._context_cache[max_bytes]
+
+    def _build_context(self, max_bytes: int | None) -> str:
+        documents = [document for document in self._documents if document.ready]
+        if not documents:
+            return ""
+
+        # Take chunks round-robin until the budget runs out
+        selected = [0] * len(documents)
+        budget = max_bytes
+        progress = True
+        while progress:
+            progress = False
+            for i, document in enumerate(documents):
+                if selected[i] == len(document.chunks):
+                    continue
+                size = document.chunk_bytes(selected[i])
+                if budget is not None and size > budget:
+                    continue
+                selected[i] += 1
+                if budget is not None:
+                    budget -= size
+                progress = True
+
+        context_parts = [RAG_CONTEXT_HEADER]
+        for document, count in zip(documents, selected):
+            if not count:
+                continue
+            context_parts.append(f"\n--- {document.name} ---")
+            context_parts.append(''.join(document.chunk(i) for i in range(count)).strip())
+            if count < len(document.chunks):
+                logging.info("RAG context: using %d of %d chunks of %s", count, len(document.chunks), document.name)
+        context_parts.append(RAG_CONTEXT_FOOTER)
+        return '\n'.join(context_parts)
@@ -0,0 +1,373 @@
+import email.utils
+import gzip
+import html
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import atomic_write_json
+from sidecar import SIDECAR_SUFFIX
+
+DEFAULT_READER_PORT = 8000
+
+# Written into each output directory: the input directories of the volumes translated
+# into it, so the server can find their images where mokuro left them
+READER_SOURCES_FILENAME = ".reader_sources.json"
+
+# Text formats worth storing compressed next to the original. Images are already compressed
+COMPRESSIBLE_EXTENSIONS = (".html", ".htm", ".js", ".css", ".json", ".jsonl", ".svg", ".txt")
+MIN_COMPRESS_BYTES = 1024
+
+# Content-Encoding -> suffix of the precompressed file, in order of preference
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+# Page images never change once mokuro has written them; translated HTML and sidecars
+# can be regenerated, so they're revalidated (a 304 when unchanged)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# What the server hands out: volume HTML, sidecars, the viewer's scripts and styles and
+# page images. Traces, profiles, OCR data and anything else in the roots stay private
+VOLUME_EXTENSIONS = (".html", ".htm")
+VIEWER_ASSET_EXTENSIONS = (".js", ".css")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif", ".bmp")
+SERVED_EXTENSIONS = VOLUME_EXTENSIONS + VIEWER_ASSET_EXTENSIONS + IMAGE_EXTENSIONS + (SIDECAR_SUFFIX,)
+# Directories the translator writes job data to inside an output directory
+PRIVATE_DIRECTORIES = ("traces", "profiles")
+
+EXTRA_MIME_TYPES = {
+    ".jsonl": "application/x-ndjson",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+}
+
+
+def _brotli():
+    """The brotli module if it is installed (optional), else None."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _variant_is_current(variant_path: str, mtime_ns: int) -> bool:
+    try:
+        return os.stat(variant_path).st_mtime_ns == mtime_ns
+    except OSError:
+        return False
+
+
+def _write_variant(path: str, data: bytes, mtime_ns: int) -> None:
+    """Write a compressed variant atomically, stamped with the original's mtime so staleness is an mtime comparison."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def precompress(path: os.PathLike) -> list[str]:
+    """Write gzip (and, if the brotli module is installed, brotli) copies of a text file
+    next to it, for the reader server to send to browsers that accept them.
+
+    Copies that are already current are left alone; files that aren't text or are too
+    small to gain anything are skipped.
+
+    Example:
+        precompress("out/volume.html") writes out/volume.html.gz (and out/volume.html.br)
+
+    Args:
+        path (os.PathLike): File to compress
+
+    Raises:
+        IOError: If a copy could not be written
+
+    Returns:
+        list[str]: Paths of the copies written
+    """
+    path = os.fspath(path)
+    if not path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+        return []
+    stat = os.stat(path)
+    if stat.st_size < MIN_COMPRESS_BYTES:
+        return []
+
+    compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+
+    written = []
+    data = None
+    for encoding, suffix in ENCODING_SUFFIXES:
+        if encoding not in compressors or _variant_is_current(path + suffix, stat.st_mtime_ns):
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        _write_variant(path + suffix, compressors[encoding](data), stat.st_mtime_ns)
+        written.append(path + suffix)
+    return written
+
+
+def record_source_directory(output_dir: os.PathLike, source_dir: os.PathLike) -> None:
+    """Note in the output directory's READER_SOURCES_FILENAME where a volume's images are.
+
+    Raises:
+        IOError: If the file could not be written
+    """
+    sources = read_source_directories(output_dir)
+    source_dir = os.path.abspath(source_dir)
+    if source_dir not in sources:
+        atomic_write_json(os.path.join(output_dir, READER_SOURCES_FILENAME), {"sources": sources + [source_dir]})
+
+
+def read_source_directories(output_dir: os.PathLike) -> list[str]:
+    """Input directories recorded for an output directory, [] if none were."""
+    try:
+        with open(os.path.join(output_dir, READER_SOURCES_FILENAME), 'r', encoding='utf-8') as f:
+            sources = json.load(f).get("sources", [])
+    except (IOError, ValueError, AttributeError):
+        return []
+    return [source for source in sources if isinstance(source, str)]
+
+
+def is_served_path(parts: list[str]) -> bool:
+    """True if a URL path (split into its segments) is something the reader serves.
+
+    Example:
+        is_served_path(["vol", "001.jpg"]) returns True; is_served_path(["traces", "job.jsonl.gz"]) returns False
+    """
+    if not parts or parts[0] in PRIVATE_DIRECTORIES or any(part.startswith(".") for part in parts):
+        return False
+    return parts[-1].lower().endswith(SERVED_EXTENSIONS)
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """First byte range of a Range header as (start, end inclusive).
+
+    Example:
+        parse_range("bytes=100-", 1000) returns (100, 999); parse_range("bytes=-100", 1000) returns (900, 999)
+
+    Raises:
+        ValueError: If the range can't be satisfied (the response is a 416)
+
+    Returns:
+        tuple[int, int] | None: The range, or None if the header isn't a byte range this serves
+            (the whole file is sent)
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    start_text, separator, end_text = ranges.strip().partition("-")
+    if not separator or not (start_text or end_text) or not all(text.isdigit() for text in (start_text, end_text) if text):
+        # Malformed ranges are ignored
+        return None
+    if not start_text:
+        # Suffix range: the last N bytes
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class ReaderRequestHandler(BaseHTTPRequestHandler):
+    """Serves the union of the server's roots: translated output first, then the
+    source directories holding the page images."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "LLOclComicsReader"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        logging.debug("Reader %s: %s", self.address_string(), format % args)
+
+    def _serve(self, send_body: bool) -> None:
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if url_path in ("", "/"):
+            self._send_index(send_body)
+            return
+        path = self.server.resolve(url_path)
+        if path is None:
+            self.send_error(404)
+            return
+
+        # Pick the precompressed copy the browser accepts, if there is a current one
+        stat = os.stat(path)
+        file_path, encoding = path, None
+        compressible = path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+        if compressible:
+            accepted = {part.split(";")[0].strip().lower() for part in self.headers.get("Accept-Encoding", "").split(",")}
+            for candidate, suffix in ENCODING_SUFFIXES:
+                if candidate in accepted and _variant_is_current(path + suffix, stat.st_mtime_ns):
+                    file_path, encoding = path + suffix, candidate
+                    break
+        file_stat = os.stat(file_path) if file_path != path else stat
+
+        etag = f'"{stat.st_mtime_ns:x}-{file_stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": email.utils.formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": REVALIDATE_CACHE_CONTROL if compressible else IMMUTABLE_CACHE_CONTROL,
+            "Accept-Ranges": "bytes",
+        }
+        if compressible:
+            headers["Vary"] = "Accept-Encoding"
+
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self._send_headers(headers)
+            return
+
+        start, end = 0, file_stat.st_size - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", etag) == etag:
+            try:
+                byte_range = parse_range(range_header, file_stat.st_size)
+            except ValueError:
+                self.send_response(416)
+                headers["Content-Range"] = f"bytes */{file_stat.st_size}"
+                self._send_headers(headers, 0)
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{file_stat.st_size}"
+
+        content_type = EXTRA_MIME_TYPES.get(os.path.splitext(path)[1].lower()) \
+            or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        headers["Content-Type"] = content_type
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        self.send_response(status)
+        self._send_headers(headers, end - start + 1)
+        if send_body and end >= start:
+            with open(file_path, 'rb') as f:
+                try:
+                    self.connection.sendfile(f, start, end - start + 1)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_headers(self, headers: dict, content_length: int | None = None) -> None:
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if content_length is not None:
+            self.send_header("Content-Length", str(content_length))
+        self.end_headers()
+
+    def _send_index(self, send_body: bool) -> None:
+        """A list of the translated volumes, linking to each."""
+        links = "\n".join(f'<li><a href="{urllib.parse.quote(name)}">{html.escape(name)}</a></li>'
+                          for name in self.server.volumes())
+        body = (f'<!DOCTYPE html><html><head><meta charset="utf-8">'
+                f'<meta name="viewport" content="width=device-width, initial-scale=1">'
+                f'<title>Library</title></head><body><h1>Library</h1><ul>\n{links}\n</ul></body></html>').encode()
+        self.send_response(200)
+        self._send_headers({"Content-Type": "text/html; charset=utf-8", "Cache-Control": REVALIDATE_CACHE_CONTROL},
+                           len(body))
+        if send_body:
+            self.wfile.write(body)
+
+
+class ReaderServer(ThreadingHTTPServer):
+    """Serves translated volumes to browsers on the local network, straight from the
+    output directories and the directories mokuro wrote the page images to. Only
+    volumes, sidecars, viewer assets and images are served (see is_served_path).
+
+    A URL path is looked up in each output directory, then in each source directory
+    (recorded by the translator in READER_SOURCES_FILENAME, plus any given), so
+    volume.html and the volume/ image folder it refers to can live in different places.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, output_dirs: list[os.PathLike], source_dirs: list[os.PathLike] | None = None,
+                 host: str = "0.0.0.0", port: int = DEFAULT_READER_PORT, precompress_outputs: bool = True):
+        """_summary_
+
+        Args:
+            output_dirs (list[os.PathLike]): Directories of translated HTML
+            source_dirs (list[os.PathLike], optional): More directories to find images in. Defaults to None.
+            host (str, optional): Address to listen on. Defaults to "0.0.0.0" (the whole network).
+            port (int, optional): Port to listen on; 0 picks a free one. Defaults to DEFAULT_READER_PORT.
+            precompress_outputs (bool, optional): Compress text files in the output directories that have
+                no current compressed copy (e.g. translated before this existed). Defaults to True.
+        """
+        self.output_dirs = [os.path.realpath(directory) for directory in output_dirs]
+        roots = list(self.output_dirs)
+        for directory in self.output_dirs:
+            roots.extend(os.path.realpath(source) for source in read_source_directories(directory))
+        roots.extend(os.path.realpath(source) for source in source_dirs or [])
+        # Keep the first occurrence of each root, in lookup order
+        self.roots = [root for index, root in enumerate(roots) if root not in roots[:index] and os.path.isdir(root)]
+
+        if precompress_outputs:
+            for directory in self.output_dirs:
+                for name in os.listdir(directory):
+                    try:
+                        precompress(os.path.join(directory, name))
+                    except (IOError, OSError) as e:
+                        logging.warning(f"Could not precompress {name}: {e}")
+
+        super().__init__((host, port), ReaderRequestHandler)
+
+    def resolve(self, url_path: str) -> str | None:
+        """File for a URL path: the first root that has it, never outside the roots and
+        only the kinds of file is_served_path allows.
+
+        Returns:
+            str | None: The file's path, or None if no root has it or it isn't served
+        """
+        parts = [part for part in url_path.split("/") if part not in ("", ".")]
+        if ".." in parts or any(os.sep in part or (os.altsep and os.altsep in part) for part in parts):
+            return None
+        if not is_served_path(parts):
+            return None
+        for root in self.roots:
+            candidate = os.path.realpath(os.path.join(root, *parts))
+            if os.path.commonpath([root, candidate]) == root and os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def volumes(self) -> list[str]:
+        """Names of the translated HTML files in the output directories."""
+        names = set()
+        for directory in self.output_dirs:
+            names.update(name for name in os.listdir(directory)
+                         if name.lower().endswith(VOLUME_EXTENSIONS) and not name.startswith("."))
+        return sorted(names)
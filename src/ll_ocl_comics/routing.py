@@ -0,0 +1,90 @@
+from textbox_filter import is_source_script
+
+# Tier names
+FAST_TIER = "fast"
+FULL_TIER = "full"
+
+# Default limits for sending a page to the fast tier: the page's page_complexity
+# (kanji count double) and the source characters of its longest textbox
+DEFAULT_FAST_MAX_COMPLEXITY = 60
+DEFAULT_FAST_MAX_TEXTBOX_CHARS = 24
+
+
+class ModelTier:
+    """A model together with the options it should be called with."""
+
+    def __init__(self, name: str, model: str, context_length: int, temperature: float):
+        self.name = name
+        self.model = model
+        self.context_length = context_length
+        self.temperature = temperature
+
+    def __repr__(self):
+        return f"ModelTier({self.name!r}, {self.model!r}, ctx={self.context_length}, temp={self.temperature})"
+
+
+def page_complexity(texts: list[str]) -> int:
+    """Rough cost of translating a page: source characters, with kanji/hanja counted double.
+
+    Args:
+        texts (list[str]): Source text of every textbox sent to the model.
+
+    Returns:
+        int: The complexity score
+    """
+    score = 0
+    for text in texts:
+        for char in text:
+            if char.isspace():
+                continue
+            # Ideographs carry more meaning per character than kana
+            score += 2 if 0x3400 <= ord(char) <= 0x9FFF else 1
+    return score
+
+
+class ModelRouter:
+    """Assigns each page to a fast or a full model tier.
+
+    Dialogue-light pages (page_complexity up to `max_complexity` and no textbox over
+    `max_textbox_chars` source characters) go to the fast tier; everything else,
+    and any page whose fast-tier output fails to parse, goes to the full tier.
+    """
+
+    def __init__(self, full_tier: ModelTier, fast_tier: ModelTier | None = None,
+                 max_complexity: int = DEFAULT_FAST_MAX_COMPLEXITY, max_textbox_chars: int = DEFAULT_FAST_MAX_TEXTBOX_CHARS):
+        self.full_tier = full_tier
+        self.fast_tier = fast_tier
+        self.max_complexity = max_complexity
+        self.max_textbox_chars = max_textbox_chars
+
+    @property
+    def tiers(self) -> list[ModelTier]:
+        return [tier for tier in (self.fast_tier, self.full_tier) if tier is not None]
+
+    def route_page(self, texts: list[str]) -> ModelTier:
+        """Pick the tier for a page.
+
+        Args:
+            texts (list[str]): Source text of every textbox sent to the model.
+
+        Returns:
+            ModelTier: The fast tier for short, simple pages, otherwise the full tier
+        """
+        if self.fast_tier is None or not texts:
+            return self.full_tier
+
+        if page_complexity(texts) > self.max_complexity:
+            return self.full_tier
+
+        for text in texts:
+            source_chars = sum(1 for char in text if is_source_script(char))
+            if source_chars > self.max_textbox_chars:
+                return self.full_tier
+
+        return self.fast_tier
+
+    def escalate(self, tier: ModelTier) -> ModelTier | None:
+        """The tier to retry with after `tier` failed, or None if already at the full tier."""
+        if tier is self.full_tier:
+            return None
+        return self.full_tier
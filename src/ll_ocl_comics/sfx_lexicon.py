@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+from config import DEFAULT_CONFIG_PATH, atomic_write_json
+
+# User additions live next to the config file as {"ドカーン": "KABOOM", ...}
+DEFAULT_SFX_PATH = os.path.join(os.path.dirname(DEFAULT_CONFIG_PATH), "sfx_lexicon.json")
+
+# Common manga sound effects. Keys are normalized with normalize_sfx when the lexicon is built,
+# so one entry covers its hiragana, half-width, elongated and repeated spellings. Words that are
+# also ordinary dialogue (パン is bread, はぁ a sigh) and anything that folds to a single kana
+# are left out, since they'd replace real lines.
+BUILTIN_SFX = {
+    "ドン": "BOOM",
+    "ドカーン": "KABOOM",
+    "バン": "BANG",
+    "ゴロゴロ": "RUMBLE",
+    "ザワザワ": "murmur murmur",
+    "ガヤガヤ": "chatter chatter",
+    "ヒソヒソ": "whisper whisper",
+    "ドキドキ": "ba-dump ba-dump",
+    "ズキズキ": "throb throb",
+    "ガシャン": "CRASH",
+    "ガチャ": "click",
+    "カチャ": "clack",
+    "カチッ": "click",
+    "パチパチ": "clap clap",
+    "バシッ": "WHACK",
+    "ドカッ": "WHAM",
+    "ボコ": "POW",
+    "ガーン": "SHOCK",
+    "ビクッ": "flinch",
+    "ギクッ": "gulp",
+    "ゾクッ": "shiver",
+    "ブルブル": "tremble",
+    "ガタガタ": "rattle",
+    "ゴクッ": "gulp",
+    "ゴクリ": "gulp",
+    "フゥ": "phew",
+    "ニコニコ": "smile",
+    "ニヤニヤ": "grin",
+    "キラキラ": "sparkle",
+    "ピカッ": "flash",
+    "シーン": "silence...",
+    "シュッ": "swish",
+    "ヒュー": "whoosh",
+    "ビュン": "zoom",
+    "ゴォォ": "roar",
+    "ポン": "pop",
+    "ポタポタ": "drip drip",
+    "ザァァ": "pouring rain",
+    "パラパラ": "patter",
+    "ピンポン": "ding dong",
+    "リンリン": "ring ring",
+    "コンコン": "knock knock",
+    "トントン": "tap tap",
+    "ドタドタ": "stomp stomp",
+    "スタスタ": "walk walk",
+    "バタン": "SLAM",
+    "バタバタ": "flap flap",
+    "ギュッ": "squeeze",
+    "チュッ": "smooch",
+    "ペコ": "bow",
+    "ペロ": "lick",
+    "モグモグ": "munch munch",
+    "グゥ": "growl",
+    "ムカッ": "grr",
+    "イライラ": "irritated",
+    "ワクワク": "excited",
+    "ソワソワ": "fidget",
+    "ウルウル": "teary",
+    "クスクス": "giggle",
+    "ワハハ": "ha ha ha",
+    "アハハ": "ha ha",
+    "ゲラゲラ": "guffaw",
+    "メラメラ": "blaze",
+    "ジュー": "sizzle",
+    "カァ": "blush",
+    "ズン": "THUD",
+    "ドサッ": "THUD",
+    "ドスン": "THUD",
+}
+
+# Characters dropped before lookup: elongation marks, small tsu (a hard stop) and punctuation
+SFX_IGNORED_CHARS = set("ーッ〜~～・…!?！？。、.,「」『』()（）")
+
+# A repeated unit of one to four kana, e.g. "ザワ" in "ザワザワ"
+REPEATED_UNIT_PATTERN = re.compile(r"^(.{1,4}?)\1+$")
+
+# Elongation marks and small tsu; a textbox needs one of these (or a repeat) to count as a sound effect
+SFX_MARKER_CHARS = set("ーッ〜~～")
+
+# Shorter keys match too many ordinary words
+MIN_SFX_KEY_LENGTH = 2
+
+
+def normalize_sfx(text: str) -> str:
+    """Fold a sound effect to a canonical lookup key.
+
+    Applies NFKC (half-width to full-width kana), folds hiragana to katakana, drops
+    elongation marks, small tsu and punctuation, collapses runs of the same kana and
+    finally reduces a repeated unit to a single copy.
+
+    Example:
+        normalize_sfx("ごごごご…！") returns "ゴ"
+        normalize_sfx("ｻﾞﾜｻﾞﾜ") returns "ザワ"
+
+    Args:
+        text (str): Text extracted from a textbox.
+
+    Returns:
+        str: The lookup key ("" if nothing is left).
+    """
+    text = unicodedata.normalize('NFKC', text)
+
+    folded = []
+    for char in text:
+        code = ord(char)
+        # Hiragana ぁ-ゖ sit exactly 0x60 below their katakana counterparts
+        if 0x3041 <= code <= 0x3096:
+            char = chr(code + 0x60)
+        if char.isspace() or char in SFX_IGNORED_CHARS:
+            continue
+        # Collapse runs of the same kana: ドドドン -> ドン
+        if folded and folded[-1] == char:
+            continue
+        folded.append(char)
+
+    key = ''.join(folded)
+    repeated = REPEATED_UNIT_PATTERN.match(key)
+    if repeated:
+        key = repeated.group(1)
+    return key
+
+
+def has_sfx_markers(text: str) -> bool:
+    """True if a textbox is written like a sound effect rather than a word.
+
+    Sound effects are elongated (ドーン), end in a hard stop (バシッ) or repeat
+    (ザワザワ, ドドドン); a bare パン or ジロ is more likely dialogue or a name.
+
+    Args:
+        text (str): Text extracted from a textbox.
+
+    Returns:
+        bool: True if the text has an elongation mark, small tsu or a repeated kana or unit.
+    """
+    text = unicodedata.normalize('NFKC', text)
+    if any(char in SFX_MARKER_CHARS for char in text):
+        return True
+    kana = [chr(ord(char) + 0x60) if 0x3041 <= ord(char) <= 0x3096 else char
+            for char in text if not char.isspace() and char not in SFX_IGNORED_CHARS]
+    if any(a == b for a, b in zip(kana, kana[1:])):
+        return True
+    return bool(REPEATED_UNIT_PATTERN.match(''.join(kana)))
+
+
+class SfxLexicon:
+    """Dictionary of sound effects that can be translated without a model call.
+
+    Built-in entries are merged with the user's entries from `user_path` (user entries
+    win). Built-in entries only match textboxes with sound effect markers (see
+    has_sfx_markers); the user's entries match as written. Lookups are counted so
+    callers can report the hit rate.
+    """
+
+    def __init__(self, user_path: os.PathLike = DEFAULT_SFX_PATH, builtin: dict[str, str] = BUILTIN_SFX):
+        self.user_path = user_path
+        self._lock = threading.Lock()
+        self.user_entries = self._read_user_entries()
+        self.entries = {}
+        for source, translation in builtin.items():
+            key = normalize_sfx(source)
+            if len(key) >= MIN_SFX_KEY_LENGTH:
+                self.entries[key] = translation
+        # Keys the user added, which don't need sound effect markers to match
+        self.user_keys = set()
+        for source, translation in self.user_entries.items():
+            key = normalize_sfx(source)
+            if key:
+                self.entries[key] = translation
+                self.user_keys.add(key)
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Start counting lookups from zero, e.g. at the start of a job."""
+        with self._lock:
+            self.lookups = 0
+            self.hits = 0
+            self.hit_counts = {}
+
+    def _read_user_entries(self) -> dict[str, str]:
+        try:
+            if os.path.exists(self.user_path):
+                with open(self.user_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return {str(k): str(v) for k, v in data.items()}
+                logging.warning("SFX lexicon %s does not contain an object. Ignoring it.", self.user_path)
+        except (json.JSONDecodeError, IOError) as e:
+            logging.warning(f"Could not load SFX lexicon: {e}")
+        return {}
+
+    def lookup(self, text: str) -> str | None:
+        """Translate `text` if the whole textbox is a known sound effect.
+
+        Args:
+            text (str): Text extracted from a textbox.
+
+        Returns:
+            str | None: The English sound effect, or None if it isn't in the lexicon.
+        """
+        key = normalize_sfx(text)
+        translation = self.entries.get(key) if key else None
+        if translation is not None and key not in self.user_keys and not has_sfx_markers(text):
+            translation = None
+        with self._lock:
+            self.lookups += 1
+            if translation is not None:
+                self.hits += 1
+                self.hit_counts[key] = self.hit_counts.get(key, 0) + 1
+        return translation
+
+    def add(self, source: str, translation: str) -> None:
+        """Add or override an entry and persist it to the user lexicon file."""
+        key = normalize_sfx(source)
+        if not key:
+            raise ValueError(f"{source!r} has no sound effect characters")
+        with self._lock:
+            self.entries[key] = translation
+            self.user_keys.add(key)
+            self.user_entries[source] = translation
+            entries = dict(self.user_entries)
+        atomic_write_json(self.user_path, entries)
+
+    def stats(self, top: int = 10) -> dict:
+        """Lookup statistics: lookups, hits, hit_rate and the most frequent hits."""
+        with self._lock:
+            most_common = sorted(self.hit_counts.items(), key=lambda item: item[1], reverse=True)[:top]
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "top": most_common,
+            }
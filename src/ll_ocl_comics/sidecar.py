@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+from lazy_pages import dehydrate_pages
+from mokuro_changes import SIDECAR_LOADER_JS_FUNC
+from textbox_store import TextboxStore
+from viewer_patch import PatchCache, is_patched, patch_viewer
+
+# Written next to each translated file: <name>.translations.jsonl
+SIDECAR_SUFFIX = ".translations.jsonl"
+# `apply` writes <name>.translated.html unless told otherwise, leaving the mokuro HTML intact
+TRANSLATED_SUFFIX = ".translated.html"
+SIDECAR_FORMAT = "ll-ocl-comics-sidecar"
+SIDECAR_VERSION = 1
+
+# Classes apply_merged_translations adds to every translated textbox
+TRANSLATED_CLASSES = ("short-text", "medium-text", "long-text")
+
+
+def sidecar_path_for(html_path: os.PathLike) -> str:
+    """Sidecar path for a translated HTML file: volume.html -> volume.translations.jsonl"""
+    return os.path.splitext(html_path)[0] + SIDECAR_SUFFIX
+
+
+def translated_path_for(html_path: os.PathLike) -> str:
+    """Default output of applying a sidecar to a mokuro file: volume.html -> volume.translated.html"""
+    return os.path.splitext(html_path)[0] + TRANSLATED_SUFFIX
+
+
+def page_textboxes(page_container) -> list:
+    return page_container.find_all('div', class_='textBox')
+
+
+def textbox_source_text(textbox) -> str:
+    """The OCR text of a textbox, one space between mokuro's line paragraphs."""
+    return ' '.join(textbox.stripped_strings)
+
+
+def collect_source_texts(page_containers, file_name: str = "") -> TextboxStore:
+    """Snapshot the OCR text of every textbox before translation overwrites it.
+
+    Args:
+        page_containers: The document's `.pageContainer` elements
+        file_name (str, optional): Name recorded with the textboxes. Defaults to "".
+
+    Returns:
+        TextboxStore: Source text of every textbox (empty ones included), with the
+            page index as page number and the position on the page as textbox number
+    """
+    source_texts = TextboxStore()
+    for page_index, page in enumerate(page_containers):
+        for box_index, textbox in enumerate(page_textboxes(page)):
+            source_texts.append(file_name, page_index, box_index, textbox_source_text(textbox))
+    return source_texts
+
+
+def collect_translations(page_containers, source_texts: TextboxStore | None = None) -> list[dict]:
+    """Build sidecar records from a translated document.
+
+    Each record identifies a textbox by page index and position on the page and
+    carries the translation plus the layout hints the translator wrote to the box
+    (its style, classes and data-* attributes).
+
+    Args:
+        page_containers: The translated document's `.pageContainer` elements
+        source_texts (TextboxStore, optional): From collect_source_texts. Defaults to None.
+
+    Returns:
+        list[dict]: One {"page", "box", "source", "text", "attrs"} record per translated textbox
+    """
+    records = []
+    for page_index, page in enumerate(page_containers):
+        for box_index, textbox in enumerate(page_textboxes(page)):
+            classes = textbox.get('class', [])
+            if not any(name in classes for name in TRANSLATED_CLASSES):
+                continue
+            attrs = {
+                name: ' '.join(value) if isinstance(value, list) else value
+                for name, value in textbox.attrs.items()
+            }
+            record = {"page": page_index, "box": box_index}
+            source = source_texts.text_at(page_index, box_index) if source_texts is not None else None
+            if source is not None:
+                record["source"] = source
+            record["text"] = textbox.get_text().strip()
+            record["attrs"] = attrs
+            records.append(record)
+    return records
+
+
+def write_sidecar(path: os.PathLike, records: list[dict], **header_fields) -> None:
+    """Write records as JSONL behind a header line, replacing `path` atomically.
+
+    Raises:
+        IOError: If the file could not be written
+    """
+    header = {"format": SIDECAR_FORMAT, "version": SIDECAR_VERSION, "created": time.time(), **header_fields}
+    target_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(target_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".jsonl", dir=target_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_sidecar(path: os.PathLike) -> tuple[dict, list[dict]]:
+    """Read a sidecar written by write_sidecar.
+
+    Raises:
+        ValueError: If the file isn't a sidecar or has an unsupported version
+
+    Returns:
+        tuple[dict, list[dict]]: (header, records)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+    if not lines:
+        raise ValueError(f"{path} is empty")
+    header = json.loads(lines[0])
+    if header.get("format") != SIDECAR_FORMAT:
+        raise ValueError(f"{path} is not a translation sidecar")
+    if header.get("version") != SIDECAR_VERSION:
+        raise ValueError(f"{path} has unsupported sidecar version {header.get('version')}")
+    return header, [json.loads(line) for line in lines[1:]]
+
+
+def set_textbox_text(soup, textbox, text: str) -> None:
+    """Replace everything inside a textbox with a single paragraph holding `text`."""
+    textbox.clear()
+    paragraph = soup.new_tag('p')
+    paragraph.string = text
+    textbox.append(paragraph)
+
+
+def apply_sidecar(soup, records: list[dict], check_source: bool = True) -> dict:
+    """Merge sidecar records into a mokuro document.
+
+    Args:
+        soup: BeautifulSoup document (original mokuro output or an earlier translation)
+        records (list[dict]): Records from read_sidecar
+        check_source (bool, optional): Skip records whose source text doesn't match the
+            textbox. Turn off for documents that are already translated. Defaults to True.
+
+    Returns:
+        dict: applied, missing (no such page/textbox) and mismatched (source text differs) counts
+    """
+    pages = [page_textboxes(page) for page in soup.find_all('div', class_='pageContainer')]
+    stats = {"applied": 0, "missing": 0, "mismatched": 0}
+    for record in records:
+        page_index, box_index = record["page"], record["box"]
+        if page_index >= len(pages) or box_index >= len(pages[page_index]):
+            stats["missing"] += 1
+            continue
+        textbox = pages[page_index][box_index]
+        if check_source and "source" in record and textbox_source_text(textbox) != record["source"]:
+            stats["mismatched"] += 1
+            logging.warning("Sidecar textbox %d on page %d doesn't match the document, skipping it", box_index, page_index + 1)
+            continue
+        if record.get("attrs"):
+            textbox.attrs = dict(record["attrs"])
+            if "class" in textbox.attrs:
+                textbox["class"] = textbox["class"].split()
+        set_textbox_text(soup, textbox, record["text"])
+        stats["applied"] += 1
+    return stats
+
+
+def link_sidecar(soup, sidecar_url: str) -> None:
+    """Make the viewer fetch and apply a sidecar when it opens, instead of baking it in.
+
+    Needs a patched viewer and an HTTP server; browsers block fetch() from file:// pages.
+    """
+    loader = soup.new_tag('script')
+    loader.string = SIDECAR_LOADER_JS_FUNC + f"\nloadTranslationSidecar({json.dumps(sidecar_url)});\n"
+    (soup.body or soup).append(loader)
+
+
+def apply_sidecar_file(html_path: os.PathLike, sidecar_path: os.PathLike, output_path: os.PathLike,
+                       link: bool = False, lazy_pages: bool = False, patch_cache: PatchCache | None = None) -> dict:
+    """Patch a mokuro HTML file and merge a sidecar into it, without calling the model.
+
+    Args:
+        html_path (os.PathLike): Original mokuro HTML (or an earlier translated output)
+        sidecar_path (os.PathLike): Sidecar written during translation
+        output_path (os.PathLike): Where to write the result
+        link (bool, optional): Load the sidecar in the viewer at runtime instead of
+            writing the translations into the HTML. Defaults to False.
+        lazy_pages (bool, optional): Write lazy page output (ignored with link). Defaults to False.
+        patch_cache (PatchCache, optional): Cache of patched viewer code. Defaults to None.
+
+    Returns:
+        dict: apply_sidecar's counts (all zero when linking)
+    """
+    from bs4 import BeautifulSoup
+
+    _, records = read_sidecar(sidecar_path)
+    with open(html_path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'lxml')
+
+    already_patched = is_patched(soup)
+    if not already_patched:
+        patch_viewer(soup, lazy_pages and not link, patch_cache)
+
+    if link:
+        sidecar_url = os.path.relpath(sidecar_path, os.path.dirname(os.path.abspath(output_path))).replace(os.sep, '/')
+        link_sidecar(soup, sidecar_url)
+        stats = {"applied": 0, "missing": 0, "mismatched": 0}
+    else:
+        stats = apply_sidecar(soup, records, check_source=not already_patched)
+        if lazy_pages and not already_patched:
+            dehydrate_pages(soup)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(str(soup))
+    return stats
@@ -0,0 +1,127 @@
+import re
+
+# Font size limits used by the viewer's constrain-text scaling (px)
+MIN_FONT_SIZE = 16
+MAX_FONT_SIZE = 60
+
+# Matches the viewer's constrain-text CSS: 2px padding on each side and line-height 1.1em
+BOX_PADDING = 4
+LINE_HEIGHT = 1.1
+
+# Advance widths of printable ASCII (32-126) in 1/1000 em, from Helvetica's metrics.
+# The viewer's sans-serif font differs slightly; the viewer re-measures boxes that overflow.
+ASCII_ADVANCE_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+# Width of characters outside printable ASCII: full-width forms are 1em,
+# anything else (accented Latin, curly quotes, ellipsis) is treated as an average letter
+FULL_WIDTH_ADVANCE = 1000
+DEFAULT_ADVANCE = 600
+
+# Shrink the available width a little so estimation error rarely causes overflow
+WIDTH_SAFETY = 0.95
+
+
+def char_advance(char: str) -> int:
+    """Advance width of `char` in 1/1000 em."""
+    code = ord(char)
+    if 32 <= code <= 126:
+        return ASCII_ADVANCE_WIDTHS[code - 32]
+    if 0x1100 <= code <= 0xFFEF and not 0x2000 <= code <= 0x206F:
+        return FULL_WIDTH_ADVANCE
+    return DEFAULT_ADVANCE
+
+
+def text_width(text: str, font_size: float) -> float:
+    """Rendered width of `text` in px at `font_size`."""
+    return sum(char_advance(char) for char in text) * font_size / 1000
+
+
+def count_wrapped_lines(text: str, font_size: float, max_width: float) -> int | None:
+    """Number of lines `text` wraps to in a box `max_width` px wide.
+
+    Words wrap greedily at spaces; a word wider than the box is broken between
+    characters, like the viewer's `overflow-wrap: break-word`.
+
+    Returns:
+        int | None: The line count, or None if a single character is wider than the box
+    """
+    space_width = text_width(" ", font_size)
+    lines = 0
+    for paragraph in text.split("\n"):
+        lines += 1
+        line_width = 0.0
+        for word in paragraph.split():
+            word_width = text_width(word, font_size)
+            if line_width and line_width + space_width + word_width <= max_width:
+                line_width += space_width + word_width
+                continue
+            if line_width:
+                lines += 1
+            if word_width <= max_width:
+                line_width = word_width
+                continue
+            # Break the long word across lines
+            line_width = 0.0
+            for char in word:
+                char_width = char_advance(char) * font_size / 1000
+                if char_width > max_width:
+                    return None
+                if line_width + char_width > max_width:
+                    lines += 1
+                    line_width = 0.0
+                line_width += char_width
+    return lines
+
+
+def fits(text: str, font_size: float, box_width: float, box_height: float) -> bool:
+    """True if `text` fits in the box's content area at `font_size`."""
+    available_width = (box_width - BOX_PADDING) * WIDTH_SAFETY
+    available_height = box_height - BOX_PADDING
+    lines = count_wrapped_lines(text, font_size, available_width)
+    return lines is not None and lines * font_size * LINE_HEIGHT <= available_height
+
+
+def fit_font_size(text: str, box_width: float, box_height: float,
+                  min_size: int = MIN_FONT_SIZE, max_size: int = MAX_FONT_SIZE) -> tuple[int, bool]:
+    """Largest font size at which `text` fits in a textbox, found by binary search.
+
+    Example:
+        fit_font_size("Hi!", 200, 100) returns (60, True)
+        fit_font_size("They would often cling to me in a playful way.", 130, 120) returns (22, True)
+
+    Args:
+        text (str): The translation shown in the box.
+        box_width (float): Box width in px (data-box-width).
+        box_height (float): Box height in px (data-box-height).
+        min_size (int, optional): Smallest size to use. Defaults to MIN_FONT_SIZE.
+        max_size (int, optional): Largest size to use. Defaults to MAX_FONT_SIZE.
+
+    Returns:
+        tuple[int, bool]: (font size in px, whether the text fits at that size). If it
+            doesn't even fit at min_size, min_size is returned with False.
+    """
+    low, high = min_size, max(min_size, max_size)
+    best_size = None
+    while low <= high:
+        size = (low + high) // 2
+        if fits(text, size, box_width, box_height):
+            best_size = size
+            low = size + 1
+        else:
+            high = size - 1
+    if best_size is None:
+        return min_size, False
+    return best_size, True
+
+
+def box_font_size(style: str) -> float | None:
+    """The font size (px) mokuro set in a textbox's inline style, if any."""
+    match = re.search(r'font-size:\s*([\d.]+)px', style or '')
+    return float(match.group(1)) if match else None
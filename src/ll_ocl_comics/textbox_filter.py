@@ -0,0 +1,92 @@
+import unicodedata
+
+# Textbox categories returned by classify_textbox
+EMPTY = "empty"
+PUNCTUATION = "punctuation"
+NUMERIC = "numeric"
+LATIN = "latin"
+TRANSLATE = "translate"
+
+# Unicode ranges of the scripts the translator accepts as source languages
+SOURCE_SCRIPT_RANGES = (
+    (0x3040, 0x309F),    # Hiragana
+    (0x30A0, 0x30FF),    # Katakana
+    (0x31F0, 0x31FF),    # Katakana phonetic extensions
+    (0xFF66, 0xFF9D),    # Half-width katakana
+    (0x3400, 0x4DBF),    # CJK unified ideographs extension A
+    (0x4E00, 0x9FFF),    # CJK unified ideographs
+    (0xF900, 0xFAFF),    # CJK compatibility ideographs
+    (0x1100, 0x11FF),    # Hangul jamo
+    (0x3130, 0x318F),    # Hangul compatibility jamo
+    (0xAC00, 0xD7AF),    # Hangul syllables
+    (0x0E00, 0x0E7F),    # Thai
+)
+
+# Prolonged sound marks and iteration marks count as source script, not punctuation
+SOURCE_SCRIPT_MARKS = set("ー々〃ゝゞヽヾ")
+
+
+def is_source_script(char: str) -> bool:
+    """True if `char` belongs to one of the scripts in SOURCE_SCRIPT_RANGES."""
+    if char in SOURCE_SCRIPT_MARKS:
+        return True
+    code = ord(char)
+    return any(start <= code <= end for start, end in SOURCE_SCRIPT_RANGES)
+
+
+def classify_textbox(text: str) -> str:
+    """Classify OCR text so that boxes which need no translation can skip the LLM.
+
+    Example:
+        classify_textbox("！？") returns "punctuation"
+        classify_textbox("１２") returns "numeric"
+        classify_textbox("OK!") returns "latin"
+        classify_textbox("よく") returns "translate"
+
+    Args:
+        text (str): Text extracted from a textbox.
+
+    Returns:
+        str: One of EMPTY, PUNCTUATION, NUMERIC, LATIN or TRANSLATE.
+    """
+    has_digit = False
+    has_letter = False
+    has_visible = False
+
+    for char in text:
+        if char.isspace():
+            continue
+        has_visible = True
+        if is_source_script(char):
+            return TRANSLATE
+        category = unicodedata.category(char)
+        if category.startswith('L'):
+            has_letter = True
+        elif category.startswith('N'):
+            has_digit = True
+
+    if not has_visible:
+        return EMPTY
+    if has_letter:
+        return LATIN
+    if has_digit:
+        return NUMERIC
+    return PUNCTUATION
+
+
+def resolve_locally(text: str) -> str | None:
+    """Return the text to display for a box that doesn't need the model, or None.
+
+    Full-width punctuation, digits and Latin letters are folded to their ASCII
+    forms (NFKC), e.g. "！？" becomes "!?" and "…" becomes "...".
+
+    Args:
+        text (str): Text extracted from a textbox.
+
+    Returns:
+        str | None: The local "translation", or None if the box must go to the model.
+    """
+    category = classify_textbox(text)
+    if category in (TRANSLATE, EMPTY):
+        return None
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
@@ -0,0 +1,181 @@
+import json
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Serialized layout: magic, header length, JSON header, then the columns and the UTF-8 text buffer
+STORE_MAGIC = b"LLTB"
+STORE_VERSION = 1
+HEADER_LENGTH = struct.Struct("<I")
+
+# array typecodes: file id, page number and textbox number (unsigned 32-bit), text offsets (64-bit)
+INDEX_TYPECODE = 'I'
+OFFSET_TYPECODE = 'Q'
+
+
+class TextboxRecord:
+    """One textbox, materialized from a TextboxStore on access."""
+
+    __slots__ = ("file_name", "page_number", "textbox_number", "text")
+
+    def __init__(self, file_name: str, page_number: int, textbox_number: int, text: str):
+        self.file_name = file_name
+        self.page_number = page_number
+        self.textbox_number = textbox_number
+        self.text = text
+
+    def __eq__(self, other):
+        if not isinstance(other, TextboxRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"TextboxRecord({self.file_name!r}, page={self.page_number}, textbox={self.textbox_number}, {self.text!r})"
+
+
+class TextboxStore:
+    """Textboxes of one or more volumes as parallel arrays over a single text buffer.
+
+    Each textbox costs three array entries and an offset instead of a dict and its
+    own string object, which matters when a whole series (tens of thousands of
+    textboxes) is collected for a summary. Textboxes must be appended in page order,
+    which lets page lookups and page-range slices use binary search.
+    """
+
+    def __init__(self):
+        self.file_names = []
+        self._file_ids = {}
+        self._files = array(INDEX_TYPECODE)
+        self._pages = array(INDEX_TYPECODE)
+        self._numbers = array(INDEX_TYPECODE)
+        self._offsets = array(OFFSET_TYPECODE, [0])
+        self._buffer = ""
+        self._pending = []
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index: int) -> TextboxRecord:
+        if index < 0:
+            index += len(self)
+        return TextboxRecord(self.file_names[self._files[index]], self._pages[index],
+                             self._numbers[index], self.text(index))
+
+    def file_id(self, file_name: str) -> int:
+        """Id of a file name, adding it on first use."""
+        if file_name not in self._file_ids:
+            self._file_ids[file_name] = len(self.file_names)
+            self.file_names.append(file_name)
+        return self._file_ids[file_name]
+
+    def append(self, file_name: str, page_number: int, textbox_number: int, text: str) -> None:
+        """Add a textbox. Raises ValueError if `page_number` is before the last page added."""
+        if self._pages and page_number < self._pages[-1]:
+            raise ValueError(f"Page {page_number} added after page {self._pages[-1]}")
+        self._files.append(self.file_id(file_name))
+        self._pages.append(page_number)
+        self._numbers.append(textbox_number)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self._pending.append(text)
+
+    def _text_buffer(self) -> str:
+        if self._pending:
+            self._buffer += ''.join(self._pending)
+            self._pending = []
+        return self._buffer
+
+    def text(self, index: int) -> str:
+        return self._text_buffer()[self._offsets[index]:self._offsets[index + 1]]
+
+    def page_bounds(self, page_number: int) -> tuple[int, int]:
+        """Index range [start, end) of a page's textboxes."""
+        return bisect_left(self._pages, page_number), bisect_right(self._pages, page_number)
+
+    def text_at(self, page_number: int, position: int) -> str | None:
+        """Text of the page's textbox at `position` (0-based), or None if there is none."""
+        start, end = self.page_bounds(page_number)
+        return self.text(start + position) if 0 <= position < end - start else None
+
+    @property
+    def page_count(self) -> int:
+        return len(set(self._pages))
+
+    def pages(self):
+        """Yield (page_number, file_name, records) for every page with textboxes."""
+        start = 0
+        while start < len(self):
+            end = bisect_right(self._pages, self._pages[start], start)
+            yield self._pages[start], self.file_names[self._files[start]], [self[i] for i in range(start, end)]
+            start = end
+
+    def page_range(self, first: int, last: int) -> 'TextboxStore':
+        """A new store with the textboxes of pages first..last (inclusive)."""
+        start, end = bisect_left(self._pages, first), bisect_right(self._pages, last)
+        sliced = TextboxStore()
+        sliced.file_names = list(self.file_names)
+        sliced._file_ids = dict(self._file_ids)
+        sliced._files = self._files[start:end]
+        sliced._pages = self._pages[start:end]
+        sliced._numbers = self._numbers[start:end]
+        base = self._offsets[start]
+        sliced._offsets = array(OFFSET_TYPECODE, (offset - base for offset in self._offsets[start:end + 1]))
+        sliced._buffer = self._text_buffer()[base:self._offsets[end]]
+        return sliced
+
+    def to_bytes(self) -> bytes:
+        """Serialize the store; the columns are written as raw little-endian arrays."""
+        header = json.dumps({
+            "version": STORE_VERSION,
+            "count": len(self),
+            "file_names": self.file_names,
+        }, ensure_ascii=False).encode('utf-8')
+        columns = [self._files, self._pages, self._numbers, self._offsets]
+        return b''.join([STORE_MAGIC, HEADER_LENGTH.pack(len(header)), header]
+                        + [_little_endian(column).tobytes() for column in columns]
+                        + [self._text_buffer().encode('utf-8')])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TextboxStore':
+        """Read a store written by to_bytes.
+
+        Raises:
+            ValueError: If `data` isn't a serialized store of a supported version
+        """
+        if data[:len(STORE_MAGIC)] != STORE_MAGIC:
+            raise ValueError("Not a serialized textbox store")
+        position = len(STORE_MAGIC)
+        header_length, = HEADER_LENGTH.unpack_from(data, position)
+        position += HEADER_LENGTH.size
+        header = json.loads(data[position:position + header_length])
+        position += header_length
+        if header.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported textbox store version {header.get('version')}")
+
+        store = cls()
+        store.file_names = header["file_names"]
+        store._file_ids = {name: i for i, name in enumerate(store.file_names)}
+        count = header["count"]
+        columns = []
+        for typecode, length in ((INDEX_TYPECODE, count), (INDEX_TYPECODE, count),
+                                 (INDEX_TYPECODE, count), (OFFSET_TYPECODE, count + 1)):
+            column = array(typecode)
+            size = column.itemsize * length
+            column.frombytes(data[position:position + size])
+            columns.append(_little_endian(column))
+            position += size
+        store._files, store._pages, store._numbers, store._offsets = columns
+        store._buffer = data[position:].decode('utf-8')
+        return store
+
+
+def _little_endian(column: array) -> array:
+    """The column in little-endian byte order (byteswaps a copy on big-endian machines)."""
+    if struct.pack("=H", 1) == struct.pack("<H", 1):
+        return column
+    swapped = array(column.typecode, column)
+    swapped.byteswap()
+    return swapped
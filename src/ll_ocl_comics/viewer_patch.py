@@ -0,0 +1,343 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from config import DEFAULT_CONFIG_PATH, atomic_write_json
+from mokuro_changes import (
+    PROPERTIES_JS_FUNC, LISTENER_JS_FUNC,
+    ALWAYS_SHOW_TRANSLATION_JS_FUNC, UPDATE_PAGE_JS_ORIGINAL,
+    UPDATE_PAGE_JS_FUNC, LAZY_UPDATE_PAGE_JS_FUNC, LAZY_PAGES_JS_FUNC,
+)
+
+# Menu option added by patch_viewer; its presence marks an already patched document
+PATCHED_MARKER_ID = "menuAlwaysShowTranslation"
+
+# The patch cache sits next to the config file
+DEFAULT_PATCH_CACHE_PATH = os.path.join(os.path.dirname(DEFAULT_CONFIG_PATH), "viewer_patch_cache.json")
+
+# Patched scripts/stylesheets kept; each mokuro release needs one of each (two scripts with lazy pages)
+MAX_PATCH_CACHE_ENTRIES = 16
+
+# Bump when the patching code in this module changes in a way the JS/CSS constants don't show
+PATCH_REVISION = 1
+
+# sha256 of the viewer script mokuro embeds in its single-file HTML -> (releases, fully patchable).
+# Releases before 0.1.5 have no OCR textbox toggle, so the menu and state patches find nothing to extend.
+KNOWN_MOKURO_SCRIPTS = {
+    "f9c310555916f4a188f974012b9d2dd402a2ed10f7608b9d06f719191b0ba612": ("0.1.0", False),
+    "b1d4890812b4c38e756c51b733ebbfb3f5e4acc697068abbc633e73e2568d0e1": ("0.1.1-0.1.4", False),
+    "924f7e28f769e155574355cbaa813371d52571a4f715fcdaabfa9f89068e8f0d": ("0.1.5-0.1.6", True),
+    "e2db9eac845c4496fc3ac423b0aa0aae80d90bf85fa00ad9877a0de549df4789": ("0.1.7-0.1.8", True),
+    "acad875e64b849bd9b80c355febb5eadf9356b206413bb6f0bc037cadf0620f8": ("0.2.0-0.2.5", True),
+}
+
+# sha256 of mokuro's embedded stylesheet -> releases
+KNOWN_MOKURO_STYLES = {
+    "74a8c5180dec8e5c5abbbc3a36224de3c4868e5729c7c236c61ea16b31e9c18e": "0.1.0-0.1.4",
+    "fef519adfe9f5bf59471964e873e1aa05b6fa74b3e844ad22d4bcda543bde133": "0.1.5-0.2.5",
+}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# Identifies the patches themselves; cached results from other patch versions are discarded
+PATCH_FINGERPRINT = content_hash('\0'.join([
+    str(PATCH_REVISION), PROPERTIES_JS_FUNC, LISTENER_JS_FUNC, ALWAYS_SHOW_TRANSLATION_JS_FUNC,
+    UPDATE_PAGE_JS_ORIGINAL, UPDATE_PAGE_JS_FUNC, LAZY_UPDATE_PAGE_JS_FUNC, LAZY_PAGES_JS_FUNC,
+]))[:16]
+
+
+def is_patched(soup) -> bool:
+    """True if patch_viewer has already been applied to the document."""
+    return soup.find('input', id=PATCHED_MARKER_ID) is not None
+
+
+def patch_style(css: str) -> str:
+    """Part 1: enhanced CSS for the viewer's <style> block."""
+    # Modify default textBox p styles to enable text wrapping by default
+    css = css.replace(
+        'white-space: nowrap;',
+        'white-space: normal;\n    word-wrap: break-word;'
+    )
+
+    # Add enhanced feature styles
+    return css + ALWAYS_SHOW_TRANSLATION_JS_FUNC
+
+
+def patch_menu(soup) -> None:
+    """Part 2: add the translator's options to the viewer's dropdown menu."""
+    dropdown_content = soup.find('div', class_='dropdown-content')
+    if dropdown_content:
+        # Find the toggle OCR text boxes option to insert after it
+        toggle_ocr_input = soup.find('input', id='menuToggleOCRTextBoxes')
+        if toggle_ocr_input:
+            toggle_ocr_label = toggle_ocr_input.parent
+
+            # Add "Always show translation" option
+            always_show_label = soup.new_tag('label', **{'class': 'dropdown-option'})
+            always_show_label.string = 'Always show translation'
+            always_show_input = soup.new_tag('input', type='checkbox', id='menuAlwaysShowTranslation')
+            always_show_label.append(always_show_input)
+
+            # Add "Constrain text" option  
+            constrain_label = soup.new_tag('label', **{'class': 'dropdown-option'})
+            constrain_label.string = 'Constrain text'
+            constrain_input = soup.new_tag('input', type='checkbox', id='menuConstrainText')
+            constrain_label.append(constrain_input)
+
+            # Insert after existing toggle OCR option
+            toggle_ocr_label.insert_after(always_show_label)
+            always_show_label.insert_after(constrain_label)
+
+
+def patch_script(js_code: str, lazy_pages: bool = False) -> str:
+    """Part 3: JavaScript modifications to the viewer script."""
+    # Update defaultState - Add new properties without removing existing ones
+    js_code = re.sub(r'(toggleOCRTextBoxes\s*:\s*false,)',
+                     r'\1\n    alwaysShowTranslation: false,\n    constrainText: false,', js_code)
+
+    # Update updateUI - Add new checkbox updates
+    js_code = re.sub(r"(document\.getElementById\('menuToggleOCRTextBoxes'\)\.checked = state\.toggleOCRTextBoxes;)",
+                     r'\1\n    document.getElementById("menuAlwaysShowTranslation").checked = state.alwaysShowTranslation;\n    document.getElementById("menuConstrainText").checked = state.constrainText;', js_code)
+
+    # Remove initTextBoxes and its call using safe method
+    js_code = remove_init_text_boxes(js_code)
+    js_code = js_code.replace('initTextBoxes();', '')
+
+    # Add new event listeners using safe method
+    js_code = add_new_event_listeners(js_code)
+
+    # Replace updateProperties function using safe method
+    js_code = replace_update_properties_function(js_code)
+
+    # Restore proper page navigation (ensure pages are properly hidden/shown)
+    js_code = js_code.replace(
+        UPDATE_PAGE_JS_ORIGINAL,
+        LAZY_UPDATE_PAGE_JS_FUNC if lazy_pages else UPDATE_PAGE_JS_FUNC
+    )
+
+    # Lazy mode: materialize the current page and its neighbours from their data islands
+    if lazy_pages:
+        js_code += LAZY_PAGES_JS_FUNC
+
+    return js_code
+
+
+def patch_viewer(soup, lazy_pages: bool = False, cache: 'PatchCache | None' = None) -> dict:
+    """Apply the translator's CSS, menu and JavaScript patches to a mokuro document.
+
+    Args:
+        soup: BeautifulSoup document of a mokuro HTML file
+        lazy_pages (bool, optional): Patch the viewer for lazy page output. Defaults to False.
+        cache (PatchCache, optional): Reuse patched CSS/JS for viewer code seen before.
+            Defaults to None (always patch).
+
+    Returns:
+        dict: balanced (bool, False if the patched script has unbalanced braces),
+            original_js_length (int), js_code (str, the patched script) and
+            release (str, the mokuro release the script belongs to, "" if unknown)
+    """
+    report = {"balanced": True, "original_js_length": 0, "js_code": "", "release": ""}
+    cache = cache if cache is not None else PatchCache(path=None)
+
+    # Part 1: Enhanced CSS Modifications
+    style_tag = soup.find('style')
+    if style_tag:
+        style_tag.string = cache.patched_style(style_tag.string or '')["css"]
+
+    # Part 2: HTML Modifications - Add new menu options
+    patch_menu(soup)
+
+    # Part 3: JavaScript Modifications
+    script_tag = soup.find_all('script')[-1]
+    if script_tag and script_tag.string:
+        js_code = script_tag.string
+        patched = cache.patched_script(js_code, lazy_pages)
+
+        # Validate JavaScript syntax
+        report["balanced"] = patched["balanced"]
+        report["original_js_length"] = len(js_code)
+        report["js_code"] = patched["js_code"]
+        report["release"] = patched["release"]
+
+        script_tag.string = patched["js_code"]
+
+    return report
+
+
+class PatchCache:
+    """Patched viewer CSS/JS keyed by a hash of mokuro's original code.
+
+    Every file produced by the same mokuro release embeds a byte-identical script
+    and stylesheet, so patching them once per release is enough. Entries are kept
+    in memory and, if `path` is set, in a JSON file next to the config so later
+    runs skip patching too. Keys include PATCH_FINGERPRINT, so entries made by an
+    older version of the patches are ignored.
+    """
+
+    def __init__(self, path: os.PathLike | None = DEFAULT_PATCH_CACHE_PATH, max_entries: int = MAX_PATCH_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = self._read()
+
+    def _read(self) -> dict:
+        if not self.path:
+            return {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and data.get('fingerprint') == PATCH_FINGERPRINT:
+                    return data.get('entries', {})
+        except (json.JSONDecodeError, IOError) as e:
+            logging.warning(f"Could not load viewer patch cache: {e}")
+        return {}
+
+    def _write(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            data = {"fingerprint": PATCH_FINGERPRINT, "entries": dict(self._entries)}
+        try:
+            atomic_write_json(self.path, data)
+        except IOError as e:
+            logging.warning(f"Could not save viewer patch cache: {e}")
+
+    def _get_or_patch(self, key: str, patch) -> dict:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                # Keep the dict in least- to most-recently used order
+                self._entries[key] = self._entries.pop(key)
+                return entry
+            self.misses += 1
+
+        entry = patch()
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._write()
+        return entry
+
+    def patched_style(self, css: str) -> dict:
+        """The patched stylesheet: {"css", "release"}."""
+        digest = content_hash(css)
+
+        def patch():
+            return {"css": patch_style(css), "release": KNOWN_MOKURO_STYLES.get(digest, "")}
+
+        return self._get_or_patch(f"style:{digest}", patch)
+
+    def patched_script(self, js_code: str, lazy_pages: bool = False) -> dict:
+        """The patched viewer script: {"js_code", "balanced", "release"}."""
+        digest = content_hash(js_code)
+
+        def patch():
+            release, supported = KNOWN_MOKURO_SCRIPTS.get(digest, ("", True))
+            if not release:
+                logging.warning("Unrecognized mokuro viewer script (sha256 %s...), the patches may not apply cleanly", digest[:12])
+            elif not supported:
+                logging.warning("The viewer script from mokuro %s predates the menu options the patches extend", release)
+            patched = patch_script(js_code, lazy_pages)
+            return {"js_code": patched, "balanced": check_balanced_braces(patched), "release": release}
+
+        return self._get_or_patch(f"script:{'lazy' if lazy_pages else 'eager'}:{digest}", patch)
+
+    def stats(self) -> dict:
+        """hits, misses and entries (number of cached patches)."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def check_balanced_braces(js_code: str) -> bool:
+    """Check if JavaScript code has balanced braces"""
+    stack = []
+    for char in js_code:
+        if char == '{':
+            stack.append(char)
+        elif char == '}':
+            if not stack:
+                return False
+            stack.pop()
+    return len(stack) == 0
+
+
+def remove_init_text_boxes(js_code: str) -> str:
+    """Safely remove initTextBoxes function"""
+    # Look for the function with proper brace matching
+    pattern = r'function\s+initTextBoxes\s*\(\)\s*\{'
+    match = re.search(pattern, js_code)
+
+    if not match:
+        return js_code
+
+    start_pos = match.start()
+    brace_start = match.end() - 1  # Position of opening brace
+
+    # Count braces to find the matching closing brace
+    brace_count = 1
+    pos = brace_start + 1
+
+    while pos < len(js_code) and brace_count > 0:
+        if js_code[pos] == '{':
+            brace_count += 1
+        elif js_code[pos] == '}':
+            brace_count -= 1
+        pos += 1
+
+    if brace_count == 0:
+        # Found the complete function, remove it
+        return js_code[:start_pos] + js_code[pos:]
+
+    return js_code  # Could not find complete function
+
+
+def replace_update_properties_function(js_code: str) -> str:
+    """Safely replace updateProperties function"""
+    # First, let's find the function start
+    function_start = js_code.find('function updateProperties()')
+    if function_start == -1:
+        return js_code  # Function not found, return unchanged
+
+    # Find the opening brace
+    brace_start = js_code.find('{', function_start)
+    if brace_start == -1:
+        return js_code
+
+    # Count braces to find the matching closing brace
+    brace_count = 1
+    pos = brace_start + 1
+
+    while pos < len(js_code) and brace_count > 0:
+        if js_code[pos] == '{':
+            brace_count += 1
+        elif js_code[pos] == '}':
+            brace_count -= 1
+        pos += 1
+
+    if brace_count == 0:    # Found the complete function
+        # Replace the entire function
+        new_js_code = (js_code[:function_start] + 
+                      PROPERTIES_JS_FUNC + 
+                      js_code[pos:])
+        return new_js_code
+
+    return js_code  # Could not find complete function
+
+
+def add_new_event_listeners(js_code: str) -> str:
+    """Add new event listeners without removing existing ones"""
+    # Find the location after the existing toggleOCRTextBoxes event listener
+    toggle_listener_pattern = r"(document\.getElementById\('menuToggleOCRTextBoxes'\)\.addEventListener\('click',\s*function\s*\(\)\s*\{[^}]*\}\s*,\s*false\);)"
+
+    return re.sub(toggle_listener_pattern, r'\1' + LISTENER_JS_FUNC, js_code)
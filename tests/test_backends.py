@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import ll_ocl_comics
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers like llama-server's OpenAI-compatible endpoints."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, None, self.headers.get("Authorization")))
+        if self.path != "/v1/models":
+            self.send_error(404)
+            return
+        self._send_json({"object": "list", "data": [
+            {"id": "qwen3-8b", "object": "model", "meta": {"n_ctx_train": 40960}},
+            {"id": "gemma-3", "object": "model", "max_model_len": 8192},
+        ]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, body, self.headers.get("Authorization")))
+        usage = {"prompt_tokens": 120, "completion_tokens": 3, "total_tokens": 123}
+        # Any max_tokens cuts the stub's response off
+        finish_reason = "length" if "max_tokens" in body else "stop"
+        if not body["stream"]:
+            self._send_json({"choices": [{"index": 0, "message": {"role": "assistant", "content": "Hello there"},
+                                          "finish_reason": finish_reason}],
+                             "usage": usage})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        deltas = [{"role": "assistant"}, {"reasoning_content": "greeting"}, {"content": "Hello"}, {"content": " there"}]
+        for delta in deltas:
+            self._send_event({"choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self._send_event({"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        self._send_event({"choices": [], "usage": usage, "timings": {"prompt_ms": 250.0, "predicted_ms": 100.0}})
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_event(self, data):
+        self.wfile.write(b"data: " + json.dumps(data).encode() + b"\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, data):
+        encoded = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestOpenAICompatibleBackend(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAIHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = ll_ocl_comics.ConfigStore(os.path.join(self.temp_dir.name, "config.json"))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.config.flush()
+        self.temp_dir.cleanup()
+
+    def make_api(self):
+        return ll_ocl_comics.OllamaAPI(self.base_url, config=self.config, backend="openai")
+
+    def test_model_listing_and_context_length(self):
+        api = self.make_api()
+        self.assertEqual(api.get_models(), ["qwen3-8b", "gemma-3"])
+        self.assertEqual(api.get_model_max_context("qwen3-8b"), 40960)
+        self.assertEqual(api.get_model_max_context("gemma-3"), 8192)
+
+    def test_options_mapping(self):
+        backend = ll_ocl_comics.OpenAICompatibleBackend(self.base_url)
+        body = backend.request_body("m", "system", "prompt", {
+            "num_ctx": 8192, "temperature": 0.3, "num_predict": 256, "keep_alive": "30m",
+            "format": {"type": "object"}, "think": False,
+        }, stream=True)
+        self.assertEqual(body["max_tokens"], 256)
+        self.assertEqual(body["temperature"], 0.3)
+        self.assertEqual(body["response_format"]["json_schema"]["schema"], {"type": "object"})
+        self.assertEqual(body["chat_template_kwargs"], {"enable_thinking": False})
+        self.assertEqual(body["stream_options"], {"include_usage": True})
+        self.assertNotIn("num_ctx", body)
+        self.assertNotIn("keep_alive", body)
+        self.assertEqual([message["role"] for message in body["messages"]], ["system", "user"])
+
+    def test_generate_with_usage(self):
+        api = self.make_api()
+        self.assertEqual(api.generate("qwen3-8b", "prompt", context_length=4096, num_predict=64), "Hello there")
+        path, body, _ = self.server.requests[-1]
+        self.assertEqual(path, "/v1/chat/completions")
+        self.assertEqual(body["max_tokens"], 64)
+        self.assertEqual(api.last_response_metrics["prompt_eval_count"], 120)
+        self.assertEqual(api.last_response_metrics["eval_count"], 3)
+        self.assertEqual(api.last_response_metrics["done_reason"], "length")
+
+    def test_streamed_generate(self):
+        api = self.make_api()
+        monitor = ll_ocl_comics.GenerationMonitor(None)
+        self.assertEqual(api.generate("qwen3-8b", "prompt", monitor=monitor, deadline=10), "Hello there")
+        metrics = api.last_response_metrics
+        self.assertEqual(metrics["eval_count"], 3)
+        self.assertEqual(metrics["prompt_eval_duration"], 250_000_000)
+        self.assertEqual(metrics["eval_duration"], 100_000_000)
+        self.assertEqual(monitor.reasoning_tokens, 1)
+        self.assertEqual(metrics["done_reason"], "stop")
+        self.assertEqual(api.circuit_breaker.failures, 0)
+
+    def test_api_key_and_saved_backend(self):
+        backend = ll_ocl_comics.OpenAICompatibleBackend(self.base_url, api_key="secret")
+        backend.check_connection()
+        self.assertEqual(self.server.requests[-1][2], "Bearer secret")
+
+        self.config.set('backend', 'openai')
+        self.config.set('backend_url', self.base_url)
+        api = ll_ocl_comics.OllamaAPI(config=self.config)
+        self.assertEqual(api.backend.name, "openai")
+        self.assertEqual(api.base_url, self.base_url)
+        # Switching the backend without a URL doesn't reuse the other server's URL
+        self.assertEqual(ll_ocl_comics.OllamaAPI(config=self.config, backend="ollama").base_url, "http://localhost:11434")
+
+class TestMakeBackend(unittest.TestCase):
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ll_ocl_comics.make_backend("tgi")
+        self.assertIsInstance(ll_ocl_comics.make_backend("ollama"), ll_ocl_comics.OllamaBackend)
+
+    def test_backend_must_implement_the_api(self):
+        class NoGenerate(ll_ocl_comics.Backend):
+            def check_connection(self):
+                return True
+
+            def list_models(self):
+                return []
+
+            def get_model_info(self, model):
+                return {}
+
+        with self.assertRaises(TypeError):
+            NoGenerate("http://localhost:1")
+
+if __name__ == '__main__':
+    unittest.main()
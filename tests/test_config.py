@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from src import ll_ocl_comics
+
+class TestConfigStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "config.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_typed_accessors_fall_back_to_defaults(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"context_length": "not a number", "temperature": 1.5}, f)
+        config = ll_ocl_comics.ConfigStore(self.path)
+        self.assertEqual(config.get_int("context_length", 13000), 13000)
+        self.assertEqual(config.get_float("temperature", 0.7), 1.5)
+        self.assertEqual(config.get_str("system_prompt", "default"), "default")
+
+    def test_writes_are_debounced(self):
+        config = ll_ocl_comics.ConfigStore(self.path, debounce=0.2)
+        for value in range(512, 1024):
+            config.set("context_length", value)
+        self.assertFalse(os.path.exists(self.path))
+
+        time.sleep(0.5)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"context_length": 1023})
+
+    def test_flush_replaces_file_atomically(self):
+        config = ll_ocl_comics.ConfigStore(self.path, debounce=60)
+        config.set("temperature", 0.3)
+        config.delete("missing")
+        self.assertTrue(config.flush())
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["config.json"])
+        self.assertEqual(ll_ocl_comics.ConfigStore(self.path).get_float("temperature", 0.7), 0.3)
+
+    def test_flush_skips_unchanged_config(self):
+        config = ll_ocl_comics.ConfigStore(self.path, debounce=60)
+        self.assertTrue(config.flush())
+        self.assertFalse(os.path.exists(self.path))
+
+        config.set("temperature", 0.3)
+        self.assertTrue(config.flush())
+        os.remove(self.path)
+        # A timer that fired during the first flush has nothing left to write
+        self.assertTrue(config.flush())
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
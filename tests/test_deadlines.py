@@ -0,0 +1,211 @@
+import importlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import ll_ocl_comics
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers like Ollama, per the server's `behaviour` for each path."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, body))
+        behaviour = self.server.behaviour.get(self.path, "ok")
+        if isinstance(behaviour, int):
+            self.send_response(behaviour)
+            self.end_headers()
+            return
+        if behaviour == "model_not_found":
+            data = json.dumps({"error": f'model "{body["model"]}" not found, try pulling it first'}).encode()
+            self.send_response(404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        text_key = "response" if self.path == "/api/generate" else "message"
+        if not body.get("stream"):
+            payload = {"response": "done"} if text_key == "response" else {"message": {"content": "done"}}
+            self._send(json.dumps({**payload, "done": True}).encode())
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for token in ["one ", "two "]:
+            part = {"response": token} if text_key == "response" else {"message": {"content": token}}
+            self.wfile.write(json.dumps(part).encode() + b"\n")
+            self.wfile.flush()
+        if behaviour == "stall":
+            self.server.release.wait(5)
+            return
+        if behaviour in ("error", "garbage"):
+            self.wfile.write(b'{"error": "model runner crashed"}\n' if behaviour == "error" else b"<html>\n")
+            return
+        self.wfile.write(json.dumps({"done": True, "eval_count": 2}).encode() + b"\n")
+
+    def _send(self, data):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestRequestDeadline(unittest.TestCase):
+    def test_deadline_scales_with_tokens(self):
+        estimate = ll_ocl_comics.ThroughputEstimate()
+        short = ll_ocl_comics.request_deadline(estimate, 2000, 500, minimum=0)
+        self.assertAlmostEqual(short, 3 * (0.5 + 2000 / 400 + 500 / 25))
+        self.assertGreater(ll_ocl_comics.request_deadline(estimate, 2000, 5000, minimum=0), short)
+        self.assertEqual(ll_ocl_comics.request_deadline(estimate, 10, 10), 300)
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self):
+        clock = FakeClock()
+        breaker = ll_ocl_comics.CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock)
+        breaker.record_failure("refused")
+        breaker.record_success()
+        breaker.record_failure("refused")
+        breaker.check()
+        breaker.record_failure("refused")
+        with self.assertRaises(ll_ocl_comics.OllamaUnavailable):
+            breaker.check()
+
+    def test_half_open_trial(self):
+        clock = FakeClock()
+        breaker = ll_ocl_comics.CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+        breaker.record_failure("timed out")
+        clock.now = 30
+        breaker.check()
+        # Only the one trial request goes through
+        with self.assertRaises(ll_ocl_comics.OllamaUnavailable):
+            breaker.check()
+        breaker.record_failure("timed out")
+        clock.now = 59
+        with self.assertRaises(ll_ocl_comics.OllamaUnavailable):
+            breaker.check()
+        clock.now = 60
+        breaker.check()
+        breaker.record_success()
+        breaker.check()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_trial_without_outcome_closes(self):
+        clock = FakeClock()
+        breaker = ll_ocl_comics.CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+        self.assertFalse(breaker.check())
+        breaker.record_failure("timed out")
+        clock.now = 30
+        self.assertTrue(breaker.check())
+        # The trial ended in a way that recorded nothing, e.g. a parse error
+        breaker.end_trial()
+        self.assertEqual(breaker.state, "closed")
+        self.assertFalse(breaker.check())
+
+class TestGenerateDeadlines(unittest.TestCase):
+    def setUp(self):
+        # OllamaAPI raises the exception classes of the module it imported itself
+        self.deadlines = importlib.import_module("deadlines")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.behaviour = {}
+        self.server.release = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = ll_ocl_comics.ConfigStore(os.path.join(self.temp_dir.name, "config.json"))
+        self.api = ll_ocl_comics.OllamaAPI(f"http://127.0.0.1:{self.server.server_address[1]}", config=self.config)
+
+    def tearDown(self):
+        self.server.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.config.flush()
+        self.temp_dir.cleanup()
+
+    def paths(self):
+        return [path for path, _ in self.server.requests]
+
+    def test_streamed_response(self):
+        response = self.api.generate("model", "prompt", monitor=ll_ocl_comics.GenerationMonitor(None), deadline=10)
+        self.assertEqual(response, "one two ")
+        self.assertEqual(self.paths(), ["/api/chat"])
+
+    def test_stall_aborts_request(self):
+        self.server.behaviour["/api/chat"] = "stall"
+        self.api.stall_seconds = 0.3
+        start = time.monotonic()
+        with self.assertRaises(self.deadlines.RequestStalled):
+            self.api.generate("model", "prompt", monitor=ll_ocl_comics.GenerationMonitor(None), deadline=10)
+        self.assertLess(time.monotonic() - start, 3)
+        # A hung server isn't a reason to try the other endpoint
+        self.assertEqual(self.paths(), ["/api/chat"])
+        self.assertEqual(self.api.circuit_breaker.failures, 1)
+
+    def test_fallback_only_when_chat_is_missing(self):
+        self.server.behaviour["/api/chat"] = 500
+        self.assertTrue(self.api.generate("model", "prompt").startswith("Error:"))
+        self.assertEqual(self.paths(), ["/api/chat"])
+
+        self.server.behaviour["/api/chat"] = 404
+        self.assertEqual(self.api.generate("model", "prompt"), "done")
+        self.assertEqual(self.api.generate("model", "prompt"), "done")
+        # Once /api/chat is known to be missing it isn't tried again
+        self.assertEqual(self.paths(), ["/api/chat", "/api/chat", "/api/generate", "/api/generate"])
+
+    def test_missing_model_is_not_a_missing_endpoint(self):
+        self.server.behaviour["/api/chat"] = "model_not_found"
+        for monitor in (None, ll_ocl_comics.GenerationMonitor(None)):
+            response = self.api.generate("typo", "prompt", monitor=monitor, deadline=10)
+            self.assertTrue(response.startswith("Error: 404"), response)
+            self.assertIn("not found", response)
+        # /api/chat is still used for the models that exist
+        self.assertEqual(self.paths(), ["/api/chat", "/api/chat"])
+        self.assertFalse(self.api.backend.use_generate_endpoint)
+
+    def test_half_open_trial_with_bad_stream_closes_breaker(self):
+        monitor = ll_ocl_comics.GenerationMonitor(None)
+        breaker = self.api.circuit_breaker
+        breaker.reset_seconds = 0
+        for behaviour, expected in (("error", None), ("garbage", ValueError)):
+            for _ in range(breaker.failure_threshold):
+                breaker.record_failure("refused")
+            self.server.behaviour["/api/chat"] = behaviour
+            if expected is None:
+                self.assertIn("model runner crashed", self.api.generate("model", "prompt", monitor=monitor, deadline=10))
+            else:
+                with self.assertRaises(expected):
+                    self.api.generate("model", "prompt", monitor=monitor, deadline=10)
+            # The server answered, so the next request isn't refused
+            self.assertEqual(breaker.state, "closed", behaviour)
+            self.server.behaviour["/api/chat"] = "ok"
+            self.assertEqual(self.api.generate("model", "prompt", monitor=ll_ocl_comics.GenerationMonitor(None)),
+                             "one two ")
+
+    def test_down_server_fails_fast(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.api.base_url = f"http://127.0.0.1:{port}"
+        for _ in range(3):
+            self.assertTrue(self.api.generate("model", "prompt").startswith("Error:"))
+        with self.assertRaises(self.deadlines.OllamaUnavailable):
+            self.api.generate("model", "prompt")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from src import ll_ocl_comics
+
+class TestEstimateNumPredict(unittest.TestCase):
+    def test_scales_with_input(self):
+        self.assertEqual(ll_ocl_comics.estimate_num_predict(10, 1), 128)
+        self.assertEqual(ll_ocl_comics.estimate_num_predict(200, 10), 520)
+        self.assertEqual(ll_ocl_comics.estimate_num_predict(200, 10, reasoning_budget=1024), 1544)
+
+class TestFindRepetitionLoop(unittest.TestCase):
+    def test_detects_repeated_tail(self):
+        self.assertEqual(ll_ocl_comics.find_repetition_loop('Textbox 1: "' + "Wait... " * 8), "Wait... ")
+
+    def test_ignores_normal_output(self):
+        self.assertIsNone(ll_ocl_comics.find_repetition_loop('Textbox 1: "Wait... Wait... What?"'))
+        self.assertIsNone(ll_ocl_comics.find_repetition_loop("A" * 30 + "!"))
+
+class TestGenerationMonitor(unittest.TestCase):
+    def test_splits_reasoning_and_translation(self):
+        monitor = ll_ocl_comics.GenerationMonitor("think")
+        # The closing tag is split across chunks
+        for chunk in ["<think>", " hmm", "</", "think", ">", "Textbox 1", ': "Hi"']:
+            self.assertTrue(monitor.feed(chunk))
+        self.assertEqual(monitor.token_split(), (5, 2))
+        self.assertEqual(monitor.token_split(eval_count=14), (10, 4))
+        self.assertEqual(monitor.content, '<think> hmm</think>Textbox 1: "Hi"')
+
+    def test_thinking_field_counts_as_reasoning(self):
+        monitor = ll_ocl_comics.GenerationMonitor(None)
+        monitor.feed(thinking="Let me see")
+        monitor.feed("Textbox 1")
+        self.assertEqual(monitor.token_split(), (1, 1))
+
+    def test_aborts_on_loop(self):
+        monitor = ll_ocl_comics.GenerationMonitor("think")
+        results = [monitor.feed("no way ") for _ in range(40)]
+        self.assertIn(False, results)
+        self.assertEqual(monitor.loop_unit, "no way ")
@@ -0,0 +1,78 @@
+import itertools
+import random
+import unittest
+
+from bs4 import BeautifulSoup
+
+from src import ll_ocl_comics
+
+def make_page(*styles):
+    html = ''.join(f'<div class="textBox" style="{style}"><p>x</p></div>' for style in styles)
+    return BeautifulSoup(f'<div class="pageContainer">{html}</div>', 'lxml').find_all('div', class_='textBox')
+
+def intersects(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+class TestGeometry(unittest.TestCase):
+    def test_parse_box_style(self):
+        style = "left:10; top:20; max-width:50; width:30.5; height:40; font-size:32px; writing-mode: vertical-rl;"
+        self.assertEqual(ll_ocl_comics.parse_box_style(style), {"left": 10, "top": 20, "width": 30.5, "height": 40})
+
+    def test_find_overlaps_matches_brute_force(self):
+        rng = random.Random(7)
+        rects = [(rng.randint(0, 900), rng.randint(0, 1500), rng.randint(10, 300), rng.randint(10, 300)) for _ in range(60)]
+        expected = {(i, j) for i, j in itertools.combinations(range(len(rects)), 2) if intersects(rects[i], rects[j])}
+        self.assertEqual(set(ll_ocl_comics.find_overlaps(rects)), expected)
+
+    def test_narrow_box_is_widened_around_its_centre(self):
+        textbox, = make_page("left:100; top:10; width:50; height:200; font-size:32px; writing-mode: vertical-rl;")
+        stats = ll_ocl_comics.layout_textboxes([textbox])
+
+        self.assertEqual(textbox['style'], "left:60; top:10; width:130; height:200; font-size:32px;")
+        self.assertEqual(textbox['data-box-left'], "60")
+        self.assertEqual(textbox['data-box-width'], "130")
+        self.assertEqual(textbox['data-aspect-ratio'], "0.65")
+        self.assertEqual(textbox['data-size-category'], "medium")
+        self.assertEqual(stats, {"widened": 1, "constrained": 0})
+
+    def test_wide_box_is_left_alone(self):
+        textbox, = make_page("left:100; top:10; width:300; height:200;")
+        ll_ocl_comics.layout_textboxes([textbox])
+        self.assertEqual(textbox['style'], "left:100; top:10; width:300; height:200;")
+        self.assertEqual(textbox['data-size-category'], "large")
+
+    def test_widening_does_not_create_overlaps(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            rects = [(rng.randint(0, 1000), rng.randint(0, 1500), rng.randint(20, 200), rng.randint(20, 200)) for _ in range(25)]
+            placements = ll_ocl_comics.widen_rects(rects, page_width=1200)
+            widened = [(left, top, width, height) for (left, width), (_, top, _, height) in zip(placements, rects)]
+            for (i, j) in itertools.combinations(range(len(rects)), 2):
+                if intersects(widened[i], widened[j]):
+                    self.assertTrue(intersects(rects[i], rects[j]), (rects[i], rects[j]))
+            for (left, width), rect in zip(placements, rects):
+                self.assertGreaterEqual(width, rect[2])
+                self.assertLessEqual(left, rect[0])
+                self.assertGreaterEqual(left + width, rect[0] + rect[2])
+
+    def test_widened_box_shifts_away_from_neighbour(self):
+        self.assertEqual(ll_ocl_comics.widen_rects([(100, 0, 50, 40), (160, 0, 300, 40)]), [(30, 130), (160, 300)])
+
+    def test_neighbours_split_the_gap(self):
+        rects = [(100, 0, 20, 40), (140, 0, 20, 40)]
+        self.assertEqual(ll_ocl_comics.widen_rects(rects, min_width=200), [(-70, 200), (130, 200)])
+
+    def test_box_stays_on_the_page(self):
+        self.assertEqual(ll_ocl_comics.widen_rects([(10, 0, 50, 40)], page_width=1000), [(0, 130)])
+        self.assertEqual(ll_ocl_comics.widen_rects([(960, 0, 30, 40)], page_width=1000), [(870, 130)])
+
+    def test_constrained_box_takes_the_room_it_has(self):
+        pages = make_page("left:100; top:0; width:40; height:40;",
+                          "left:-50; top:0; width:140; height:40;",
+                          "left:150; top:0; width:140; height:40;")
+        stats = ll_ocl_comics.layout_textboxes(pages)
+        self.assertEqual(pages[0]['style'], "left:90; top:0; width:60; height:40;")
+        self.assertEqual(stats, {"widened": 1, "constrained": 1})
+
+if __name__ == '__main__':
+    unittest.main()
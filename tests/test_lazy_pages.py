@@ -0,0 +1,28 @@
+import json
+import unittest
+
+from bs4 import BeautifulSoup
+
+from src import ll_ocl_comics
+
+PAGE_HTML = """<html><body><div id="page0" class="page">
+<div class="pageContainer" style="width:1200; height:1700; background-image:url(&quot;../vol/001.jpg&quot;)">
+<div class="textBox" style="left:10; top:10; width:130; height:100;"><p>They would often cling to me.</p></div>
+<div class="textBox" style="left:300; top:10; width:200; height:100;"><p>&lt;/script&gt; BOOM</p></div>
+</div></div></body></html>"""
+
+class TestDehydratePages(unittest.TestCase):
+    def test_moves_textboxes_into_data_island(self):
+        soup = BeautifulSoup(PAGE_HTML, 'lxml')
+        self.assertEqual(ll_ocl_comics.dehydrate_pages(soup), 1)
+
+        container = soup.find('div', class_='pageContainer')
+        self.assertEqual(container.find_all('div', class_='textBox'), [])
+        self.assertEqual(container['data-lazy-bg'], '"../vol/001.jpg"')
+        self.assertNotIn('background-image', container['style'])
+
+        # The island survives a round trip through the written HTML
+        island = BeautifulSoup(soup.prettify(), 'lxml').find('script', class_='lazy-page-data')
+        self.assertNotIn('</script', island.string)
+        boxes = BeautifulSoup(json.loads(island.string)['html'], 'lxml').find_all('div', class_='textBox')
+        self.assertEqual([box.get_text() for box in boxes], ["They would often cling to me.", "</script> BOOM"])
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src import ll_ocl_comics
+
+def records(*pairs):
+    return [{"page": i // 2, "box": i % 2, "source": source, "text": text} for i, (source, text) in enumerate(pairs)]
+
+class TestLibraryIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index = ll_ocl_comics.LibraryIndex(os.path.join(self.temp_dir.name, "library.sqlite3"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_volume(self, name, *pairs):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("<html></html>")
+        ll_ocl_comics.write_sidecar(ll_ocl_comics.sidecar.sidecar_path_for(path), records(*pairs))
+        return path
+
+    def test_search_source_and_translation(self):
+        self.write_volume("vol1.html", ("麦わらの一味", "The Straw Hat crew"), ("ドン", "BOOM"))
+        self.write_volume("vol2.html", ("海賊王に俺はなる", "I'm gonna be King of the Pirates"))
+        self.assertEqual(self.index.update(self.temp_dir.name), {"indexed": 2, "unchanged": 0, "removed": 0, "failed": 0})
+
+        results = self.index.search("麦わら")
+        self.assertEqual([(r["volume"], r["page"], r["box"], r["translation"]) for r in results],
+                         [("vol1.html", 0, 0, "The Straw Hat crew")])
+        self.assertEqual(self.index.search("straw hat")[0]["source"], "麦わらの一味")
+        self.assertEqual(self.index.search("straw hat", field="source"), [])
+        self.assertEqual(len(self.index.search("pirates", volume="vol2")), 1)
+        self.assertEqual(self.index.search("pirates", volume="vol1"), [])
+        # Shorter than a trigram, and FTS syntax in the query
+        self.assertEqual(self.index.search("ドン")[0]["translation"], "BOOM")
+        self.assertEqual(self.index.search('"King" OR'), [])
+        with self.assertRaises(ValueError):
+            self.index.search("x", field="page")
+
+    def test_update_is_incremental(self):
+        path = self.write_volume("vol1.html", ("ドン", "BOOM"))
+        self.index.update(self.temp_dir.name)
+        self.assertEqual(self.index.update(self.temp_dir.name)["unchanged"], 1)
+
+        # A re-translation replaces the volume's rows
+        time.sleep(0.01)
+        self.write_volume("vol1.html", ("ドン", "BANG"))
+        self.assertEqual(self.index.update(self.temp_dir.name)["indexed"], 1)
+        self.assertEqual([r["translation"] for r in self.index.search("ドン")], ["BANG"])
+        self.assertEqual(self.index.stats(), {"volumes": 1, "textboxes": 1})
+
+        os.remove(path)
+        self.assertEqual(self.index.update(self.temp_dir.name)["removed"], 1)
+        self.assertEqual(self.index.search("BANG"), [])
+        self.assertEqual(self.index.stats(), {"volumes": 0, "textboxes": 0})
+
+    def test_indexes_html_without_sidecar(self):
+        path = os.path.join(self.temp_dir.name, "vol.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<div class="pageContainer"><div class="textBox short-text"><p>Thank you!</p></div>'
+                    '<div class="textBox"><p>未翻訳</p></div></div>')
+        self.assertEqual(self.index.index_volume(path), 1)
+        self.assertEqual(self.index.search("thank")[0]["source"], "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+from src import ll_ocl_comics
+
+class TestTraceSpool(unittest.TestCase):
+    def test_spool_round_trip(self):
+        with tempfile.TemporaryDirectory() as trace_dir:
+            spool = ll_ocl_comics.TraceSpool(trace_dir, job_id="job")
+            request_id = spool.spool("request", "Textbox 1: \"よく\"", attempt=1)
+            spool.spool("response", "Textbox 1: \"Often\"", request_id=request_id)
+            spool.close()
+
+            records = ll_ocl_comics.read_trace(os.path.join(trace_dir, "job.0.jsonl.gz"))
+            self.assertEqual([r["kind"] for r in records], ["request", "response"])
+            self.assertEqual(records[0]["id"], request_id)
+            self.assertEqual(records[0]["payload"], "Textbox 1: \"よく\"")
+            self.assertEqual(records[1]["request_id"], request_id)
+
+    def test_rotation_keeps_backup_count_segments(self):
+        with tempfile.TemporaryDirectory() as trace_dir:
+            spool = ll_ocl_comics.TraceSpool(trace_dir, job_id="job", max_bytes=200, backup_count=2)
+            for _ in range(10):
+                spool.spool("response", "x" * 150)
+            spool.close()
+
+            segments = sorted(os.listdir(trace_dir))
+            self.assertEqual(segments, ["job.8.jsonl.gz", "job.9.jsonl.gz"])
+
+class TestLazyJson(unittest.TestCase):
+    def test_str_dumps_data(self):
+        self.assertEqual(str(ll_ocl_comics.LazyJson({"a": 1})), '{\n  "a": 1\n}')
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from src import ll_ocl_comics
+
+class FakeOllamaAPI:
+    base_url = "http://localhost:11434"
+
+    def __init__(self, tags, infos):
+        self.tags = tags
+        self.infos = infos
+        self.show_calls = []
+        self.model_metadata = {}
+
+    def list_models(self):
+        return self.tags
+
+    def get_model_info(self, model_name):
+        self.show_calls.append(model_name)
+        return self.infos[model_name]
+
+class TestParseModelMetadata(unittest.TestCase):
+    def test_model_info_context_length(self):
+        info = {
+            "details": {"family": "qwen3", "parameter_size": "32.8B", "quantization_level": "Q4_K_M"},
+            "model_info": {"general.architecture": "qwen3", "qwen3.context_length": 40960},
+            "capabilities": ["completion", "tools", "thinking"],
+        }
+        self.assertEqual(ll_ocl_comics.parse_model_metadata(info), {
+            "context_length": 40960, "parameter_size": "32.8B", "quantization": "Q4_K_M", "family": "qwen3",
+            "capabilities": ["completion", "tools", "thinking"],
+        })
+
+    def test_num_ctx_parameter_wins(self):
+        info = {"parameters": "temperature 0.7\nnum_ctx 16384", "model_info": {"llama.context_length": 131072}}
+        self.assertEqual(ll_ocl_comics.parse_model_metadata(info)["context_length"], 16384)
+
+    def test_empty_info_uses_default(self):
+        self.assertEqual(ll_ocl_comics.parse_model_metadata({})["context_length"], 4096)
+
+class TestModelCatalog(unittest.TestCase):
+    def test_refresh_persists_and_skips_unchanged_models(self):
+        infos = {"a:7b": {"details": {"parameter_size": "7B"}}, "b:70b": {"details": {"parameter_size": "70B"}}}
+        tags = [{"name": "a:7b", "digest": "1"}, {"name": "b:70b", "digest": "2"}]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "catalog.json")
+            api = FakeOllamaAPI(tags, infos)
+            self.assertEqual(ll_ocl_comics.ModelCatalog(api, path).refresh(), ["a:7b", "b:70b"])
+
+            api = FakeOllamaAPI([{"name": "a:7b", "digest": "1"}, {"name": "b:70b", "digest": "3"}], infos)
+            catalog = ll_ocl_comics.ModelCatalog(api, path)
+            self.assertEqual(catalog.model_names(), ["a:7b", "b:70b"])
+            self.assertEqual(catalog.max_context("b:70b"), 32768)
+            self.assertEqual(api.model_metadata["a:7b"]["context_length"], 8192)
+
+            catalog.refresh()
+            self.assertEqual(api.show_calls, ["b:70b"])
+
+    def test_missing_metadata_is_not_cached(self):
+        infos = {"a:7b": {"model_info": {"llama.context_length": 32768}, "capabilities": ["completion", "thinking"]}}
+        tags = [{"name": "a:7b", "digest": "1"}]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "catalog.json")
+            api = FakeOllamaAPI(tags, infos)
+            catalog = ll_ocl_comics.ModelCatalog(api, path)
+            catalog.refresh()
+
+            # /api/show fails after the model is updated: the last good metadata is kept
+            api.tags = [{"name": "a:7b", "digest": "2"}]
+            api.infos = {"a:7b": {}}
+            catalog.refresh()
+            self.assertEqual(catalog.get_metadata("a:7b")["context_length"], 32768)
+            self.assertEqual(catalog.get_metadata("a:7b")["capabilities"], ["completion", "thinking"])
+
+            # and it is asked for again on the next refresh rather than after the TTL
+            api.infos = infos
+            catalog.refresh()
+            self.assertEqual(api.show_calls, ["a:7b", "a:7b", "a:7b"])
+            catalog.refresh()
+            self.assertEqual(len(api.show_calls), 3)
+
+    def test_missing_metadata_for_new_model(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            api = FakeOllamaAPI([{"name": "new", "digest": "1"}], {"new": {}})
+            catalog = ll_ocl_comics.ModelCatalog(api, os.path.join(tmp_dir, "catalog.json"))
+            catalog.refresh()
+            self.assertEqual(catalog.max_context("new"), 4096)
+            catalog.refresh()
+            self.assertEqual(api.show_calls, ["new", "new"])
+
+    def test_entries_without_capabilities_are_refetched(self):
+        infos = {"a:7b": {"details": {"parameter_size": "7B"}, "capabilities": ["completion", "thinking"]}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "catalog.json")
+            api = FakeOllamaAPI([{"name": "a:7b", "digest": "1"}], infos)
+            catalog = ll_ocl_comics.ModelCatalog(api, path)
+            catalog.refresh()
+            # An entry written before capabilities were parsed
+            with catalog._lock:
+                del catalog._data["models"]["a:7b"]["metadata"]["capabilities"]
+            catalog.refresh()
+            self.assertEqual(api.show_calls, ["a:7b", "a:7b"])
+            self.assertEqual(catalog.get_metadata("a:7b")["capabilities"], ["completion", "thinking"])
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import ll_ocl_comics
+
+METRICS = {"total_duration": 3_000_000_000, "load_duration": 2_000_000_000,
+           "prompt_eval_count": 400, "prompt_eval_duration": 500_000_000,
+           "eval_count": 20, "eval_duration": 400_000_000}
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate and /api/chat like Ollama, or with the server's `status` if set."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, body))
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.end_headers()
+            return
+        payload = {"message": {"role": "assistant", "content": "done"}} if self.path == "/api/chat" else {"response": ""}
+        done_reason = "length" if "num_predict" in body.get("options", {}) else "stop"
+        data = json.dumps({**payload, "done": True, "done_reason": done_reason, **METRICS}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestModelLifecycle(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.status = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = ll_ocl_comics.ConfigStore(os.path.join(self.temp_dir.name, "config.json"))
+        self.api = ll_ocl_comics.OllamaAPI(f"http://127.0.0.1:{self.server.server_address[1]}", config=self.config)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.config.flush()
+        self.temp_dir.cleanup()
+
+    def test_load_model_request(self):
+        self.assertEqual(self.api.load_model("qwen3", 8192, "30m"), 2.0)
+        path, body = self.server.requests[-1]
+        self.assertEqual(path, "/api/generate")
+        self.assertEqual(body, {"model": "qwen3", "prompt": "", "stream": False, "keep_alive": "30m",
+                                "options": {"num_ctx": 8192}})
+
+        self.api.load_model("qwen3", None, 600)
+        self.assertNotIn("options", self.server.requests[-1][1])
+        self.assertEqual(self.server.requests[-1][1]["keep_alive"], 600)
+
+    def test_unload_model_request(self):
+        self.assertTrue(self.api.unload_model("qwen3"))
+        self.assertEqual(self.server.requests[-1], ("/api/generate", {"model": "qwen3", "keep_alive": 0}))
+        self.server.status = 500
+        self.assertFalse(self.api.unload_model("qwen3"))
+
+    def test_generate_repeats_keep_alive(self):
+        self.api.save_keep_alive("1h")
+        self.assertEqual(self.api.load_keep_alive(), "1h")
+        self.api.generate("qwen3", "prompt", context_length=4096, keep_alive="1h")
+        body = self.server.requests[-1][1]
+        self.assertEqual(body["keep_alive"], "1h")
+        self.assertEqual(body["options"], {"num_ctx": 4096})
+
+    def test_failed_request_clears_metrics(self):
+        self.assertEqual(self.api.generate("qwen3", "prompt"), "done")
+        self.assertEqual(self.api.last_response_metrics["load_duration"], 2_000_000_000)
+        estimate = ll_ocl_comics.ThroughputEstimate()
+        self.assertTrue(estimate.observe(self.api.last_response_metrics, 100))
+
+        self.server.status = 500
+        self.assertTrue(self.api.generate("qwen3", "prompt").startswith("Error:"))
+        self.assertEqual(self.api.last_response_metrics, {})
+        # The failed request adds nothing to the speed estimate
+        self.assertFalse(estimate.observe(self.api.last_response_metrics, 100))
+        self.assertEqual(estimate.requests, 1)
+        self.assertEqual(estimate.decode_tokens, 20)
+
+    def test_truncated_response_is_reported(self):
+        self.api.generate("qwen3", "prompt", num_predict=64)
+        self.assertEqual(self.api.last_response_metrics["done_reason"], "length")
+        self.api.generate("qwen3", "prompt")
+        self.assertEqual(self.api.last_response_metrics["done_reason"], "stop")
+
+if __name__ == '__main__':
+    unittest.main()
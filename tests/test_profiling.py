@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from src import ll_ocl_comics
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+class TestJobProfiler(unittest.TestCase):
+    def test_nested_stages(self):
+        profiler = ll_ocl_comics.JobProfiler()
+        profiler.start()
+        for _ in range(2):
+            with profiler.stage("translate_page"):
+                with profiler.stage("ollama_request"):
+                    time.sleep(0.01)
+                with profiler.stage("apply_translations"):
+                    pass
+        profiler.stop()
+
+        totals = profiler.stage_totals()
+        self.assertEqual(list(totals), [("translate_page",), ("translate_page", "ollama_request"),
+                                        ("translate_page", "apply_translations")])
+        page = totals[("translate_page",)]
+        request = totals[("translate_page", "ollama_request")]
+        self.assertEqual(page["calls"], 2)
+        self.assertGreaterEqual(request["total_seconds"], 0.02)
+        self.assertLess(page["self_seconds"], page["total_seconds"] - request["total_seconds"] + 1e-6)
+        self.assertIn("  ollama_request", profiler.stage_table())
+
+    def test_sampled_stacks_include_stage(self):
+        profiler = ll_ocl_comics.JobProfiler(interval=0.001)
+        profiler.start()
+        with profiler.stage("layout"):
+            busy_wait(0.1)
+        profiler.stop()
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = profiler.write_report(directory, "translation")
+            self.assertEqual([os.path.splitext(path)[1] for path in paths], [".txt", ".collapsed"])
+            with open(paths[1], encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        self.assertTrue(any(";[layout];" in line and "test_profiling.py:busy_wait" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith(threading.current_thread().name))
+        self.assertGreater(int(count), 0)
+
+    def test_cprofile_report(self):
+        profiler = ll_ocl_comics.JobProfiler("cprofile")
+        profiler.start()
+        with profiler.stage("parse_html"):
+            busy_wait(0.01)
+        profiler.stop()
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = profiler.write_report(directory, "summary")
+            self.assertTrue(paths[1].endswith(".pstats"))
+            with open(paths[0], encoding='utf-8') as f:
+                self.assertIn("busy_wait", f.read())
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            ll_ocl_comics.JobProfiler("perf")
+
+if __name__ == '__main__':
+    unittest.main()
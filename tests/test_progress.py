@@ -0,0 +1,25 @@
+import threading
+import unittest
+
+from src import ll_ocl_comics
+
+class TestProgressBus(unittest.TestCase):
+    def test_drain_keeps_latest_state(self):
+        bus = ll_ocl_comics.ProgressBus()
+        bus.publish("progress", value=10)
+        bus.publish("status", text="Translating a.html...")
+        bus.publish("progress", value=20)
+        self.assertEqual(bus.drain(), {"progress": {"value": 20}, "status": {"text": "Translating a.html..."}})
+        self.assertEqual(bus.drain(), {})
+
+    def test_concurrent_publishers(self):
+        bus = ll_ocl_comics.ProgressBus()
+        workers = [
+            threading.Thread(target=lambda n=n: [bus.publish(f"worker{n}", value=i) for i in range(1000)])
+            for n in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(bus.drain(), {f"worker{n}": {"value": 999} for n in range(4)})
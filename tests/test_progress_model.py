@@ -0,0 +1,88 @@
+import unittest
+
+from src import ll_ocl_comics
+
+def response_metrics(prompt_tokens, prompt_seconds, decode_tokens, decode_seconds, overhead_seconds=0.0):
+    return {
+        "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_seconds * 1e9),
+        "eval_count": decode_tokens, "eval_duration": int(decode_seconds * 1e9),
+        "total_duration": int((prompt_seconds + decode_seconds + overhead_seconds) * 1e9),
+    }
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestThroughputEstimate(unittest.TestCase):
+    def test_prior_without_measurements(self):
+        estimate = ll_ocl_comics.ThroughputEstimate({"decode_tokens_per_second": 50, "unknown": 1})
+        self.assertAlmostEqual(estimate.decode_tokens_per_second, 50)
+        self.assertEqual(estimate.to_prior()["decode_tokens_per_second"], 50)
+        self.assertNotIn("unknown", estimate.to_prior())
+
+    def test_measurements_take_over_from_the_prior(self):
+        estimate = ll_ocl_comics.ThroughputEstimate({"decode_tokens_per_second": 100})
+        for _ in range(200):
+            estimate.observe(response_metrics(900, 1.0, 200, 20.0), source_chars=100)
+        self.assertAlmostEqual(estimate.decode_tokens_per_second, 10, delta=0.5)
+        self.assertAlmostEqual(estimate.prefill_tokens_per_second, 900, delta=50)
+        self.assertAlmostEqual(estimate.decode_tokens_per_char, 2.0, delta=0.05)
+
+    def test_metrics_without_timings_are_ignored(self):
+        estimate = ll_ocl_comics.ThroughputEstimate()
+        self.assertFalse(estimate.observe({"reasoning_tokens": 3}))
+        self.assertEqual(estimate.requests, 0)
+
+class TestProgressModel(unittest.TestCase):
+    def test_fraction_weights_pages_by_text(self):
+        model = ll_ocl_comics.ProgressModel([100, 0, 300], ll_ocl_comics.ThroughputEstimate())
+        model.page_done(1)
+        self.assertEqual(model.snapshot()["fraction"], 0)
+        model.page_done(0)
+        model.page_done(0)
+        snapshot = model.snapshot()
+        self.assertEqual(snapshot["pages_done"], 2)
+        self.assertGreater(snapshot["fraction"], 0.1)
+        self.assertLess(snapshot["fraction"], 0.5)
+
+    def test_eta_calibrates_to_wall_clock(self):
+        clock = FakeClock()
+        estimate = ll_ocl_comics.ThroughputEstimate()
+        model = ll_ocl_comics.ProgressModel([100] * 6, estimate, clock=clock)
+        predicted_total = model.snapshot()["eta_seconds"]
+        # Pages take twice as long as predicted
+        for index in range(3):
+            clock.now += 2 * estimate.request_seconds(100)
+            model.page_done(index)
+        self.assertAlmostEqual(model.snapshot()["eta_seconds"], predicted_total, places=6)
+
+    def test_status(self):
+        model = ll_ocl_comics.ProgressModel([10, 10], ll_ocl_comics.ThroughputEstimate())
+        self.assertRegex(model.format_status(), r"^Page 0/2 · ETA \d+s \(.+\) · 25 tok/s$")
+        model.page_done(0)
+        model.page_done(1)
+        self.assertEqual(model.format_status(), "Page 2/2 · 25 tok/s")
+
+    def test_format_duration(self):
+        self.assertEqual(ll_ocl_comics.format_duration(7500), "2h 05m")
+        self.assertEqual(ll_ocl_comics.format_duration(95), "1m 35s")
+        self.assertEqual(ll_ocl_comics.format_duration(-3), "0s")
+
+class TestGenerationProgress(unittest.TestCase):
+    def test_decode_rate_is_measured(self):
+        clock = FakeClock()
+        progress = ll_ocl_comics.GenerationProgress(ll_ocl_comics.ThroughputEstimate(), 4000, 1000, clock=clock)
+        self.assertGreater(progress.update(0)["eta_seconds"], 40)
+        clock.now = 5.0
+        progress.update(1)
+        clock.now = 15.0
+        update = progress.update(501)
+        self.assertAlmostEqual(update["decode_tokens_per_second"], 50.1)
+        self.assertAlmostEqual(update["eta_seconds"], 499 / 50.1)
+        self.assertLessEqual(update["fraction"], 0.95)
+
+if __name__ == '__main__':
+    unittest.main()
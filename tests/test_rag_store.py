@@ -0,0 +1,85 @@
+import codecs
+import os
+import tempfile
+import threading
+import unittest
+
+from src import ll_ocl_comics
+
+rag_store = ll_ocl_comics.rag_store
+
+class TestRagStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ll_ocl_comics.RagStore()
+
+    def tearDown(self):
+        self.store.clear()
+        self.temp_dir.cleanup()
+
+    def write(self, name, data: bytes):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_rejects_unsupported_empty_and_duplicate_files(self):
+        with self.assertRaises(rag_store.RagFileRejected):
+            self.store.add(self.write("notes.pdf", b"text"))
+        with self.assertRaises(rag_store.RagFileRejected):
+            self.store.add(self.write("empty.txt", b""))
+        path = self.write("names.txt", "ルフィ = Luffy\n".encode())
+        self.store.add(path)
+        with self.assertRaises(rag_store.RagFileRejected):
+            self.store.add(path)
+
+    def test_context_matches_file_text(self):
+        self.store.add(self.write("names.txt", "ルフィ = Luffy\nゾロ = Zoro\n".encode()))
+        self.store.add(self.write("notes.md", b"\n# Notes\nKeep honorifics.\n\n"))
+        self.assertEqual(self.store.context(),
+                         "=== RAG CONTEXT ===\n\n--- names.txt ---\nルフィ = Luffy\nゾロ = Zoro\n\n"
+                         "--- notes.md ---\n# Notes\nKeep honorifics.\n\n=== END RAG CONTEXT ===\n")
+
+    def test_detects_encodings(self):
+        text = "登場人物: ルフィ、ゾロ、ナミ。麦わらの一味の船長と剣士と航海士。\n" * 20
+        self.store.add(self.write("sjis.txt", text.encode('shift_jis')))
+        self.store.add(self.write("utf16.txt", codecs.BOM_UTF16_LE + text.encode('utf-16-le')))
+        self.store.add(self.write("bom.txt", codecs.BOM_UTF8 + text.encode()))
+        self.store.wait_until_indexed()
+        for document in self.store.documents:
+            self.assertIsNone(document.error)
+            self.assertEqual(''.join(document.chunk(i) for i in range(len(document.chunks))), text, document.name)
+
+    def test_chunks_split_on_paragraphs_and_characters(self):
+        paragraph = "あいうえお" * 300 + "\n\n"
+        text = paragraph * 20 + "か" * 10000
+        for name, encoding, bom in (("utf8.txt", 'utf-8', b""), ("utf16.txt", 'utf-16-be', codecs.BOM_UTF16_BE)):
+            document = self.store.add(self.write(name, bom + text.encode(encoding)))
+            document.indexed.wait()
+            self.assertGreater(len(document.chunks), 1)
+            self.assertTrue(all(end - start <= rag_store.MAX_CHUNK_BYTES for start, end in document.chunks))
+            self.assertEqual(''.join(document.chunk(i) for i in range(len(document.chunks))), text)
+            self.assertTrue(document.chunk(0).endswith("\n\n"))
+
+    def test_budget_shares_chunks_between_files(self):
+        block = ("x" * 99 + "\n") * 50  # 5000 bytes
+        self.store.add(self.write("a.txt", ((block + "\n") * 6).encode()))
+        self.store.add(self.write("b.txt", ((block + "\n") * 6).encode()))
+        context = self.store.context(rag_store.MAX_CHUNK_BYTES * 2)
+        self.assertLess(len(context), rag_store.MAX_CHUNK_BYTES * 2 + 200)
+        self.assertIn("--- a.txt ---", context)
+        self.assertIn("--- b.txt ---", context)
+        self.assertGreater(len(self.store.context()), len(context))
+
+    def test_indexing_runs_in_the_background(self):
+        changed = threading.Event()
+        store = ll_ocl_comics.RagStore(on_change=changed.set)
+        document = store.add(self.write("names.txt", b"Luffy\n"))
+        self.assertTrue(changed.wait(5))
+        self.assertTrue(document.ready)
+        store.remove([0])
+        self.assertEqual(store.documents, [])
+        self.assertEqual(store.context(), "")
+
+if __name__ == '__main__':
+    unittest.main()
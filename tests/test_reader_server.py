@@ -0,0 +1,149 @@
+import gzip
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from src import ll_ocl_comics
+
+VOLUME_HTML = ("<html><body>" + '<div class="pageContainer" style="background-image:url(&quot;vol/001.jpg&quot;)"></div>' * 60
+               + "</body></html>")
+
+class TestParseRange(unittest.TestCase):
+    def test_ranges(self):
+        self.assertEqual(ll_ocl_comics.parse_range("bytes=100-", 1000), (100, 999))
+        self.assertEqual(ll_ocl_comics.parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(ll_ocl_comics.parse_range("bytes=0-4999", 1000), (0, 999))
+        self.assertIsNone(ll_ocl_comics.parse_range("bytes=0-1,5-6", 1000))
+        self.assertIsNone(ll_ocl_comics.parse_range("items=0-1", 1000))
+        with self.assertRaises(ValueError):
+            ll_ocl_comics.parse_range("bytes=1000-", 1000)
+
+class TestPrecompress(unittest.TestCase):
+    def test_writes_current_copies_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "volume.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(VOLUME_HTML)
+            written = ll_ocl_comics.precompress(path)
+            self.assertIn(path + ".gz", written)
+            with gzip.open(path + ".gz", 'rt', encoding='utf-8') as f:
+                self.assertEqual(f.read(), VOLUME_HTML)
+            self.assertEqual(ll_ocl_comics.precompress(path), [])
+
+            # Rewriting the volume makes the copies stale
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("\n")
+            os.utime(path, ns=(1, 1))
+            self.assertIn(path + ".gz", ll_ocl_comics.precompress(path))
+
+            image = os.path.join(directory, "001.jpg")
+            with open(image, 'wb') as f:
+                f.write(b"\xff\xd8" * 1000)
+            self.assertEqual(ll_ocl_comics.precompress(image), [])
+
+class TestReaderServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.temp_dir.name, "output")
+        self.source_dir = os.path.join(self.temp_dir.name, "manga")
+        os.makedirs(self.output_dir)
+        os.makedirs(os.path.join(self.source_dir, "vol"))
+        with open(os.path.join(self.output_dir, "vol.html"), 'w', encoding='utf-8') as f:
+            f.write(VOLUME_HTML)
+        self.image = bytes(range(256)) * 8
+        with open(os.path.join(self.source_dir, "vol", "001.jpg"), 'wb') as f:
+            f.write(self.image)
+        with open(os.path.join(self.temp_dir.name, "secret.txt"), 'w') as f:
+            f.write("outside the roots")
+        ll_ocl_comics.record_source_directory(self.output_dir, self.source_dir)
+
+        self.server = ll_ocl_comics.ReaderServer([self.output_dir], host="127.0.0.1", port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def get(self, path, **headers):
+        self.connection.request("GET", path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_serves_images_from_source_directory(self):
+        response, body = self.get("/vol/001.jpg")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.image)
+        self.assertEqual(response.getheader("Content-Type"), "image/jpeg")
+        self.assertIn("immutable", response.getheader("Cache-Control"))
+        self.assertEqual(self.get("/vol/002.jpg")[0].status, 404)
+        self.assertEqual(self.get("/../secret.txt")[0].status, 404)
+        self.assertEqual(self.get("/vol/..%2F..%2Fsecret.txt")[0].status, 404)
+
+    def test_only_reader_files_are_served(self):
+        private_files = [
+            (self.output_dir, "traces", "job.jsonl.gz"),
+            (self.output_dir, "profiles", "translation.json"),
+            (self.output_dir, "notes.txt"),
+            (self.source_dir, "_ocr", "vol", "001.json"),
+            (self.source_dir, ".git", "config.html"),
+        ]
+        for *directories, name in private_files:
+            os.makedirs(os.path.join(*directories), exist_ok=True)
+            with open(os.path.join(*directories, name), 'w', encoding='utf-8') as f:
+                f.write("private")
+        with open(os.path.join(self.output_dir, "vol.translations.jsonl"), 'w', encoding='utf-8') as f:
+            f.write('{"page": 0, "box": 0, "text": "Hi"}\n')
+
+        for path in ["/traces/job.jsonl.gz", "/profiles/translation.json", "/notes.txt", "/_ocr/vol/001.json",
+                     "/.git/config.html", "/" + ll_ocl_comics.READER_SOURCES_FILENAME]:
+            self.assertEqual(self.get(path)[0].status, 404, path)
+        self.assertEqual(self.get("/vol.translations.jsonl")[0].status, 200)
+
+    def test_precompressed_html_and_etag(self):
+        # The server compresses outputs written before it started
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "vol.html.gz")))
+        response, body = self.get("/vol.html", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(gzip.decompress(body).decode('utf-8'), VOLUME_HTML)
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+
+        etag = response.getheader("ETag")
+        response, body = self.get("/vol.html", **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+
+        response, body = self.get("/vol.html")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body.decode('utf-8'), VOLUME_HTML)
+        self.assertNotEqual(response.getheader("ETag"), etag)
+
+    def test_range_requests(self):
+        response, body = self.get("/vol/001.jpg", Range="bytes=10-19")
+        self.assertEqual(response.status, 206)
+        self.assertEqual(body, self.image[10:20])
+        self.assertEqual(response.getheader("Content-Range"), f"bytes 10-19/{len(self.image)}")
+
+        response, _ = self.get("/vol/001.jpg", Range=f"bytes={len(self.image)}-")
+        self.assertEqual(response.status, 416)
+
+        # A stale If-Range gets the whole file
+        response, body = self.get("/vol/001.jpg", Range="bytes=10-19", **{"If-Range": '"old"'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.image)
+
+    def test_index_lists_volumes(self):
+        response, body = self.get("/")
+        self.assertEqual(response.status, 200)
+        self.assertIn(b'href="vol.html"', body)
+        with open(os.path.join(self.output_dir, ll_ocl_comics.READER_SOURCES_FILENAME), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["sources"], [self.source_dir])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from src import ll_ocl_comics
+
+class TestPageComplexity(unittest.TestCase):
+    def test_ideographs_count_double(self):
+        self.assertEqual(ll_ocl_comics.page_complexity(["よく"]), 2)
+        self.assertEqual(ll_ocl_comics.page_complexity(["性格", " だ "]), 5)
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.full = ll_ocl_comics.ModelTier("full", "big", 8192, 0.7)
+        self.fast = ll_ocl_comics.ModelTier("fast", "small", 2048, 0.2)
+
+    def test_without_fast_tier_everything_goes_full(self):
+        router = ll_ocl_comics.ModelRouter(self.full)
+        self.assertIs(router.route_page(["よく"]), self.full)
+        self.assertEqual(router.tiers, [self.full])
+        self.assertIsNone(router.escalate(self.full))
+
+    def test_short_pages_go_fast(self):
+        router = ll_ocl_comics.ModelRouter(self.full, self.fast, max_complexity=20, max_textbox_chars=8)
+        self.assertIs(router.route_page(["よく", "えっ"]), self.fast)
+        # Too much text on the page
+        self.assertIs(router.route_page(["じゃれつく性格だった"] * 2), self.full)
+        # One long textbox
+        self.assertIs(router.route_page(["じゃれつくせいかく"]), self.full)
+
+    def test_escalates_to_full_tier(self):
+        router = ll_ocl_comics.ModelRouter(self.full, self.fast)
+        self.assertIs(router.escalate(self.fast), self.full)
+        self.assertIsNone(router.escalate(self.full))
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src import ll_ocl_comics
+
+class TestNormalizeSfx(unittest.TestCase):
+    def test_folding_and_collapsing(self):
+        self.assertEqual(ll_ocl_comics.normalize_sfx("ごごごご…！"), "ゴ")
+        self.assertEqual(ll_ocl_comics.normalize_sfx("ｻﾞﾜｻﾞﾜ"), "ザワ")
+        self.assertEqual(ll_ocl_comics.normalize_sfx("ドドドン"), "ドン")
+        self.assertEqual(ll_ocl_comics.normalize_sfx("ドカーーン!!"), "ドカン")
+        self.assertEqual(ll_ocl_comics.normalize_sfx("…"), "")
+
+class TestSfxLexicon(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "sfx.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lookup_and_stats(self):
+        lexicon = ll_ocl_comics.SfxLexicon(self.path)
+        self.assertEqual(lexicon.lookup("ゴロゴロ"), "RUMBLE")
+        self.assertEqual(lexicon.lookup("ざわざわ"), "murmur murmur")
+        self.assertEqual(lexicon.lookup("ｺﾞﾛｺﾞﾛｺﾞﾛ"), "RUMBLE")
+        self.assertIsNone(lexicon.lookup("俺は"))
+
+        stats = lexicon.stats()
+        self.assertEqual((stats["lookups"], stats["hits"]), (4, 3))
+        self.assertEqual(stats["hit_rate"], 0.75)
+        self.assertEqual(stats["top"][0], ("ゴロ", 2))
+
+        lexicon.reset_stats()
+        self.assertEqual(lexicon.stats()["lookups"], 0)
+
+    def test_needs_sfx_markers(self):
+        lexicon = ll_ocl_comics.SfxLexicon(self.path)
+        # Ordinary words and names go to the model
+        for text in ["パン", "はぁ", "ジロ", "バン", "ジ", "サ"]:
+            self.assertIsNone(lexicon.lookup(text), text)
+        self.assertEqual(lexicon.lookup("バーン！"), "BANG")
+        self.assertEqual(lexicon.lookup("ババン"), "BANG")
+        self.assertEqual(lexicon.lookup("バシッ"), "WHACK")
+        self.assertEqual(lexicon.lookup("どっかーん"), "KABOOM")
+        self.assertTrue(ll_ocl_comics.has_sfx_markers("ドンドン"))
+        self.assertFalse(ll_ocl_comics.has_sfx_markers("ドカン"))
+        # Nothing folds to a single kana
+        self.assertFalse([key for key in lexicon.entries if len(key) < 2])
+
+    def test_every_builtin_entry_is_reachable(self):
+        lexicon = ll_ocl_comics.SfxLexicon(self.path)
+        for source, translation in ll_ocl_comics.BUILTIN_SFX.items():
+            # Doubled, every entry carries a repeat marker
+            self.assertEqual(lexicon.lookup(source + source), translation, source)
+
+    def test_user_entries_override_builtin_and_persist(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"ドン": "DOOM"}, f)
+        lexicon = ll_ocl_comics.SfxLexicon(self.path)
+        self.assertEqual(lexicon.lookup("ドーン！"), "DOOM")
+
+        lexicon.add("ぷるん", "boing")
+        self.assertEqual(ll_ocl_comics.SfxLexicon(self.path).lookup("プルン"), "boing")
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from src import ll_ocl_comics
+
+MOKURO_HTML = """<html><head><style>.textBox p { white-space: nowrap; }</style></head><body>
+<div class="dropdown-content"><label>Toggle OCR<input type="checkbox" id="menuToggleOCRTextBoxes"></label></div>
+<div id="page0" class="page"><div class="pageContainer" style="width:1200; height:1700;">
+<div class="textBox" style="left:10; top:10; width:130; height:100;"><p>よく</p><p>じゃれつく</p></div>
+<div class="textBox" style="left:300; top:10; width:200; height:100;"><p>ドン</p></div>
+</div></div>
+<script>
+let state = {page_idx: 0, toggleOCRTextBoxes: false,};
+function updateProperties() { return 1; }
+</script></body></html>"""
+
+def translate(soup):
+    """Stand-in for the translator: what apply_merged_translations leaves on a box."""
+    textbox = soup.find('div', class_='textBox')
+    textbox.p.string = "They would often cling to me."
+    textbox.find_all('p')[1].decompose()
+    textbox['class'] = textbox['class'] + ['short-text']
+    textbox['data-fit-font-size'] = "23"
+
+class TestSidecar(unittest.TestCase):
+    def test_round_trip(self):
+        soup = BeautifulSoup(MOKURO_HTML, 'lxml')
+        pages = soup.find_all('div', class_='pageContainer')
+        sources = ll_ocl_comics.sidecar.collect_source_texts(pages)
+        translate(soup)
+
+        records = ll_ocl_comics.collect_translations(pages, sources)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["source"], "よく じゃれつく")
+        self.assertEqual(records[0]["text"], "They would often cling to me.")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "vol.translations.jsonl")
+            ll_ocl_comics.write_sidecar(path, records, source="vol.html")
+            header, read_records = ll_ocl_comics.read_sidecar(path)
+        self.assertEqual(header["source"], "vol.html")
+        self.assertEqual(read_records, records)
+
+        fresh = BeautifulSoup(MOKURO_HTML, 'lxml')
+        self.assertEqual(ll_ocl_comics.apply_sidecar(fresh, read_records), {"applied": 1, "missing": 0, "mismatched": 0})
+        textbox = fresh.find('div', class_='textBox')
+        self.assertEqual(textbox.get_text(), "They would often cling to me.")
+        self.assertEqual(textbox['class'], ['textBox', 'short-text'])
+        self.assertEqual(textbox['data-fit-font-size'], "23")
+
+    def test_mismatched_source_is_skipped(self):
+        soup = BeautifulSoup(MOKURO_HTML, 'lxml')
+        records = [{"page": 0, "box": 1, "source": "ゴゴゴ", "text": "RUMBLE"},
+                   {"page": 3, "box": 0, "text": "Nowhere"}]
+        self.assertEqual(ll_ocl_comics.apply_sidecar(soup, records), {"applied": 0, "missing": 1, "mismatched": 1})
+
+    def test_translated_path(self):
+        self.assertEqual(ll_ocl_comics.translated_path_for(os.path.join("vol", "volume.html")),
+                         os.path.join("vol", "volume.translated.html"))
+
+    def test_apply_file_patches_viewer(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            html_path = os.path.join(temp_dir, "vol.html")
+            sidecar_path = os.path.join(temp_dir, "vol.translations.jsonl")
+            output_path = os.path.join(temp_dir, "out.html")
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(MOKURO_HTML)
+            ll_ocl_comics.write_sidecar(sidecar_path, [{"page": 0, "box": 1, "source": "ドン", "text": "BOOM"}])
+
+            stats = ll_ocl_comics.apply_sidecar_file(html_path, sidecar_path, output_path)
+            with open(output_path, encoding='utf-8') as f:
+                output = BeautifulSoup(f, 'lxml')
+
+        self.assertEqual(stats["applied"], 1)
+        self.assertIsNotNone(output.find('input', id='menuAlwaysShowTranslation'))
+        self.assertEqual(output.find_all('div', class_='textBox')[1].get_text(), "BOOM")
@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "ll_ocl_comics")
+
+# Only needed once a job runs or a file is dropped, so the GUI shouldn't import them to start
+DEFERRED_MODULES = ["bs4", "charset_normalizer", "cProfile", "http.server", "pstats", "requests", "tkinterdnd2"]
+
+class TestStartupImports(unittest.TestCase):
+    def test_app_import_defers_heavy_modules(self):
+        # A fresh interpreter, since other tests will already have imported these
+        code = ("import json, sys, app; "
+                f"print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=PACKAGE_DIR,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.splitlines()[-1]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from src import ll_ocl_comics
+
+class TestCountWrappedLines(unittest.TestCase):
+    def test_wraps_at_spaces(self):
+        # "Hello" is 2.5em wide at 10px per em
+        self.assertEqual(ll_ocl_comics.count_wrapped_lines("Hello", 10, 100), 1)
+        self.assertEqual(ll_ocl_comics.count_wrapped_lines("Hello Hello Hello", 10, 40), 3)
+        self.assertEqual(ll_ocl_comics.count_wrapped_lines("Hello Hello Hello", 10, 60), 2)
+        self.assertEqual(ll_ocl_comics.count_wrapped_lines("Hello\nHello", 10, 100), 2)
+
+    def test_breaks_long_words(self):
+        self.assertEqual(ll_ocl_comics.count_wrapped_lines("Hello", 10, 12), 3)
+        self.assertIsNone(ll_ocl_comics.count_wrapped_lines("W", 10, 5))
+
+class TestFitFontSize(unittest.TestCase):
+    def test_short_text_uses_max_size(self):
+        self.assertEqual(ll_ocl_comics.fit_font_size("Hi!", 200, 100), (60, True))
+        self.assertEqual(ll_ocl_comics.fit_font_size("Hi!", 200, 100, max_size=30), (30, True))
+
+    def test_longer_text_shrinks(self):
+        size, fits = ll_ocl_comics.fit_font_size("They would often cling to me in a playful way.", 130, 120)
+        self.assertTrue(fits)
+        self.assertLess(size, 60)
+        self.assertFalse(ll_ocl_comics.text_fit.fits("They would often cling to me in a playful way.", size + 1, 130, 120))
+
+    def test_reports_overflow(self):
+        self.assertEqual(ll_ocl_comics.fit_font_size("word " * 100, 130, 60), (16, False))
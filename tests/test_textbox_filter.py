@@ -0,0 +1,25 @@
+import unittest
+
+from src import ll_ocl_comics
+
+class TestClassifyTextbox(unittest.TestCase):
+    def test_categories(self):
+        self.assertEqual(ll_ocl_comics.classify_textbox("  "), "empty")
+        self.assertEqual(ll_ocl_comics.classify_textbox("！？"), "punctuation")
+        self.assertEqual(ll_ocl_comics.classify_textbox("…"), "punctuation")
+        self.assertEqual(ll_ocl_comics.classify_textbox("１２"), "numeric")
+        self.assertEqual(ll_ocl_comics.classify_textbox("OK!"), "latin")
+        self.assertEqual(ll_ocl_comics.classify_textbox("よく"), "translate")
+        self.assertEqual(ll_ocl_comics.classify_textbox("ー！"), "translate")
+        self.assertEqual(ll_ocl_comics.classify_textbox("안녕"), "translate")
+        self.assertEqual(ll_ocl_comics.classify_textbox("TV局"), "translate")
+
+class TestResolveLocally(unittest.TestCase):
+    def test_folds_full_width_forms(self):
+        self.assertEqual(ll_ocl_comics.resolve_locally("！？"), "!?")
+        self.assertEqual(ll_ocl_comics.resolve_locally("…"), "...")
+        self.assertEqual(ll_ocl_comics.resolve_locally("ＯＫ １２"), "OK 12")
+
+    def test_source_text_needs_model(self):
+        self.assertIsNone(ll_ocl_comics.resolve_locally("じゃれつく 性格だった．．．"))
+        self.assertIsNone(ll_ocl_comics.resolve_locally(""))
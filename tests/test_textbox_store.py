@@ -0,0 +1,54 @@
+import unittest
+
+from src import ll_ocl_comics
+
+def make_store():
+    store = ll_ocl_comics.TextboxStore()
+    store.append("vol1.html", 1, 1, "よく")
+    store.append("vol1.html", 1, 2, "じゃれつく")
+    store.append("vol1.html", 2, 4, "ドン")
+    store.append("vol2.html", 5, 9, "ありがとう")
+    return store
+
+class TestTextboxStore(unittest.TestCase):
+    def test_iteration(self):
+        store = make_store()
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.page_count, 3)
+        self.assertEqual(store[1], ll_ocl_comics.TextboxRecord("vol1.html", 1, 2, "じゃれつく"))
+        self.assertEqual(store[-1].file_name, "vol2.html")
+        self.assertEqual([record.text for record in store], ["よく", "じゃれつく", "ドン", "ありがとう"])
+        self.assertEqual(store.file_names, ["vol1.html", "vol2.html"])
+
+    def test_pages(self):
+        pages = [(page, name, [record.textbox_number for record in records]) for page, name, records in make_store().pages()]
+        self.assertEqual(pages, [(1, "vol1.html", [1, 2]), (2, "vol1.html", [4]), (5, "vol2.html", [9])])
+
+    def test_text_at(self):
+        store = make_store()
+        self.assertEqual(store.text_at(1, 1), "じゃれつく")
+        self.assertEqual(store.text_at(2, 0), "ドン")
+        self.assertIsNone(store.text_at(2, 1))
+        self.assertIsNone(store.text_at(3, 0))
+
+    def test_page_range(self):
+        sliced = make_store().page_range(2, 5)
+        self.assertEqual([(record.page_number, record.text) for record in sliced], [(2, "ドン"), (5, "ありがとう")])
+        self.assertEqual(len(make_store().page_range(3, 4)), 0)
+
+    def test_pages_must_be_in_order(self):
+        store = make_store()
+        with self.assertRaises(ValueError):
+            store.append("vol1.html", 1, 20, "late")
+
+    def test_serialization_round_trip(self):
+        store = make_store()
+        restored = ll_ocl_comics.TextboxStore.from_bytes(store.to_bytes())
+        self.assertEqual(list(restored), list(store))
+        restored.append("vol3.html", 6, 10, "またね")
+        self.assertEqual(restored[-1].text, "またね")
+        with self.assertRaises(ValueError):
+            ll_ocl_comics.TextboxStore.from_bytes(b"nope")
+
+if __name__ == '__main__':
+    unittest.main()
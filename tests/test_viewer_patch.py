@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from src import ll_ocl_comics
+
+MOKURO_HTML = """<html><head><style>.textBox p { white-space: nowrap; }</style></head><body>
+<div class="dropdown-content"><label>Toggle OCR<input type="checkbox" id="menuToggleOCRTextBoxes"></label></div>
+<div id="page0" class="page"><div class="pageContainer" style="width:1200; height:1700;">
+<div class="textBox" style="left:10; top:10; width:130; height:100;"><p>ドン</p></div>
+</div></div>
+<script>
+let state = {page_idx: 0, toggleOCRTextBoxes: false,};
+function initTextBoxes() { if (true) { return; } }
+initTextBoxes();
+function updateProperties() { return 1; }
+</script></body></html>"""
+
+def patch(cache, lazy_pages=False):
+    soup = BeautifulSoup(MOKURO_HTML, 'lxml')
+    report = ll_ocl_comics.patch_viewer(soup, lazy_pages, cache)
+    return soup, report
+
+class TestPatchCache(unittest.TestCase):
+    def test_cached_patch_matches_uncached(self):
+        uncached_soup, uncached_report = patch(None)
+        cache = ll_ocl_comics.PatchCache(path=None)
+        patch(cache)
+        cached_soup, cached_report = patch(cache)
+
+        self.assertEqual(str(cached_soup), str(uncached_soup))
+        self.assertEqual(cached_report, uncached_report)
+        self.assertTrue(cached_report["balanced"])
+        self.assertNotIn("initTextBoxes", cached_report["js_code"])
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 2, "entries": 2})
+
+    def test_lazy_pages_are_cached_separately(self):
+        cache = ll_ocl_comics.PatchCache(path=None)
+        _, eager = patch(cache)
+        _, lazy = patch(cache, lazy_pages=True)
+        self.assertNotEqual(eager["js_code"], lazy["js_code"])
+        self.assertEqual(cache.stats()["entries"], 3)
+
+    def test_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "viewer_patch_cache.json")
+            _, first = patch(ll_ocl_comics.PatchCache(path=path))
+
+            cache = ll_ocl_comics.PatchCache(path=path)
+            _, second = patch(cache)
+            self.assertEqual(second, first)
+            self.assertEqual(cache.stats()["misses"], 0)
+
+            # Entries from another version of the patches are ignored
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data["fingerprint"] = "old"
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            self.assertEqual(ll_ocl_comics.PatchCache(path=path).stats()["entries"], 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = ll_ocl_comics.PatchCache(path=None, max_entries=2)
+        first = cache.patched_style("a {}")
+        cache.patched_style("b {}")
+        cache.patched_style("a {}")
+        cache.patched_style("c {}")
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIs(cache.patched_style("a {}"), first)
+
+    def test_unknown_release(self):
+        _, report = patch(ll_ocl_comics.PatchCache(path=None))
+        self.assertEqual(report["release"], "")
+
+if __name__ == '__main__':
+    unittest.main()